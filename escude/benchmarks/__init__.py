@@ -0,0 +1,8 @@
+# -*- coding:utf-8 -*-
+"""
+Escude 工具的性能测试
+
+  bench_lzw.py / bench_script.py / bench_text.py   单项对照测试 (新旧实现)
+  suite.py                                         各格式热点的吞吐量/内存基准，可保存和对比 JSON 基线
+  fixtures.py                                      确定性的合成测试数据
+"""
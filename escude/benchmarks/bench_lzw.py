@@ -0,0 +1,131 @@
+# -*- coding:utf-8 -*-
+"""
+acp (LZW) 解压吞吐量测试：新解码器 vs 旧的逐字节实现
+
+用法:
+  python escude/benchmarks/bench_lzw.py                 # 合成数据 256KB~16MB
+  python escude/benchmarks/bench_lzw.py a.acp b.acp     # 使用真实 acp 条目
+"""
+import os
+import sys
+import time
+import random
+import struct
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import escude_core
+from escude_core import LzwDecoder, EscudeManager
+
+
+class LegacyLzwDecoder:
+    """旧版解码器 (逐字节读位、逐字节复制)，仅作对照"""
+    def __init__(self, data: bytes, unpacked_size: int):
+        self.input = BytesIO(data)
+        self.bits = 0
+        self.cached_bits = 0
+        self.output = bytearray(unpacked_size)
+
+    def get_bits(self, count: int) -> int:
+        while self.cached_bits < count:
+            b = self.input.read(1)
+            if not b:
+                return -1
+            self.bits = (self.bits << 8) | ord(b)
+            self.cached_bits += 8
+        self.cached_bits -= count
+        return (self.bits >> self.cached_bits) & ((1 << count) - 1)
+
+    def unpack(self) -> bytes:
+        dst = 0
+        lzw_dict = [0] * 0x8900
+        token_width = 9
+        dict_pos = 0
+        while dst < len(self.output):
+            token = self.get_bits(token_width)
+            if token == -1 or token == 0x100:
+                break
+            elif token == 0x101:
+                token_width += 1
+            elif token == 0x102:
+                token_width = 9
+                dict_pos = 0
+            else:
+                lzw_dict[dict_pos] = dst
+                dict_pos += 1
+                if token < 0x100:
+                    self.output[dst] = token
+                    dst += 1
+                else:
+                    token -= 0x103
+                    src = lzw_dict[token]
+                    count = min(len(self.output) - dst, lzw_dict[token + 1] - src + 1)
+                    for i in range(count):
+                        self.output[dst + i] = self.output[src + i]
+                    dst += count
+        return bytes(self.output)
+
+
+def synth_plain(size: int, seed: int = 0) -> bytes:
+    """生成类似脚本/位图的可压缩数据"""
+    rnd = random.Random(seed)
+    words = [bytes(rnd.randrange(256) for _ in range(rnd.randint(2, 12))) for _ in range(400)]
+    out = bytearray()
+    while len(out) < size:
+        if rnd.random() < 0.85:
+            out += rnd.choice(words)
+        else:
+            out += bytes([rnd.randrange(256)]) * rnd.randint(1, 64)
+    return bytes(out[:size])
+
+
+def bench(label, decoder_cls, payload, size, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = decoder_cls(payload, size).unpack()
+        dt = time.perf_counter() - t
+        best = dt if best is None else min(best, dt)
+    mbps = size / best / (1 << 20) if best else float('inf')
+    print(f"  {label:<14} {best * 1000:10.1f} ms  {mbps:8.2f} MB/s", flush=True)
+    return bytes(result)
+
+
+def run_case(name, blob, repeat=3, legacy=True):
+    size = struct.unpack('>I', blob[4:8])[0]
+    payload = blob[8:]
+    print(f"{name}: {len(blob):,} -> {size:,} 字节", flush=True)
+    ref = bench("legacy", LegacyLzwDecoder, payload, size, 1) if legacy else None
+    has_numba = escude_core.HAS_NUMBA
+    escude_core.HAS_NUMBA = False
+    out = bench("python", LzwDecoder, payload, size, repeat)
+    escude_core.HAS_NUMBA = has_numba
+    if has_numba:
+        LzwDecoder(payload, size).unpack()  # 预热 JIT
+        jit_out = bench("numba", LzwDecoder, payload, size, repeat)
+        assert jit_out == out, "numba 结果不一致"
+    if ref is not None:
+        assert ref == out, "与旧解码器结果不一致"
+
+
+def main():
+    paths = sys.argv[1:]
+    if paths:
+        for p in paths:
+            with open(p, 'rb') as f:
+                blob = f.read()
+            if blob[:4] != b'acp\x00':
+                print(f"{p}: 不是 acp 数据，跳过")
+                continue
+            run_case(os.path.basename(p), blob)
+        return
+    # 旧解码器的位缓冲从不截断，耗时随大小超线性增长，只在较小数据上对照
+    for kb in (256, 1024, 4096, 16384):
+        plain = synth_plain(kb << 10, seed=kb)
+        blob = EscudeManager.compress(plain)
+        run_case(f"synthetic {kb}KB", blob, legacy=kb <= 1024)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# -*- coding:utf-8 -*-
+"""
+ESCR1_00 脚本半角/全角转换测试：转换表 / NumPy 查表批量解码 vs 旧的逐字符查找
+
+用法:
+  python escude/benchmarks/bench_script.py              # 合成 200 个脚本
+  python escude/benchmarks/bench_script.py script_dir   # 目录下所有 ESCR1_00 脚本
+"""
+import os
+import sys
+import time
+import random
+import struct
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import escude_core
+from escude_core import EscudeManager, SHIFT_JIS
+
+
+HALF = EscudeManager.SCRIPT_HALF
+FULL = EscudeManager.SCRIPT_FULL
+
+
+def legacy_decode(text: str) -> str:
+    """旧版逐字符 in + index 查找，仅作对照"""
+    res = []
+    for char in text:
+        if char in HALF:
+            res.append(FULL[HALF.index(char)])
+        else:
+            res.append(char)
+    return "".join(res)
+
+
+def legacy_encode(text: str) -> str:
+    res = []
+    for char in text:
+        if char in FULL:
+            res.append(HALF[FULL.index(char)])
+        else:
+            res.append(char)
+    return "".join(res)
+
+
+def legacy_parse(data: bytes):
+    """旧版 parse_script 的字符串部分：逐条读取、逐条转换"""
+    str_count = struct.unpack_from('<I', data, 8)[0]
+    offsets = struct.unpack_from(f'<{str_count}I', data, 12)
+    offset = 12 + str_count * 4
+    vm_len = struct.unpack_from('<I', data, offset)[0]
+    table_start = offset + 4 + vm_len + 4
+    strings = []
+    for rel_off in offsets:
+        abs_off = table_start + rel_off
+        end = data.find(b'\x00', abs_off)
+        if end == -1:
+            end = len(data)
+        strings.append(legacy_decode(data[abs_off:end].decode(SHIFT_JIS, errors='replace')))
+    return strings
+
+
+def synth_script(n_strings: int, rnd: random.Random) -> bytes:
+    """生成带半角片假名和标点的 ESCR1_00 脚本"""
+    pool = HALF + "漢字文章テスト会話ABCabc123"
+    blob = bytearray()
+    offsets = []
+    for _ in range(n_strings):
+        offsets.append(len(blob))
+        text = "".join(rnd.choice(pool) for _ in range(rnd.randint(8, 60)))
+        blob += text.encode(SHIFT_JIS, errors='replace') + b'\x00'
+    vm = bytes(rnd.randrange(256) for _ in range(256))
+    return (b'ESCR1_00' + struct.pack(f'<I{n_strings}I', n_strings, *offsets)
+            + struct.pack('<I', len(vm)) + vm + struct.pack('<I', 0) + bytes(blob))
+
+
+def load_scripts(path):
+    scripts = []
+    for root, dirs, files in os.walk(path):
+        for f in files:
+            with open(os.path.join(root, f), 'rb') as fp:
+                data = fp.read()
+            if data[:8] == b'ESCR1_00':
+                scripts.append(data)
+    return scripts
+
+
+def timed(label, fn, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        dt = time.perf_counter() - t
+        best = dt if best is None else min(best, dt)
+    print(f"  {label:<14} {best * 1000:10.1f} ms", flush=True)
+    return result, best
+
+
+def main():
+    if len(sys.argv) > 1:
+        scripts = load_scripts(sys.argv[1])
+    else:
+        rnd = random.Random(0)
+        scripts = [synth_script(rnd.randint(200, 2000), rnd) for _ in range(200)]
+    if not scripts:
+        print("没有找到 ESCR1_00 脚本")
+        return
+    total = sum(struct.unpack_from('<I', d, 8)[0] for d in scripts)
+    print(f"{len(scripts)} 个脚本, {total:,} 条字符串", flush=True)
+
+    print("解码:")
+    ref, t_old = timed("legacy", lambda: [legacy_parse(d) for d in scripts])
+    has_numpy = escude_core.HAS_NUMPY
+    escude_core.HAS_NUMPY = False
+    out, t_new = timed("translate", lambda: [EscudeManager.parse_script(d)[0] for d in scripts])
+    escude_core.HAS_NUMPY = has_numpy
+    assert ref == out, "解码结果与旧实现不一致"
+    print(f"  加速 {t_old / t_new:.1f}x")
+    if has_numpy:
+        out, t_new = timed("numpy", lambda: [EscudeManager.parse_script(d)[0] for d in scripts])
+        assert ref == out, "NumPy 解码结果与旧实现不一致"
+        print(f"  加速 {t_old / t_new:.1f}x")
+
+    print("编码:")
+    flat = [s for strings in out for s in strings]
+    ref, t_old = timed("legacy", lambda: [legacy_encode(s) for s in flat])
+    enc, t_new = timed("translate", lambda: [EscudeManager.encode_script_string(s) for s in flat])
+    assert ref == enc, "编码结果与旧实现不一致"
+    print(f"  加速 {t_old / t_new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
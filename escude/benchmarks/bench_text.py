@@ -0,0 +1,90 @@
+# -*- coding:utf-8 -*-
+"""
+unpack_text / pack_text 并行流水线随进程数的伸缩测试
+
+用法:
+  python escude/benchmarks/bench_text.py                 # 合成 3000 个脚本
+  python escude/benchmarks/bench_text.py 500 1 2 4       # 脚本数, 要测试的进程数
+"""
+import os
+import sys
+import time
+import shutil
+import random
+import struct
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from escude_core import ACPX_001, unpack_text, pack_text
+
+
+def synth_tree(root: str, count: int, strings_per_script: int = 200, seed: int = 0):
+    """生成 ACPX .bin/.001 脚本对，按 50 个一组分到子目录"""
+    rnd = random.Random(seed)
+    pool = "あいうえおかきくけこさしすせそ漢字会話テスト「」、。"
+    for i in range(count):
+        folder = os.path.join(root, f"ch{i // 50:03d}")
+        os.makedirs(folder, exist_ok=True)
+        code = bytearray()
+        for k in range(strings_per_script):
+            code += b'\x29' + struct.pack('<I', k)
+        with open(os.path.join(folder, f"s{i:05d}.bin"), 'wb') as f:
+            f.write(b'ESCR1_01' + struct.pack('<4I', len(code), 0, 0, strings_per_script) + code)
+        mess = ACPX_001()
+        mess.strings = ["".join(rnd.choice(pool) for _ in range(rnd.randint(5, 40))).encode('cp932')
+                        for _ in range(strings_per_script)]
+        with open(os.path.join(folder, f"s{i:05d}.001"), 'wb') as f:
+            f.write(mess.save())
+
+
+def check_inplace_pack(tmp: str):
+    """输出目录就是模板目录时，原 .bin 必须保留且全部打包成功"""
+    src = os.path.join(tmp, 'inplace')
+    synth_tree(src, 3, 10)
+    txt = os.path.join(tmp, 'inplace_txt')
+    quiet = lambda msg: None
+    unpack_text(src, txt, [], logger=quiet, workers=1)
+    counts = pack_text(txt, src, src, [], 'cp932', logger=quiet, workers=1)
+    assert counts['ok'] == 3 and counts['fail'] == 0, f"原地打包失败: {counts}"
+    for i in range(3):
+        assert os.path.getsize(os.path.join(src, 'ch000', f"s{i:05d}.bin")) > 0, "原地打包删除了模板 .bin"
+    shutil.rmtree(src)
+    shutil.rmtree(txt)
+
+
+def timed(fn):
+    t = time.perf_counter()
+    fn()
+    return time.perf_counter() - t
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    cpu = os.cpu_count() or 1
+    worker_counts = [int(a) for a in sys.argv[2:]] or sorted({1, 2, 4, 8, cpu})
+    tmp = tempfile.mkdtemp(prefix='bench_text_')
+    try:
+        check_inplace_pack(tmp)
+        src = os.path.join(tmp, 'script')
+        t = timed(lambda: synth_tree(src, count))
+        print(f"生成 {count} 个脚本: {t:.1f} s (CPU 核数 {cpu})", flush=True)
+        quiet = lambda msg: None
+        base = {}
+        print(f"{'进程数':>6} {'提取':>10} {'加速':>6} {'导入':>10} {'加速':>6}", flush=True)
+        for n in worker_counts:
+            txt = os.path.join(tmp, f'txt_{n}')
+            out = os.path.join(tmp, f'new_{n}')
+            t_unpack = timed(lambda: unpack_text(src, txt, [], logger=quiet, workers=n))
+            t_pack = timed(lambda: pack_text(txt, src, out, [], 'cp936', logger=quiet, workers=n))
+            base.setdefault('unpack', t_unpack)
+            base.setdefault('pack', t_pack)
+            print(f"{n:>6} {t_unpack:>9.2f}s {base['unpack'] / t_unpack:>5.1f}x"
+                  f" {t_pack:>9.2f}s {base['pack'] / t_pack:>5.1f}x", flush=True)
+            shutil.rmtree(txt)
+            shutil.rmtree(out)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
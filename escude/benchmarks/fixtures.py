@@ -0,0 +1,165 @@
+# -*- coding:utf-8 -*-
+"""
+确定性的合成测试数据：同样的 (种类, 大小, 种子) 总是生成同样的字节
+生成结果缓存在目录中，重复运行时直接复用
+"""
+import os
+import sys
+import random
+import shutil
+import struct
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from escude_core import (EscudeManager, ACPX_001, SHIFT_JIS,
+                         ENUM_MAGIC, ENUM_ENTRY_SIZE, ENUM_HEADER_SIZE)
+
+
+# 测试规模：名称 -> 目标字节数
+SIZES = {
+    'small': 1 << 20,
+    'medium': 8 << 20,
+    'large': 32 << 20,
+}
+
+KANA = "あいうえおかきくけこさしすせそたちつてとアイウエオカキクケコ漢字会話文章「」、。！？"
+
+
+def synth_plain(size: int, seed: int = 0) -> bytes:
+    """类似脚本/位图的可压缩数据：重复的短词夹杂游程"""
+    rnd = random.Random(seed)
+    words = [bytes(rnd.randrange(256) for _ in range(rnd.randint(2, 12))) for _ in range(400)]
+    out = bytearray()
+    while len(out) < size:
+        if rnd.random() < 0.85:
+            out += rnd.choice(words)
+        else:
+            out += bytes([rnd.randrange(256)]) * rnd.randint(1, 64)
+    return bytes(out[:size])
+
+
+def synth_lines(count: int, rnd: random.Random, pool: str = KANA):
+    return ["".join(rnd.choice(pool) for _ in range(rnd.randint(4, 48))) for _ in range(count)]
+
+
+def synth_escr(size: int, seed: int = 0) -> bytes:
+    """ESCR1_00 脚本：字符串表约占 size 字节，字符串含半角片假名"""
+    rnd = random.Random(seed)
+    pool = EscudeManager.SCRIPT_HALF + KANA
+    blob = bytearray()
+    offsets = []
+    while len(blob) < size:
+        offsets.append(len(blob))
+        text = "".join(rnd.choice(pool) for _ in range(rnd.randint(4, 48)))
+        blob += text.encode(SHIFT_JIS, errors='replace') + b'\x00'
+    vm = bytes(rnd.randrange(256) for _ in range(4096))
+    return (b'ESCR1_00' + struct.pack(f'<I{len(offsets)}I', len(offsets), *offsets)
+            + struct.pack('<I', len(vm)) + vm + struct.pack('<I', 0) + bytes(blob))
+
+
+def synth_mess(size: int, seed: int = 0) -> bytes:
+    """ACPX .001 消息文件"""
+    rnd = random.Random(seed)
+    mess = ACPX_001()
+    total = 0
+    while total < size:
+        raw = synth_lines(1, rnd)[0].encode(SHIFT_JIS)
+        mess.strings.append(raw)
+        total += len(raw) + 5
+    return mess.save()
+
+
+def synth_enum(size: int, seed: int = 0) -> bytes:
+    """LIST 格式 enum_scr.bin：每块 1~3 个名称"""
+    rnd = random.Random(seed)
+    num_blocks = max(1, size // ENUM_ENTRY_SIZE)
+    blocks = bytearray(num_blocks * ENUM_ENTRY_SIZE)
+    for i in range(num_blocks):
+        pos = i * ENUM_ENTRY_SIZE
+        end = pos + ENUM_ENTRY_SIZE
+        for name in synth_lines(rnd.randint(1, 3), rnd):
+            raw = name.encode(SHIFT_JIS)[:40] + b'\x00'
+            if pos + len(raw) > end:
+                break
+            blocks[pos:pos + len(raw)] = raw
+            pos += len(raw) + rnd.randint(0, 8)
+    header = ENUM_MAGIC + struct.pack('<3I', len(blocks) + 8, 0, 0x4284)
+    assert len(header) == ENUM_HEADER_SIZE
+    return header + bytes(blocks)
+
+
+def synth_folder(root: str, size: int, seed: int = 0):
+    """资源包内容：脚本对、消息文件和少量大块数据，按章节分目录"""
+    rnd = random.Random(seed)
+    total = 0
+    i = 0
+    while total < size:
+        folder = os.path.join(root, f"ch{i // 40:02d}")
+        os.makedirs(folder, exist_ok=True)
+        kind = i % 8
+        if kind == 7:
+            data = synth_plain(rnd.randint(64, 512) << 10, seed=seed + i)
+            name = f"ev{i:05d}.dat"
+        elif kind % 2:
+            data = synth_mess(rnd.randint(4, 64) << 10, seed=seed + i)
+            name = f"s{i:05d}.001"
+        else:
+            data = synth_escr(rnd.randint(4, 64) << 10, seed=seed + i)
+            name = f"s{i:05d}.bin"
+        with open(os.path.join(folder, name), 'wb') as f:
+            f.write(data)
+        total += len(data)
+        i += 1
+    return total
+
+
+def _write(path: str, data: bytes):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def ensure(cache_dir: str, kind: str, size_name: str, seed: int = 0) -> str:
+    """返回 (种类, 规模) 对应的测试文件 (资源包内容为目录)，不存在时生成"""
+    size = SIZES[size_name]
+    base = os.path.join(cache_dir, f"{kind}_{size_name}_{seed}")
+    quiet = lambda *a, **k: None
+    if kind == 'plain':
+        path = base + '.dat'
+        if not os.path.exists(path):
+            _write(path, synth_plain(size, seed))
+    elif kind == 'acp':
+        path = base + '.acp'
+        if not os.path.exists(path):
+            plain = ensure(cache_dir, 'plain', size_name, seed)
+            with open(plain, 'rb') as f:
+                _write(path, EscudeManager.compress(f.read()))
+    elif kind == 'escr':
+        path = base + '.bin'
+        if not os.path.exists(path):
+            _write(path, synth_escr(size, seed))
+    elif kind == 'mess':
+        path = base + '.001'
+        if not os.path.exists(path):
+            _write(path, synth_mess(size, seed))
+    elif kind == 'enum':
+        path = base + '.bin'
+        if not os.path.exists(path):
+            _write(path, synth_enum(size, seed))
+    elif kind == 'folder':
+        path = base
+        # 完成标记放在目录外面，避免被打进资源包
+        if not os.path.exists(base + '.done'):
+            shutil.rmtree(path, ignore_errors=True)
+            synth_folder(path, size, seed)
+            open(base + '.done', 'w').close()
+    elif kind == 'archive':
+        path = base + '.bin'
+        if not os.path.exists(path):
+            folder = ensure(cache_dir, 'folder', size_name, seed)
+            EscudeManager.pack_archive(folder, path + '.tmp', logger=quiet,
+                                       compress_exts=['.bin', '.001'], workers=1)
+            os.replace(path + '.tmp', path)
+    else:
+        raise ValueError(f"未知的测试数据种类: {kind}")
+    return path
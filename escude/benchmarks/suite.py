@@ -0,0 +1,271 @@
+# -*- coding:utf-8 -*-
+"""
+Escude 各格式热点的基准测试：解密、acp 压缩/解压、资源包封包/解包、
+ESCR 脚本、ACPX .001 消息、enum_scr 的读写
+
+每个 (阶段, 规模) 在独立子进程中运行，预热一次后报告最佳耗时、MB/s 和峰值内存 (RSS)
+结果可保存为 JSON 基线，之后用 --compare 对比，吞吐量下降或内存增长超出容差时返回非零
+
+用法:
+  python escude/benchmarks/suite.py                              # small, medium 全部阶段
+  python escude/benchmarks/suite.py --sizes large --stages lzw   # 只测 lzw.*
+  python escude/benchmarks/suite.py --save base.json
+  python escude/benchmarks/suite.py --compare base.json --tolerance 0.2
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import struct
+import argparse
+import platform
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:  # Windows
+    HAS_RESOURCE = False
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import escude_core
+from escude_core import EscudeManager, EscudeCrypto, LzwDecoder, ACPX_001
+from benchmarks import fixtures
+
+
+# 内存增长低于该值 (KB) 时不判定为退化，避免噪声
+RSS_NOISE_KB = 4096
+
+
+def quiet(*args, **kwargs):
+    pass
+
+
+def read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def folder_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+# 每个阶段：(测试数据种类, setup)
+# setup(测试数据路径, 临时目录) -> (run, 处理字节数)，只对 run() 计时
+
+def _crypto_decrypt(path, work):
+    data = read_file(path)
+    return lambda: EscudeCrypto(0x12345678).decrypt(data), len(data)
+
+def _lzw_unpack(path, work):
+    blob = read_file(path)
+    size = struct.unpack_from('>I', blob, 4)[0]
+    payload = blob[8:]
+    return lambda: LzwDecoder(payload, size).unpack(), size
+
+def _lzw_pack(path, work):
+    data = read_file(path)
+    return lambda: EscudeManager.compress(data), len(data)
+
+def _archive_pack(path, work):
+    out = os.path.join(work, 'out.bin')
+    run = lambda: EscudeManager.pack_archive(path, out, logger=quiet, compress_exts=['.bin', '.001'], workers=1)
+    return run, folder_size(path)
+
+def _archive_unpack(path, work):
+    out = os.path.join(work, 'out')
+    total = 0
+    with escude_core.EscudeArchive(path, use_index=False) as arc:
+        for name in arc.list():
+            with arc.open(name) as f:
+                head = f.read(8)
+            # acp 条目按解压后的大小计
+            total += struct.unpack('>I', head[4:8])[0] if head[:4] == b'acp\x00' else arc.entry(name).length
+    return lambda: EscudeManager.unpack_archive(path, out, logger=quiet, workers=1), total
+
+def _script_load(path, work):
+    data = read_file(path)
+    return lambda: EscudeManager.parse_script(data), len(data)
+
+def _script_save(path, work):
+    strings, context = EscudeManager.load_script(path)
+    out = os.path.join(work, 'out.bin')
+    return lambda: EscudeManager.save_script(out, strings, context), os.path.getsize(path)
+
+def _mess_load(path, work):
+    data = read_file(path)
+    return lambda: ACPX_001(data), len(data)
+
+def _mess_save(path, work):
+    mess = ACPX_001(read_file(path))
+    return mess.save, os.path.getsize(path)
+
+def _enum_load(path, work):
+    return lambda: EscudeManager.load_enum_scr(path), os.path.getsize(path)
+
+def check_enum_save_limits(work):
+    """偏移相同的子条目 (如 JSON 导入后两个名称占同一位置) 都应写到同块下一个更大的偏移为止"""
+    blocks = bytearray(escude_core.ENUM_ENTRY_SIZE)
+    blocks[0:4] = b'AAAA'
+    blocks[10:13] = b'BBB'
+    enum_data = {'blocks': blocks, 'spans': [(0, 0, 0, 4), (0, 1, 0, 4), (0, 2, 10, 3)],
+                 'names': ['CCCCCCCCCCCC', '', 'BBB']}
+    out = os.path.join(work, 'dup.bin')
+    EscudeManager.save_enum_scr(out, enum_data)
+    saved = EscudeManager.load_enum_scr(out)
+    assert saved['names'] == ['CCCCCCCCC', 'BBB'], f"重复偏移的写入上限错误: {saved['names']}"
+
+def _enum_save(path, work):
+    check_enum_save_limits(work)
+    enum_data = EscudeManager.load_enum_scr(path)
+    out = os.path.join(work, 'out.bin')
+    return lambda: EscudeManager.save_enum_scr(out, enum_data), os.path.getsize(path)
+
+STAGES = {
+    'crypto.decrypt': ('plain', _crypto_decrypt),
+    'lzw.unpack': ('acp', _lzw_unpack),
+    'lzw.pack': ('plain', _lzw_pack),
+    'archive.pack': ('folder', _archive_pack),
+    'archive.unpack': ('archive', _archive_unpack),
+    'script.load': ('escr', _script_load),
+    'script.save': ('escr', _script_save),
+    'mess.load': ('mess', _mess_load),
+    'mess.save': ('mess', _mess_save),
+    'enum.load': ('enum', _enum_load),
+    'enum.save': ('enum', _enum_save),
+}
+
+
+def peak_rss_kb():
+    if not HAS_RESOURCE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_case(stage: str, size_name: str, cache_dir: str, repeat: int) -> dict:
+    """在当前进程中运行一个阶段；峰值内存为进程级，所以应在新进程中调用"""
+    kind, setup = STAGES[stage]
+    path = fixtures.ensure(cache_dir, kind, size_name)
+    work = tempfile.mkdtemp(prefix='escude_bench_')
+    try:
+        run, nbytes = setup(path, work)
+        rss_before = peak_rss_kb()
+        run()   # 预热 (numba 编译、缓存等)，不计时
+        best = None
+        for _ in range(repeat):
+            t = time.perf_counter()
+            run()
+            dt = time.perf_counter() - t
+            best = dt if best is None else min(best, dt)
+        rss_after = peak_rss_kb()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return {
+        'bytes': nbytes,
+        'seconds': best,
+        'mbps': nbytes / best / (1 << 20) if best else None,
+        'peak_rss_kb': rss_after,
+        'rss_delta_kb': rss_after - rss_before if HAS_RESOURCE else None,
+    }
+
+
+def run_isolated(stage, size_name, cache_dir, repeat):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(run_case, stage, size_name, cache_dir, repeat).result()
+
+
+def environment() -> dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': escude_core.HAS_NUMPY,
+        'numba': escude_core.HAS_NUMBA,
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """返回退化项列表 [(键, 说明), ...]"""
+    regressions = []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if base.get('mbps') and cur.get('mbps') and cur['mbps'] < base['mbps'] * (1 - tolerance):
+            regressions.append((key, f"吞吐量 {base['mbps']:.2f} -> {cur['mbps']:.2f} MB/s"))
+        b_rss, c_rss = base.get('rss_delta_kb'), cur.get('rss_delta_kb')
+        if (b_rss is not None and c_rss is not None
+                and c_rss > b_rss * (1 + tolerance) and c_rss - b_rss > RSS_NOISE_KB):
+            regressions.append((key, f"内存增长 {b_rss // 1024} -> {c_rss // 1024} MB"))
+    return regressions
+
+
+def fmt_mb(kb):
+    return f"{kb / 1024:8.1f}" if kb is not None else f"{'-':>8}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escude 格式基准测试")
+    parser.add_argument('--sizes', default='small,medium',
+                        help=f"逗号分隔的规模 ({', '.join(fixtures.SIZES)})")
+    parser.add_argument('--stages', default='',
+                        help="逗号分隔的阶段名或前缀，如 lzw,script.load (默认全部)")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数，取最快一次")
+    parser.add_argument('--cache', default=os.path.join(tempfile.gettempdir(), 'escude_bench_fixtures'),
+                        help="测试数据缓存目录")
+    parser.add_argument('--save', metavar='JSON', help="把结果保存为基线")
+    parser.add_argument('--compare', metavar='JSON', help="与基线对比")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="允许的相对退化 (默认 0.15)")
+    parser.add_argument('--no-isolate', action='store_true', help="不开子进程 (峰值内存不再按阶段区分)")
+    args = parser.parse_args()
+
+    sizes = [s for s in args.sizes.split(',') if s]
+    for s in sizes:
+        if s not in fixtures.SIZES:
+            parser.error(f"未知规模: {s}")
+    prefixes = [p for p in args.stages.split(',') if p]
+    stages = [name for name in STAGES
+              if not prefixes or any(name == p or name.startswith(p + '.') for p in prefixes)]
+    if not stages:
+        parser.error(f"没有匹配的阶段: {args.stages}")
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+
+    os.makedirs(args.cache, exist_ok=True)
+    runner = run_case if args.no_isolate else run_isolated
+    results = {}
+    print(f"{'阶段':<16} {'规模':<7} {'耗时(ms)':>10} {'MB/s':>9} {'峰值MB':>8} {'增长MB':>8}", flush=True)
+    for size_name in sizes:
+        for stage in stages:
+            key = f"{stage}@{size_name}"
+            r = runner(stage, size_name, args.cache, args.repeat)
+            results[key] = r
+            line = (f"{stage:<16} {size_name:<7} {r['seconds'] * 1000:10.1f} {r['mbps']:9.2f}"
+                    f" {fmt_mb(r['peak_rss_kb'])} {fmt_mb(r['rss_delta_kb'])}")
+            base = baseline.get(key) if baseline else None
+            if base and base.get('mbps'):
+                line += f"  {r['mbps'] / base['mbps']:5.2f}x"
+            print(line, flush=True)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment(), 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存到 {args.save}")
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} 项超出容差 ({args.tolerance:.0%}):")
+            for key, msg in regressions:
+                print(f"  {key}: {msg}")
+            sys.exit(1)
+        print("\n与基线相比没有退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2529 @@
+# -*- coding:utf-8 -*-
+"""
+Escude 格式引擎：ESC-ARC 资源包、acp (LZW) 压缩、ESCR1_00 脚本、ACPX 脚本/消息、enum_scr 与人名表
+不依赖 Qt，批处理可以直接导入；也可以作为命令行工具使用 (见 cli_main)
+"""
+import os
+import sys
+import struct
+import json
+import hashlib
+import re
+import shutil
+import mmap
+import random
+import tempfile
+import time
+import argparse
+import importlib.util
+from contextlib import contextmanager
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from io import RawIOBase
+from dataclasses import dataclass
+from typing import List, Tuple
+
+# NumPy 可选：有则用向量化密钥流，没有则回退到纯 Python 实现
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# numba 可选：安装后 LZW 解压走编译内核
+# 导入 numba 要几百毫秒，这里只检查是否安装，第一次用到编译内核时才导入
+HAS_NUMBA = HAS_NUMPY and importlib.util.find_spec('numba') is not None
+
+OPDICT = {
+    '01': '', '02': 'I', '03': '', '04': 'I', '05': 'I', '06': '', '07': 'I', '09': 'I',
+    '0a': 'I', '0b': 'I', '0c': 'I', '0d': 'I', '0e': '', '0f': 'I', '10': 'I', '11': 'I',
+    '12': '', '14': '', '13': '', '16': '', '18': '', '19': '', '1a': '', '1b': '',
+    '1c': '', '1d': '', '1e': '', '1f': '', '20': '', '21': '', '22': '', '23': '',
+    '24': '', '25': '', '26': '', '27': '', '28': 'I', '29': 's', '2a': '', '2b': 'sI',
+    '2c': 'I', '2d': 'I'
+}
+# 按操作码字节索引的参数个数 (每个参数 4 字节)
+OP_ARG_COUNTS = array('B', [len(OPDICT.get(f'{i:02x}', '')) for i in range(256)])
+
+SHIFT_JIS = 'cp932'
+
+ENUM_ENTRY_SIZE = 132
+ENUM_HEADER_SIZE = 16
+ENUM_MAGIC = b'LIST'
+
+class BytesReader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+    def read(self, n):
+        res = self.data[self.pos:self.pos+n]
+        self.pos += n
+        return res
+    def readU32(self):
+        if self.pos + 4 > len(self.data): return 0
+        return struct.unpack('<I', self.read(4))[0]
+    def seek(self, pos):
+        self.pos = pos
+    def tell(self):
+        return self.pos
+    def is_end(self):
+        return self.pos >= len(self.data)
+    def read_until_zero(self, terminator=b'\x00'):
+        start = self.pos
+        end = self.data.find(terminator, start)
+        if end == -1: end = len(self.data)
+        res = self.data[start:end]
+        self.pos = end + len(terminator)
+        return res
+
+class EscudeCrypto:
+    KEY_XOR = 0x65AC9365
+    # 少于该字数时直接走纯 Python 循环，省去 NumPy 的启动开销
+    NUMPY_MIN_WORDS = 4096
+    # NumPy 路径中每条并行"车道"连续生成的密钥个数
+    LANE_STEPS = 1024
+
+    def __init__(self, key: int):
+        self._key = key & 0xFFFFFFFF
+
+    @staticmethod
+    def _step(k: int) -> int:
+        k ^= EscudeCrypto.KEY_XOR
+        return k ^ ((((k >> 1) ^ k) >> 3) ^ ((((k << 1) ^ k) << 3) & 0xFFFFFFFF))
+
+    @property
+    def key(self) -> int:
+        self._key = self._step(self._key)
+        return self._key
+
+    @staticmethod
+    def _jump_map(steps: int) -> Tuple[List[int], int]:
+        """密钥更新是 GF(2) 上的仿射变换，返回前进 steps 步的 (列向量, 常量)"""
+        step = EscudeCrypto._step
+        const = step(0)
+        base = ([step(1 << i) ^ const for i in range(32)], const)
+        result = ([1 << i for i in range(32)], 0)
+
+        def apply(m, x):
+            cols, c = m
+            for i in range(32):
+                if x >> i & 1:
+                    c ^= cols[i]
+            return c
+
+        def compose(outer, inner):
+            cols = [apply(outer, col) ^ outer[1] for col in inner[0]]
+            return cols, apply(outer, inner[1])
+
+        while steps:
+            if steps & 1:
+                result = compose(base, result)
+            base = compose(base, base)
+            steps >>= 1
+        return result
+
+    def _keystream_py(self, count: int) -> array:
+        keys = array('I', bytes(4 * count))
+        k = self._key
+        xor = self.KEY_XOR
+        for i in range(count):
+            k ^= xor
+            k ^= (((k >> 1) ^ k) >> 3) ^ ((((k << 1) ^ k) << 3) & 0xFFFFFFFF)
+            keys[i] = k
+        self._key = k
+        return keys
+
+    def _keystream_np(self, count: int):
+        steps = self.LANE_STEPS
+        lanes = (count + steps - 1) // steps
+        cols, const = self._jump_map(steps)
+        starts = np.empty(lanes, dtype=np.uint32)
+        k = self._key
+        for i in range(lanes):
+            starts[i] = k
+            nk = const
+            for b in range(32):
+                if k >> b & 1:
+                    nk ^= cols[b]
+            k = nk
+        keys = np.empty((steps, lanes), dtype=np.uint32)
+        state = starts
+        xor = np.uint32(self.KEY_XOR)
+        one, three = np.uint32(1), np.uint32(3)
+        for j in range(steps):
+            state = state ^ xor
+            state ^= (((state >> one) ^ state) >> three) ^ (((state << one) ^ state) << three)
+            keys[j] = state
+        keys = keys.T.reshape(-1)[:count]
+        self._key = int(keys[-1])
+        return keys
+
+    def keystream(self, count: int):
+        """一次生成 count 个密钥 (uint32)，并推进内部状态"""
+        if count <= 0:
+            return array('I')
+        if HAS_NUMPY and count >= self.NUMPY_MIN_WORDS:
+            return self._keystream_np(count)
+        return self._keystream_py(count)
+
+    def decrypt(self, data: bytes) -> bytes:
+        output = bytearray(data)
+        count = len(output) // 4
+        if not count:
+            return bytes(output)
+        keys = self.keystream(count)
+        view = memoryview(output)[:count * 4]
+        if HAS_NUMPY and isinstance(keys, np.ndarray):
+            words = np.frombuffer(view, dtype='<u4')
+            words ^= keys.astype('<u4', copy=False)
+        else:
+            if sys.byteorder != 'little':
+                keys.byteswap()
+            mixed = int.from_bytes(view, 'little') ^ int.from_bytes(keys.tobytes(), 'little')
+            view[:] = mixed.to_bytes(count * 4, 'little')
+        return bytes(output)
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self.decrypt(data)
+
+class MsbBitStream:
+    def __init__(self, data: bytes):
+        self.data = bytes(data)
+        self.pos = 0
+        self.bits = 0
+        self.cached_bits = 0
+
+    def get_bits(self, count: int) -> int:
+        while self.cached_bits < count:
+            if self.pos >= len(self.data):
+                return -1
+            self.bits = (self.bits << 8) | self.data[self.pos]
+            self.pos += 1
+            self.cached_bits += 8
+        self.cached_bits -= count
+        value = self.bits >> self.cached_bits
+        self.bits &= (1 << self.cached_bits) - 1
+        return value
+
+LZW_DICT_SIZE = 0x8900
+
+def _lzw_unpack_kernel(data, output, lzw_dict):
+    """numba 内核：返回 (状态码, dst, 附加值)，状态码非 0 表示出错"""
+    n_in = data.shape[0]
+    out_len = output.shape[0]
+    dict_size = lzw_dict.shape[0]
+    pos = 0
+    acc = 0
+    nbits = 0
+    token_width = 9
+    dict_pos = 0
+    dst = 0
+    while dst < out_len:
+        while nbits < token_width and pos < n_in:
+            acc = ((acc << 8) | data[pos]) & 0xFFFFFFFF
+            pos += 1
+            nbits += 8
+        if nbits < token_width:
+            break
+        nbits -= token_width
+        token = (acc >> nbits) & ((1 << token_width) - 1)
+        if token == 0x100:
+            break
+        elif token == 0x101:
+            token_width += 1
+            if token_width > 24:
+                return 1, dst, 0
+        elif token == 0x102:
+            token_width = 9
+            dict_pos = 0
+        else:
+            if dict_pos >= dict_size:
+                return 2, dst, 0
+            lzw_dict[dict_pos] = dst
+            dict_pos += 1
+            if token < 0x100:
+                output[dst] = token
+                dst += 1
+            else:
+                token -= 0x103
+                if token >= dict_pos:
+                    return 3, dst, 0
+                src = lzw_dict[token]
+                ref_next = 0
+                if token + 1 < dict_size:
+                    ref_next = lzw_dict[token + 1]
+                if src >= out_len:
+                    return 4, dst, 0
+                count = min(out_len - dst, ref_next - src + 1)
+                if count < 0:
+                    return 5, dst, count
+                for i in range(count):
+                    output[dst + i] = output[src + i]
+                dst += count
+    return 0, dst, 0
+
+_lzw_jit_kernel = None
+
+def _get_lzw_jit_kernel():
+    global _lzw_jit_kernel
+    if _lzw_jit_kernel is None:
+        from numba import njit
+        _lzw_jit_kernel = njit(nogil=True)(_lzw_unpack_kernel)
+    return _lzw_jit_kernel
+
+class LzwDecoder:
+    # 小于该大小时 numba 的调用开销不划算
+    JIT_MIN_SIZE = 1 << 16
+    KERNEL_ERRORS = {
+        1: "Invalid compressed stream (Token Width > 24)",
+        2: "Invalid compressed stream (Dict Full)",
+        3: "Invalid compressed stream (Token out of bounds)",
+        4: "Dict reference out of bounds",
+    }
+
+    def __init__(self, data: bytes, unpacked_size: int):
+        self.data = bytes(data)
+        self.output = bytearray(unpacked_size)
+        self.unpacked_size = unpacked_size
+
+    def unpack(self) -> bytes:
+        if HAS_NUMBA and self.unpacked_size >= self.JIT_MIN_SIZE:
+            self._unpack_jit()
+        else:
+            self._unpack_py()
+        return bytes(self.output)
+
+    def _unpack_jit(self):
+        data = np.frombuffer(self.data, dtype=np.uint8)
+        output = np.frombuffer(self.output, dtype=np.uint8)
+        lzw_dict = np.zeros(LZW_DICT_SIZE, dtype=np.int64)
+        status, _, extra = _get_lzw_jit_kernel()(data, output, lzw_dict)
+        if status == 5:
+            raise ValueError(f"Invalid count: {extra}")
+        if status:
+            raise ValueError(self.KERNEL_ERRORS[status])
+
+    def _unpack_py(self):
+        data = self.data
+        n_in = len(data)
+        output = self.output
+        out_len = len(output)
+        lzw_dict = [0] * LZW_DICT_SIZE
+        dict_size = LZW_DICT_SIZE
+        pos = 0
+        acc = 0
+        nbits = 0
+        token_width = 9
+        dict_pos = 0
+        dst = 0
+        while dst < out_len:
+            if nbits < token_width:
+                # 一次补 3 字节，足够任意宽度 (<=24) 的一个 token
+                take = min(3, n_in - pos)
+                if take > 0:
+                    acc = (acc << (take * 8)) | int.from_bytes(data[pos:pos + take], 'big')
+                    pos += take
+                    nbits += take * 8
+                if nbits < token_width:
+                    break
+            nbits -= token_width
+            token = acc >> nbits
+            acc &= (1 << nbits) - 1
+            if token == 0x100:
+                break
+            elif token == 0x101:
+                token_width += 1
+                if token_width > 24:
+                    raise ValueError("Invalid compressed stream (Token Width > 24)")
+            elif token == 0x102:
+                token_width = 9
+                dict_pos = 0
+            else:
+                if dict_pos >= dict_size:
+                    raise ValueError("Invalid compressed stream (Dict Full)")
+                lzw_dict[dict_pos] = dst
+                dict_pos += 1
+                if token < 0x100:
+                    output[dst] = token
+                    dst += 1
+                    continue
+                token -= 0x103
+                if token >= dict_pos:
+                    raise ValueError("Invalid compressed stream (Token out of bounds)")
+                src = lzw_dict[token]
+                ref_next = lzw_dict[token + 1] if token + 1 < dict_size else 0
+                if src >= out_len:
+                    raise ValueError("Dict reference out of bounds")
+                count = min(out_len - dst, ref_next - src + 1)
+                if count < 0:
+                    raise ValueError(f"Invalid count: {count}")
+                end = src + count
+                if end <= dst:
+                    output[dst:dst + count] = output[src:end]
+                elif src < dst:
+                    # 源与目标重叠：按周期 dst-src 重复已有数据
+                    period = dst - src
+                    output[dst:dst + count] = (output[src:dst] * (count // period + 1))[:count]
+                dst += count
+
+class LzwEncoder:
+    """生成 LzwDecoder 可读的 LZW 码流 (不含 acp 头)"""
+    def __init__(self, data: bytes):
+        self.data = bytes(data)
+
+    def pack(self) -> bytes:
+        data = self.data
+        out = bytearray()
+        acc = 0
+        nbits = 0
+        width = 9
+
+        def emit(code):
+            nonlocal acc, nbits, width
+            # 码值超出当前位宽时先发 0x101 通知解码器加宽
+            while code >= (1 << width):
+                acc = (acc << width) | 0x101
+                nbits += width
+                width += 1
+            acc = (acc << width) | code
+            nbits += width
+            if nbits >= 32:
+                nbits -= 32
+                out.extend((acc >> nbits).to_bytes(4, 'big'))
+                acc &= (1 << nbits) - 1
+
+        if data:
+            table = {}
+            ntok = 0
+            w = data[0]
+            for c in data[1:]:
+                key = (w << 8) | c
+                nxt = table.get(key)
+                if nxt is not None:
+                    w = nxt
+                    continue
+                emit(w)
+                table[key] = 0x103 + ntok
+                ntok += 1
+                if ntok >= LZW_DICT_SIZE:
+                    emit(0x102)
+                    width = 9
+                    table.clear()
+                    ntok = 0
+                w = c
+            emit(w)
+        emit(0x100)
+        while nbits >= 8:
+            nbits -= 8
+            out.append((acc >> nbits) & 0xFF)
+        if nbits:
+            out.append((acc << (8 - nbits)) & 0xFF)
+        return bytes(out)
+
+def _compress_file(path: str) -> bytes:
+    """进程池任务：读取并压缩单个文件，压缩无收益时返回原始数据"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    packed = EscudeManager.compress(content)
+    return packed if len(packed) < len(content) else content
+
+@dataclass
+class BinEntry:
+    n_offset: int
+    d_offset: int
+    length: int
+
+    @staticmethod
+    def struct_fmt() -> str:
+        return "<3I"
+
+    @staticmethod
+    def size() -> int:
+        return struct.calcsize(BinEntry.struct_fmt())
+
+@dataclass
+class BinHeader:
+    file_count: int
+    name_tbl_len: int
+    entries: List[BinEntry]
+
+    @staticmethod
+    def parse(data: bytes) -> 'BinHeader':
+        fmt_head = "<2I"
+        head_size = struct.calcsize(fmt_head)
+        file_count, name_tbl_len = struct.unpack_from(fmt_head, data, 0)
+        entries = []
+        offset = head_size
+        entry_size = BinEntry.size()
+        entry_fmt = BinEntry.struct_fmt()
+        for _ in range(file_count):
+            n_off, d_off, ln = struct.unpack_from(entry_fmt, data, offset)
+            entries.append(BinEntry(n_off, d_off, ln))
+            offset += entry_size
+        return BinHeader(file_count, name_tbl_len, entries)
+
+    def pack(self) -> bytes:
+        out = bytearray()
+        out.extend(struct.pack("<2I", self.file_count, self.name_tbl_len))
+        for entry in self.entries:
+            out.extend(struct.pack(BinEntry.struct_fmt(), entry.n_offset, entry.d_offset, entry.length))
+        return bytes(out)
+
+def _copy_range(src_f, dst_f, src_offset: int, dst_offset: int, length: int, chunk_size: int = 1 << 20):
+    """把 src_f 中的一段复制到 dst_f 的指定位置：优先 copy_file_range/sendfile，
+    平台不支持时回退为分块读写。结束后 dst_f 定位在写入末尾"""
+    dst_f.flush()
+    src_fd, dst_fd = src_f.fileno(), dst_f.fileno()
+    done = 0
+    for name in ('copy_file_range', 'sendfile'):
+        fn = getattr(os, name, None)
+        if fn is None or done >= length:
+            continue
+        try:
+            while done < length:
+                if name == 'copy_file_range':
+                    n = fn(src_fd, dst_fd, length - done, src_offset + done, dst_offset + done)
+                else:
+                    os.lseek(dst_fd, dst_offset + done, os.SEEK_SET)
+                    n = fn(dst_fd, src_fd, src_offset + done, length - done)
+                if n <= 0:
+                    break
+                done += n
+        except OSError:
+            pass
+    if done < length:
+        src_f.seek(src_offset + done)
+        dst_f.seek(dst_offset + done)
+        while done < length:
+            chunk = src_f.read(min(chunk_size, length - done))
+            if not chunk:
+                raise ValueError("源档案数据不完整")
+            dst_f.write(chunk)
+            done += len(chunk)
+        dst_f.flush()
+    dst_f.seek(dst_offset + length)
+
+class ArchiveWriter:
+    """流式写出 ESC-ARC2：先为文件表占位，数据写完后回填加密的文件表
+    dedup 时边写边计算哈希，内容相同的条目只写一次，其余条目指向第一份数据 (共享 d_offset)"""
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, out_f, names: List[str], dedup: bool = False):
+        self.out_f = out_f
+        self.dedup = dedup
+        self.aliases = {}   # 重复条目 -> 首个相同条目
+        self._blobs = {}    # (长度, 哈希) -> 首个写入该内容的条目
+        self.dedup_bytes = 0
+        name_blob = bytearray()
+        self.entries = []
+        for name in names:
+            try:
+                enc_name = name.encode(SHIFT_JIS)
+            except UnicodeEncodeError:
+                enc_name = name.encode(SHIFT_JIS, errors='replace')
+            self.entries.append(BinEntry(n_offset=len(name_blob), d_offset=0, length=0))
+            name_blob.extend(enc_name)
+            name_blob.append(0)
+        self.name_blob = bytes(name_blob)
+        header_struct_size = 8 + (len(names) * 12)
+        out_f.write(b'ESC-ARC2')
+        out_f.write(b'\x00' * (4 + header_struct_size))
+        out_f.write(self.name_blob)
+        self.pos = 0xC + header_struct_size + len(self.name_blob)
+        self.end = self.pos
+
+    def alias(self, idx: int, first: int):
+        """让 idx 与 first 共用同一份数据，first 可以稍后才写入"""
+        self.aliases[idx] = first
+
+    def _dedup_key(self, idx: int, key) -> bool:
+        """登记刚写完的内容；已有相同内容时把 idx 记为重复并返回 True"""
+        first = self._blobs.setdefault(key, idx)
+        if first == idx:
+            return False
+        self.alias(idx, first)
+        self.dedup_bytes += key[0]
+        return True
+
+    def add_bytes(self, idx: int, blob: bytes):
+        if self.dedup and self._dedup_key(idx, (len(blob), hashlib.blake2b(blob, digest_size=16).digest())):
+            return
+        entry = self.entries[idx]
+        entry.d_offset = self.pos
+        entry.length = len(blob)
+        self.out_f.write(blob)
+        self.pos += len(blob)
+        self.end = max(self.end, self.pos)
+
+    def add_file(self, idx: int, path: str):
+        entry = self.entries[idx]
+        entry.d_offset = self.pos
+        length = 0
+        h = hashlib.blake2b(digest_size=16) if self.dedup else None
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.out_f.write(chunk)
+                if h is not None:
+                    h.update(chunk)
+                length += len(chunk)
+        self.end = max(self.end, self.pos + length)
+        if h is not None and self._dedup_key(idx, (length, h.digest())):
+            # 重复内容：退回写入位置，后续数据覆盖这一段
+            self.out_f.seek(self.pos)
+            return
+        entry.length = length
+        self.pos += length
+
+    def add_run(self, src_f, run):
+        """原样复制源档案中一段连续的数据，run 为按偏移排好的 [(idx 列表, 源偏移, 长度), ...]"""
+        start = run[0][1]
+        length = run[-1][1] + run[-1][2] - start
+        _copy_range(src_f, self.out_f, start, self.pos, length, self.CHUNK_SIZE)
+        for indices, src_offset, size in run:
+            for idx in indices:
+                entry = self.entries[idx]
+                entry.d_offset = self.pos + (src_offset - start)
+                entry.length = size
+        self.pos += length
+
+    def finish(self):
+        for idx, first in self.aliases.items():
+            while first in self.aliases:
+                first = self.aliases[first]
+            self.entries[idx].d_offset = self.entries[first].d_offset
+            self.entries[idx].length = self.entries[first].length
+        if self.end > self.pos:
+            # 最后写入的重复内容留下的尾部
+            self.out_f.truncate(self.pos)
+        header_bytes = BinHeader(len(self.entries), len(self.name_blob), self.entries).pack()
+        key_int = random.getrandbits(32)
+        encrypted_header = EscudeCrypto(key_int).encrypt(header_bytes)
+        self.out_f.seek(8)
+        self.out_f.write(struct.pack('<I', key_int))
+        self.out_f.write(encrypted_header)
+        self.out_f.seek(self.pos)
+
+def _output_mode(path: str) -> int:
+    """新输出文件应有的权限：目标已存在时沿用其权限，否则与 open() 新建文件一致 (0o666 & ~umask)"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+@contextmanager
+def open_output(path: str, atomic: bool = False):
+    """打开输出文件；atomic 时先写入同目录临时文件，成功后原子替换目标
+    mkstemp 建的临时文件固定为 0600，替换前改成目标应有的权限"""
+    if not atomic:
+        with open(path, 'wb') as f:
+            yield f
+        return
+    out_dir = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=out_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.chmod(tmp_path, _output_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _stream_entries(writer: ArchiveWriter, plain_jobs, compress_jobs, workers=None,
+                    max_inflight=None, on_written=None):
+    """写出条目：plain_jobs 为 (idx, 写入函数)，在当前线程依次执行；
+    compress_jobs 为 (idx, 路径)，在进程池中压缩，完成即写，在途任务数有上限"""
+    def written(idx):
+        if on_written:
+            on_written(idx)
+
+    if workers == 1 or len(compress_jobs) <= 1:
+        for idx, job in plain_jobs:
+            job()
+            written(idx)
+        for idx, path in compress_jobs:
+            writer.add_bytes(idx, _compress_file(path))
+            written(idx)
+        return
+    workers = workers or os.cpu_count() or 1
+    max_inflight = max_inflight or workers * 2
+    queue = iter(compress_jobs)
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def fill():
+            while len(pending) < max_inflight:
+                item = next(queue, None)
+                if item is None:
+                    break
+                pending[pool.submit(_compress_file, item[1])] = item[0]
+
+        def drain(futures):
+            for fut in futures:
+                idx = pending.pop(fut)
+                writer.add_bytes(idx, fut.result())
+                written(idx)
+
+        fill()
+        for idx, job in plain_jobs:
+            job()
+            written(idx)
+            drain([f for f in pending if f.done()])
+            fill()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            drain(finished)
+            fill()
+
+class _ArchiveEntryReader(RawIOBase):
+    """档案条目的只读文件对象：未压缩条目直接从映射读取，acp 条目在首次读取时解压"""
+
+    def __init__(self, mm, d_offset: int, length: int):
+        super().__init__()
+        self._mm = mm
+        self._start = d_offset
+        self._length = length
+        self._raw_length = length
+        self._data = None
+        self._pos = 0
+        if mm[d_offset:d_offset + 4] == b'acp\x00':
+            self._length = -1
+
+    def _ensure(self):
+        if self._length == -1:
+            self._data = EscudeManager.decompress(self._mm[self._start:self._start + self._raw_length])
+            self._length = len(self._data)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        self._ensure()
+        n = max(0, min(len(b), self._length - self._pos))
+        if self._data is not None:
+            b[:n] = self._data[self._pos:self._pos + n]
+        else:
+            b[:n] = self._mm[self._start + self._pos:self._start + self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=0):
+        self._ensure()
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            offset += self._length
+        if offset < 0:
+            raise ValueError("负的偏移")
+        self._pos = offset
+        return offset
+
+    def tell(self):
+        return self._pos
+
+class EscudeArchive:
+    """ESC-ARC2 随机访问：文件表只解密一次，按名称读取单个条目
+    旁路索引 (<档案>.idx) 以档案的修改时间和大小为键，重新打开时跳过解密"""
+    SIGNATURE = b'ESC-ARC2'
+    INDEX_SUFFIX = '.idx'
+    INDEX_VERSION = 1
+
+    def __init__(self, path: str, use_index: bool = True):
+        self.path = path
+        self._f = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._mm[:8] != self.SIGNATURE:
+                raise ValueError("不是 ESC-ARC2 资源包")
+            st = os.fstat(self._f.fileno())
+            stamp = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+            cached = self._load_index(stamp) if use_index else None
+            if cached:
+                self.header, self.names = cached
+            else:
+                self.header, self.names = EscudeManager.read_index(self._mm)
+                if use_index:
+                    self._save_index(stamp)
+        except BaseException:
+            self.close()
+            raise
+        self._lookup = {}
+        for idx, name in enumerate(self.names):
+            self._lookup.setdefault(self._key(name), idx)
+
+    @staticmethod
+    def is_archive(path: str) -> bool:
+        if not os.path.isfile(path):
+            return False
+        with open(path, 'rb') as f:
+            return f.read(8) == EscudeArchive.SIGNATURE
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return name.replace('\\', '/').lower()
+
+    def _load_index(self, stamp):
+        try:
+            with open(self.path + self.INDEX_SUFFIX, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != self.INDEX_VERSION or data.get('stamp') != stamp:
+            return None
+        entries = [BinEntry(n, d, l) for n, d, l in data['entries']]
+        return BinHeader(len(entries), data['name_tbl_len'], entries), data['names']
+
+    def _save_index(self, stamp):
+        data = {
+            'version': self.INDEX_VERSION,
+            'stamp': stamp,
+            'name_tbl_len': self.header.name_tbl_len,
+            'names': self.names,
+            'entries': [[e.n_offset, e.d_offset, e.length] for e in self.header.entries],
+        }
+        try:
+            with open(self.path + self.INDEX_SUFFIX, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        except OSError:
+            pass
+
+    def list(self) -> List[str]:
+        return list(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return self._key(name) in self._lookup
+
+    def entry(self, name: str) -> BinEntry:
+        idx = self._lookup.get(self._key(name))
+        if idx is None:
+            raise KeyError(name)
+        return self.header.entries[idx]
+
+    def open(self, name: str) -> _ArchiveEntryReader:
+        entry = self.entry(name)
+        return _ArchiveEntryReader(self._mm, entry.d_offset, entry.length)
+
+    def read(self, name: str) -> bytes:
+        entry = self.entry(name)
+        content = self._mm[entry.d_offset:entry.d_offset + entry.length]
+        if content.startswith(b'acp\x00'):
+            content = EscudeManager.decompress(content)
+        return content
+
+    def close(self):
+        mm, self._mm = getattr(self, '_mm', None), None
+        if mm is not None:
+            mm.close()
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ESC-ARC2 补丁：PATCH_MAGIC | 头 | 操作表 | 补丁数据
+# 操作按顺序拼出整个目标档案：从原档案复制一段，或取补丁数据中的一段
+PATCH_MAGIC = b'ESCPATCH'
+PATCH_VERSION = 1
+PATCH_HEAD_FMT = '<IQQ16s16sI'  # 版本, 原档案大小, 目标大小, 原档案文件表哈希, 目标哈希, 操作数
+PATCH_OP_FMT = '<BQQ'           # 类型, 源偏移, 长度
+PATCH_OP_COPY = 0
+PATCH_OP_DATA = 1
+
+def _archive_data_start(header: BinHeader) -> int:
+    """签名、密钥、文件表和名称表之后第一个数据字节的位置"""
+    return 0xC + 8 + header.file_count * 12 + header.name_tbl_len
+
+def _range_digest(mm, offset: int, length: int) -> bytes:
+    with memoryview(mm)[offset:offset + length] as view:
+        return hashlib.blake2b(view, digest_size=16).digest()
+
+_mapped_archives = {}
+
+def _extract_entries(source, jobs) -> int:
+    """解包任务：从映射中取出一批条目，解压并写出，返回处理的条目数
+    source 为 mmap 对象，或在子进程中为档案路径 (每个进程只映射一次)"""
+    if isinstance(source, str):
+        mm = _mapped_archives.get(source)
+        if mm is None:
+            with open(source, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            _mapped_archives[source] = mm
+    else:
+        mm = source
+    for d_offset, length, out_path in jobs:
+        content = mm[d_offset:d_offset + length]
+        if content.startswith(b'acp\x00'):
+            content = EscudeManager.decompress(content)
+        with open(out_path, 'wb') as out_f:
+            out_f.write(content)
+    return len(jobs)
+
+def _run_file_jobs(fn, jobs, on_result, workers=None, max_inflight=None, cancelled=None) -> bool:
+    """按文件并行执行：jobs 为 (名称, 参数元组)，fn(*参数) 在进程池中运行，
+    每完成一个即回调 on_result(名称, 结果, 异常)。cancelled() 为真时停止提交并返回 False"""
+    def stop():
+        return cancelled is not None and cancelled()
+
+    if workers == 1 or len(jobs) <= 1:
+        for name, args in jobs:
+            if stop():
+                return False
+            try:
+                on_result(name, fn(*args), None)
+            except Exception as e:
+                on_result(name, None, e)
+        return True
+    workers = workers or os.cpu_count() or 1
+    max_inflight = max_inflight or workers * 2
+    queue = iter(jobs)
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            while not stop() and len(pending) < max_inflight:
+                item = next(queue, None)
+                if item is None:
+                    break
+                pending[pool.submit(fn, *item[1])] = item[0]
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = pending.pop(fut)
+                try:
+                    on_result(name, fut.result(), None)
+                except Exception as e:
+                    on_result(name, None, e)
+    return not stop()
+
+def _is_up_to_date(out_path: str, *inputs: str) -> bool:
+    """输出文件存在且不早于所有输入文件"""
+    try:
+        out_mtime = os.stat(out_path).st_mtime_ns
+        return all(os.stat(p).st_mtime_ns <= out_mtime for p in inputs)
+    except OSError:
+        return False
+
+def _escr_extract_one(bin_path: str, txt_path: str) -> int:
+    strings, context = EscudeManager.load_script(bin_path)
+    with open(txt_path, 'w', encoding='utf-8') as out_f:
+        for i, s in enumerate(strings):
+            out_f.write(f"◇{i:06d}◇{s}\n")
+            out_f.write(f"◆{i:06d}◆{s}\n\n")
+    return len(strings)
+
+def _escr_pack_one(txt_path: str, template_path: str, out_path: str) -> int:
+    strings, context = EscudeManager.load_script(template_path)
+    new_strings = {}
+    with open(txt_path, 'r', encoding='utf-8') as in_f:
+        for line in in_f:
+            line = line.rstrip('\n\r')
+            if line.startswith('◆') and '◆' in line[1:]:
+                parts = line.split('◆')
+                if len(parts) >= 3:
+                    try:
+                        idx = int(parts[1])
+                        text = '◆'.join(parts[2:])
+                        new_strings[idx] = text
+                    except ValueError:
+                        continue
+    for idx, text in new_strings.items():
+        if 0 <= idx < len(strings):
+            strings[idx] = text
+    EscudeManager.save_script(out_path, strings, context)
+    return len(new_strings)
+
+class EscudeManager:
+    # 每个解包任务最多携带的条目数 / 存储字节数
+    EXTRACT_BATCH_FILES = 64
+    EXTRACT_BATCH_BYTES = 8 << 20
+    # ESCR 脚本中的半角字符与显示用全角字符一一对应，转换表在导入时建好
+    SCRIPT_HALF = "!?｡｢｣､･ｦｧｨｩｪｫｬｭｮｯｰｱｲｳｴｵｶｷｸｹｺｻｼｽｾｿﾀﾁﾂﾃﾄﾅﾆﾇﾈﾉﾊﾋﾌﾍﾎﾏﾐﾑﾒﾓﾔﾕﾖﾗﾘﾙﾚﾛﾜﾝﾞﾟ"
+    SCRIPT_FULL = "！？。「」、…をぁぃぅぇぉゃゅょっーあいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわん゛゜"
+    SCRIPT_DECODE_TABLE = str.maketrans(SCRIPT_HALF, SCRIPT_FULL)
+    SCRIPT_ENCODE_TABLE = str.maketrans(SCRIPT_FULL, SCRIPT_HALF)
+    # 批量解码时超过该字符数改用 NumPy 查表 (按 UTF-32 码位)
+    SCRIPT_NUMPY_MIN_CHARS = 1 << 14
+    _script_decode_lut = None
+
+    @staticmethod
+    def read_index(buf) -> Tuple[BinHeader, List[str]]:
+        """从档案开头 (bytes/mmap) 解密文件表，并一次性切出名称表解析所有文件名"""
+        raw_key = struct.unpack_from('<I', buf, 0x8)[0]
+        decryption_key = EscudeCrypto(raw_key).key
+        file_count = struct.unpack_from('<I', buf, 0xC)[0] ^ decryption_key
+        header_size = (file_count * 12) + 8
+        header_data = EscudeCrypto(raw_key).decrypt(buf[0xC:0xC + header_size])
+        bin_header = BinHeader.parse(header_data)
+        name_table_start = 0xC + header_size
+        name_table = buf[name_table_start:name_table_start + bin_header.name_tbl_len]
+        names = []
+        for entry in bin_header.entries:
+            end = name_table.find(b'\x00', entry.n_offset)
+            if end == -1:
+                end = len(name_table)
+            names.append(name_table[entry.n_offset:end].decode(SHIFT_JIS, errors='replace'))
+        return bin_header, names
+
+    @staticmethod
+    def unpack_archive(file_path: str, output_dir: str, logger=print, progress=None,
+                       workers=None, max_inflight=None):
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            bin_header, names = EscudeManager.read_index(mm)
+            os.makedirs(output_dir, exist_ok=True)
+            batches = []
+            jobs, batch_bytes = [], 0
+            out_dirs = set()
+            for entry, file_name in zip(bin_header.entries, names):
+                out_path = os.path.join(output_dir, file_name)
+                out_dirs.add(os.path.dirname(out_path) or output_dir)
+                jobs.append((entry.d_offset, entry.length, out_path))
+                batch_bytes += entry.length
+                if len(jobs) >= EscudeManager.EXTRACT_BATCH_FILES or batch_bytes >= EscudeManager.EXTRACT_BATCH_BYTES:
+                    batches.append(jobs)
+                    jobs, batch_bytes = [], 0
+            if jobs:
+                batches.append(jobs)
+            for d in out_dirs:
+                os.makedirs(d, exist_ok=True)
+
+            total = len(names)
+            extracted = 0
+            last_pct = -1
+
+            def report(n):
+                nonlocal extracted, last_pct
+                extracted += n
+                pct = extracted * 100 // total if total else 100
+                if progress and pct != last_pct:
+                    progress(pct)
+                    last_pct = pct
+
+            workers = workers or os.cpu_count() or 1
+            if workers == 1 or len(batches) <= 1:
+                for jobs in batches:
+                    report(_extract_entries(mm, jobs))
+            else:
+                # 在途任务数有上限，避免一次性把所有批次排进队列
+                max_inflight = max_inflight or workers * 2
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    pending = set()
+                    for jobs in batches:
+                        if len(pending) >= max_inflight:
+                            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for fut in finished:
+                                report(fut.result())
+                        pending.add(pool.submit(_extract_entries, file_path, jobs))
+                    for fut in pending:
+                        report(fut.result())
+        logger(f"完成! 共解包 {extracted} 个文件到 {output_dir}")
+        return bin_header
+
+    @staticmethod
+    def decompress(data: bytes) -> bytes:
+        if len(data) < 8:
+            return data
+        magic = data[0:4]
+        if magic != b'acp\x00':
+            return data
+        unpacked_len = struct.unpack('>I', data[4:8])[0]
+        decoder = LzwDecoder(data[8:], unpacked_len)
+        decoder.unpack()
+        return decoder.output
+
+    @staticmethod
+    def compress(data: bytes) -> bytes:
+        return b'acp\x00' + struct.pack('>I', len(data)) + LzwEncoder(data).pack()
+
+    @staticmethod
+    def normalize_exts(exts):
+        if not exts:
+            return None
+        return {e.lower() if e.startswith('.') else '.' + e.lower() for e in exts}
+
+    @staticmethod
+    def should_compress(rel_path: str, size: int, compress_exts=None, compress_min_size=None) -> bool:
+        """按扩展名或大小阈值决定条目是否压缩"""
+        if compress_exts and os.path.splitext(rel_path)[1].lower() in compress_exts:
+            return True
+        return compress_min_size is not None and size >= compress_min_size
+
+    @staticmethod
+    def pack_archive(folder_path: str, output_file: str, logger=print,
+                     compress_exts=None, compress_min_size=None, workers=None,
+                     progress=None, atomic=False, max_inflight=None, dedup=False):
+        """dedup 时内容相同的文件只写一份，各条目共用同一 d_offset"""
+        # 第一遍：只收集文件名和大小 (os.stat)，不读取内容
+        files = []
+        for root, dirs, filenames in os.walk(folder_path):
+            for filename in filenames:
+                if filename == "FileList.lst":
+                    continue
+                full_path = os.path.join(root, filename)
+                rel_path = os.path.relpath(full_path, folder_path)
+                files.append((rel_path, full_path, os.stat(full_path).st_size))
+        compress_exts = EscudeManager.normalize_exts(compress_exts)
+        to_compress = []
+        to_copy = []
+        for idx, (rel_path, _, size) in enumerate(files):
+            if EscudeManager.should_compress(rel_path, size, compress_exts, compress_min_size):
+                to_compress.append(idx)
+            else:
+                to_copy.append(idx)
+
+        total = len(files)
+        written = 0
+        last_pct = -1
+
+        def report(idx):
+            nonlocal written, last_pct
+            written += 1
+            pct = written * 100 // total
+            if progress and pct != last_pct:
+                progress(pct)
+                last_pct = pct
+
+        # 去重时先对大小相同的待压缩文件求哈希，重复的文件不再重复压缩
+        compress_dups = {}
+        if dedup and len(to_compress) > 1:
+            by_size = {}
+            for idx in to_compress:
+                by_size.setdefault(files[idx][2], []).append(idx)
+            first_by_digest = {}
+            for size, group in by_size.items():
+                if len(group) < 2:
+                    continue
+                for idx in group:
+                    first = first_by_digest.setdefault((size, _file_digest(files[idx][1])), idx)
+                    if first != idx:
+                        compress_dups[idx] = first
+            to_compress = [idx for idx in to_compress if idx not in compress_dups]
+
+        if to_compress:
+            logger(f"压缩 {len(to_compress)} 个条目...")
+        # 第二遍：逐个文件分块写出，压缩条目在进程池中并行处理，完成即写
+        with open_output(output_file, atomic) as out_f:
+            writer = ArchiveWriter(out_f, [rel_path for rel_path, _, _ in files], dedup=dedup)
+            plain_jobs = [(idx, lambda idx=idx: writer.add_file(idx, files[idx][1])) for idx in to_copy]
+            compress_jobs = [(idx, files[idx][1]) for idx in to_compress]
+            for idx, first in compress_dups.items():
+                writer.alias(idx, first)
+                report(idx)
+            _stream_entries(writer, plain_jobs, compress_jobs, workers, max_inflight, on_written=report)
+            writer.finish()
+        if to_compress:
+            raw_total = sum(files[i][2] for i in to_compress)
+            packed_total = sum(writer.entries[i].length for i in to_compress)
+            logger(f"压缩完成: {raw_total:,} -> {packed_total:,} 字节")
+        if dedup:
+            dup_bytes = writer.dedup_bytes + sum(writer.entries[i].length for i in compress_dups)
+            logger(f"去重: {len(writer.aliases)} 个重复条目，节省 {dup_bytes:,} 字节")
+        logger(f"完成! 共打包 {len(files)} 个文件到 {output_file}")
+
+    @staticmethod
+    def update_archive(archive_path: str, replace_dir: str, output_file: str, logger=print,
+                       compress_exts=None, compress_min_size=None, workers=None,
+                       progress=None, atomic=True, max_inflight=None):
+        """增量更新：未替换的条目从原档案原样复制 (保持压缩)，
+        只有替换目录中出现的文件重新编码写入，不在原档案中的文件追加为新条目"""
+        if os.path.abspath(archive_path) == os.path.abspath(output_file):
+            atomic = True
+        compress_exts = EscudeManager.normalize_exts(compress_exts)
+        replacements = {}
+        for root, dirs, filenames in os.walk(replace_dir):
+            for filename in filenames:
+                if filename == "FileList.lst":
+                    continue
+                full_path = os.path.join(root, filename)
+                rel_path = os.path.relpath(full_path, replace_dir)
+                replacements[rel_path.replace('\\', '/').lower()] = (rel_path, full_path)
+
+        with open(archive_path, 'rb') as src_f, mmap.mmap(src_f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            bin_header, names = EscudeManager.read_index(mm)
+
+            out_names = list(names)
+            reuse = {}
+            rewrite = []
+            for idx, (name, entry) in enumerate(zip(names, bin_header.entries)):
+                repl = replacements.pop(name.replace('\\', '/').lower(), None)
+                if repl is None:
+                    reuse.setdefault((entry.d_offset, entry.length), []).append(idx)
+                else:
+                    was_packed = mm[entry.d_offset:entry.d_offset + 4] == b'acp\x00'
+                    rewrite.append((idx, repl[1], was_packed))
+            for key in sorted(replacements):
+                rel_path, full_path = replacements[key]
+                rewrite.append((len(out_names), full_path, False))
+                out_names.append(rel_path)
+            added = len(out_names) - len(names)
+
+            # 源档案中首尾相接的未修改条目合并为一次批量复制
+            runs = []
+            for (d_offset, length), indices in sorted(reuse.items()):
+                if runs and runs[-1][-1][1] + runs[-1][-1][2] == d_offset:
+                    runs[-1].append((indices, d_offset, length))
+                else:
+                    runs.append([(indices, d_offset, length)])
+
+            total = len(out_names)
+            written = 0
+            last_pct = -1
+
+            def report(n=1):
+                nonlocal written, last_pct
+                written += n
+                pct = written * 100 // total if total else 100
+                if progress and pct != last_pct:
+                    progress(pct)
+                    last_pct = pct
+
+            with open_output(output_file, atomic) as out_f:
+                writer = ArchiveWriter(out_f, out_names)
+                plain_jobs = [(run[0][0][0], lambda run=run: writer.add_run(src_f, run)) for run in runs]
+                compress_jobs = []
+                for idx, full_path, was_packed in rewrite:
+                    if was_packed or EscudeManager.should_compress(out_names[idx], os.stat(full_path).st_size,
+                                                                   compress_exts, compress_min_size):
+                        compress_jobs.append((idx, full_path))
+                    else:
+                        plain_jobs.append((idx, lambda idx=idx, p=full_path: writer.add_file(idx, p)))
+                run_sizes = {run[0][0][0]: sum(len(indices) for indices, _, _ in run) for run in runs}
+                _stream_entries(writer, plain_jobs, compress_jobs, workers, max_inflight,
+                                on_written=lambda idx: report(run_sizes.get(idx, 1)))
+                writer.finish()
+
+        reused = sum(length for (_, length) in reuse)
+        rewritten = sum(writer.entries[idx].length for idx, _, _ in rewrite)
+        logger(f"复用 {sum(len(v) for v in reuse.values())} 个条目 ({reused:,} 字节)，"
+               f"重写 {len(rewrite) - added} 个、新增 {added} 个条目 ({rewritten:,} 字节)")
+        logger(f"完成! 已更新到 {output_file}")
+        return {'reused_bytes': reused, 'rewritten_bytes': rewritten,
+                'reused_entries': sum(len(v) for v in reuse.values()),
+                'rewritten_entries': len(rewrite) - added, 'added_entries': added}
+
+    @staticmethod
+    def diff_archive(base_path: str, target_path: str, patch_path: str, logger=print):
+        """比较两个 ESC-ARC2 档案生成补丁：长度和哈希与原档案某个条目相同的条目只记录复制位置，
+        文件表和修改、新增的条目写入补丁数据"""
+        with open(base_path, 'rb') as base_f, mmap.mmap(base_f.fileno(), 0, access=mmap.ACCESS_READ) as base_mm, \
+                open(target_path, 'rb') as tgt_f, mmap.mmap(tgt_f.fileno(), 0, access=mmap.ACCESS_READ) as tgt_mm:
+            base_header, _ = EscudeManager.read_index(base_mm)
+            tgt_header, _ = EscudeManager.read_index(tgt_mm)
+            tgt_ranges = sorted({(e.d_offset, e.length) for e in tgt_header.entries if e.length})
+            # 只对另一边出现过的长度求哈希
+            tgt_lengths = {length for _, length in tgt_ranges}
+            base_by_key = {}
+            for e in base_header.entries:
+                if e.length in tgt_lengths:
+                    base_by_key.setdefault((e.length, _range_digest(base_mm, e.d_offset, e.length)), e.d_offset)
+            base_lengths = {length for length, _ in base_by_key}
+
+            ops = []
+
+            def emit(kind, src, length):
+                if ops and ops[-1][0] == kind and ops[-1][1] + ops[-1][2] == src:
+                    ops[-1][2] += length
+                else:
+                    ops.append([kind, src, length])
+
+            copied = {}
+            cursor = 0
+            for d_offset, length in tgt_ranges:
+                end = d_offset + length
+                if end > len(tgt_mm):
+                    raise ValueError("目标档案数据不完整")
+                if end <= cursor:
+                    continue
+                if d_offset < cursor:
+                    # 与前一条目部分重叠，剩余部分按新数据处理
+                    emit(PATCH_OP_DATA, cursor, end - cursor)
+                    cursor = end
+                    continue
+                if d_offset > cursor:
+                    emit(PATCH_OP_DATA, cursor, d_offset - cursor)
+                src = None
+                if length in base_lengths:
+                    src = base_by_key.get((length, _range_digest(tgt_mm, d_offset, length)))
+                if src is None:
+                    emit(PATCH_OP_DATA, d_offset, length)
+                else:
+                    emit(PATCH_OP_COPY, src, length)
+                    copied[(d_offset, length)] = src
+                cursor = end
+            if cursor < len(tgt_mm):
+                emit(PATCH_OP_DATA, cursor, len(tgt_mm) - cursor)
+
+            base_id = _range_digest(base_mm, 0, _archive_data_start(base_header))
+            tgt_digest = hashlib.blake2b(tgt_mm, digest_size=16).digest()
+            with open_output(patch_path, atomic=True) as out_f:
+                out_f.write(PATCH_MAGIC)
+                out_f.write(struct.pack(PATCH_HEAD_FMT, PATCH_VERSION, len(base_mm), len(tgt_mm),
+                                        base_id, tgt_digest, len(ops)))
+                data_pos = 0
+                for kind, src, length in ops:
+                    if kind == PATCH_OP_DATA:
+                        out_f.write(struct.pack(PATCH_OP_FMT, kind, data_pos, length))
+                        data_pos += length
+                    else:
+                        out_f.write(struct.pack(PATCH_OP_FMT, kind, src, length))
+                pos = out_f.tell()
+                for kind, src, length in ops:
+                    if kind == PATCH_OP_DATA:
+                        _copy_range(tgt_f, out_f, src, pos, length)
+                        pos += length
+                patch_size = pos
+            target_size = len(tgt_mm)
+
+        unchanged = sum(1 for e in tgt_header.entries if (e.d_offset, e.length) in copied or not e.length)
+        copied_bytes = sum(length for kind, _, length in ops if kind == PATCH_OP_COPY)
+        logger(f"未变化 {unchanged} 个条目 ({copied_bytes:,} 字节)，"
+               f"变化或新增 {len(tgt_header.entries) - unchanged} 个条目，补丁数据 {data_pos:,} 字节")
+        logger(f"完成! 补丁 {patch_size:,} 字节 (目标档案 {target_size:,} 字节) 已保存到 {patch_path}")
+        return {'unchanged_entries': unchanged, 'changed_entries': len(tgt_header.entries) - unchanged,
+                'copied_bytes': copied_bytes, 'patch_bytes': data_pos, 'patch_size': patch_size}
+
+    @staticmethod
+    def apply_patch(base_path: str, patch_path: str, output_file: str, logger=print,
+                    progress=None, atomic=True, verify=True):
+        """用补丁从原档案重建目标档案：复制段直接从原档案批量复制，其余数据从补丁复制
+        verify 时先按操作顺序对源数据求哈希，与目标一致才开始写出"""
+        if os.path.abspath(base_path) == os.path.abspath(output_file):
+            atomic = True
+        head_size = len(PATCH_MAGIC) + struct.calcsize(PATCH_HEAD_FMT)
+        op_size = struct.calcsize(PATCH_OP_FMT)
+        with open(patch_path, 'rb') as patch_f, open(base_path, 'rb') as base_f, \
+                mmap.mmap(base_f.fileno(), 0, access=mmap.ACCESS_READ) as base_mm:
+            head = patch_f.read(head_size)
+            if len(head) < head_size or not head.startswith(PATCH_MAGIC):
+                raise ValueError("不是 ESC-ARC2 补丁")
+            version, base_size, target_size, base_id, tgt_digest, op_count = \
+                struct.unpack_from(PATCH_HEAD_FMT, head, len(PATCH_MAGIC))
+            if version != PATCH_VERSION:
+                raise ValueError(f"不支持的补丁版本: {version}")
+            table = patch_f.read(op_count * op_size)
+            if len(table) < op_count * op_size:
+                raise ValueError("补丁已损坏")
+            ops = list(struct.iter_unpack(PATCH_OP_FMT, table))
+            data_start = head_size + len(table)
+            if sum(length for _, _, length in ops) != target_size:
+                raise ValueError("补丁已损坏")
+
+            base_header, _ = EscudeManager.read_index(base_mm)
+            if len(base_mm) != base_size or _range_digest(base_mm, 0, _archive_data_start(base_header)) != base_id:
+                raise ValueError("原档案与补丁不匹配")
+            if verify:
+                h = hashlib.blake2b(digest_size=16)
+                with mmap.mmap(patch_f.fileno(), 0, access=mmap.ACCESS_READ) as patch_mm, \
+                        memoryview(base_mm) as base_view, memoryview(patch_mm) as patch_view:
+                    for kind, src, length in ops:
+                        if kind == PATCH_OP_COPY:
+                            h.update(base_view[src:src + length])
+                        else:
+                            h.update(patch_view[data_start + src:data_start + src + length])
+                if h.digest() != tgt_digest:
+                    raise ValueError("补丁校验失败，目标档案哈希不一致")
+
+            pos = 0
+            last_pct = -1
+            with open_output(output_file, atomic) as out_f:
+                for kind, src, length in ops:
+                    if kind == PATCH_OP_COPY:
+                        _copy_range(base_f, out_f, src, pos, length)
+                    else:
+                        _copy_range(patch_f, out_f, data_start + src, pos, length)
+                    pos += length
+                    pct = pos * 100 // target_size if target_size else 100
+                    if progress and pct != last_pct:
+                        progress(pct)
+                        last_pct = pct
+
+        copied_bytes = sum(length for kind, _, length in ops if kind == PATCH_OP_COPY)
+        logger(f"从原档案复制 {copied_bytes:,} 字节，从补丁写入 {target_size - copied_bytes:,} 字节")
+        logger(f"完成! 已生成 {output_file}")
+        return {'copied_bytes': copied_bytes, 'patch_bytes': target_size - copied_bytes}
+
+    @staticmethod
+    def load_script(path: str) -> Tuple[List[str], dict]:
+        with open(path, 'rb') as f:
+            data = f.read()
+        return EscudeManager.parse_script(data)
+
+    @staticmethod
+    def parse_script(data: bytes) -> Tuple[List[str], dict]:
+        if data[:8].decode('ascii', errors='ignore') != "ESCR1_00":
+            raise ValueError("无效的脚本签名 (需要 ESCR1_00)")
+        offset = 8
+        str_count = struct.unpack_from('<I', data, offset)[0]
+        offset += 4
+        str_offsets = struct.unpack_from(f'<{str_count}I', data, offset)
+        offset += str_count * 4
+        vm_len = struct.unpack_from('<I', data, offset)[0]
+        offset += 4
+        vm_data = data[offset : offset+vm_len]
+        offset += vm_len
+        unk1 = struct.unpack_from('<I', data, offset)[0]
+        offset += 4
+        string_table_start = offset
+        raw_strings = []
+        find = data.find
+        for rel_off in str_offsets:
+            abs_off = string_table_start + rel_off
+            end = find(b'\x00', abs_off)
+            raw_strings.append(data[abs_off:end if end != -1 else len(data)])
+        decoded_strings = EscudeManager.decode_script_strings(raw_strings)
+        context = {
+            'vm_data': vm_data,
+            'unk1': unk1,
+            'header_sig': b"ESCR1_00"
+        }
+        return decoded_strings, context
+
+    @staticmethod
+    def decode_script_string(text: str) -> str:
+        return text.translate(EscudeManager.SCRIPT_DECODE_TABLE)
+
+    @staticmethod
+    def encode_script_string(text: str) -> str:
+        return text.translate(EscudeManager.SCRIPT_ENCODE_TABLE)
+
+    @staticmethod
+    def decode_script_strings(raw_strings: List[bytes]) -> List[str]:
+        """批量解码整个脚本的字符串：逐条 Shift-JIS 解码后拼接，整体转换一次再切分"""
+        if not raw_strings:
+            return []
+        joined = '\x00'.join([raw.decode(SHIFT_JIS, errors='replace') for raw in raw_strings])
+        if HAS_NUMPY and len(joined) >= EscudeManager.SCRIPT_NUMPY_MIN_CHARS:
+            lut = EscudeManager._script_decode_lut
+            if lut is None:
+                lut = np.arange(0x10000, dtype=np.uint32)
+                for src, dst in EscudeManager.SCRIPT_DECODE_TABLE.items():
+                    lut[src] = dst
+                EscudeManager._script_decode_lut = lut
+            codes = np.frombuffer(joined.encode('utf-32-le'), dtype='<u4').copy()
+            bmp = codes < 0x10000
+            codes[bmp] = lut[codes[bmp]]
+            joined = codes.tobytes().decode('utf-32-le')
+        else:
+            joined = joined.translate(EscudeManager.SCRIPT_DECODE_TABLE)
+        return joined.split('\x00')
+
+    @staticmethod
+    def save_script(path: str, strings: List[str], context: dict):
+        table = EscudeManager.SCRIPT_ENCODE_TABLE
+        enc_strings = [s.translate(table) for s in strings]
+        str_blob = bytearray()
+        offsets = []
+        current_len = 0
+        for s in enc_strings:
+            offsets.append(current_len)
+            b = s.encode(SHIFT_JIS, errors='replace') + b'\x00'
+            str_blob.extend(b)
+            current_len += len(b)
+        with open(path, 'wb') as f:
+            f.write(context['header_sig'])
+            f.write(struct.pack('<I', len(strings)))
+            for off in offsets:
+                f.write(struct.pack('<I', off))
+            vm_data = context['vm_data']
+            f.write(struct.pack('<I', len(vm_data)))
+            f.write(vm_data)
+            f.write(struct.pack('<I', context['unk1']))
+            f.write(str_blob)
+
+    @staticmethod
+    def _escr_batch(fn, jobs, skipped, logger, status, progress, cancelled, workers):
+        """批量任务公共部分：汇总结果、转发逐文件状态和进度"""
+        summary = {'ok': 0, 'failed': 0, 'skipped': len(skipped), 'cancelled': False}
+        total = len(jobs) + len(skipped)
+        done = 0
+
+        def report(name, state, message):
+            nonlocal done
+            done += 1
+            if status:
+                status(name, state)
+            logger(message)
+            if progress and total:
+                progress(done * 100 // total)
+
+        for name, reason in skipped:
+            report(name, 'skip', f"  SKIP: {name} - {reason}")
+
+        def on_result(name, count, error):
+            if error is None:
+                summary['ok'] += 1
+                report(name, 'ok', f"  OK: {name} ({count} 条)")
+            else:
+                summary['failed'] += 1
+                report(name, 'fail', f"  FAIL: {name} - {error}")
+
+        summary['cancelled'] = not _run_file_jobs(fn, jobs, on_result, workers=workers, cancelled=cancelled)
+        return summary
+
+    @staticmethod
+    def escr_extract_all(input_dir: str, output_dir: str, logger=print, status=None, progress=None,
+                         cancelled=None, workers=None, skip_newer=True):
+        """批量把目录中的 ESCR1_00 脚本导出为 TXT，返回 {'ok', 'failed', 'skipped', 'cancelled'}"""
+        os.makedirs(output_dir, exist_ok=True)
+        jobs, skipped = [], []
+        for f in sorted(os.listdir(input_dir)):
+            if not f.endswith('.bin'):
+                continue
+            bin_path = os.path.join(input_dir, f)
+            txt_path = os.path.join(output_dir, f.replace('.bin', '.txt'))
+            if skip_newer and _is_up_to_date(txt_path, bin_path):
+                skipped.append((f, "输出已是最新"))
+            else:
+                jobs.append((f, (bin_path, txt_path)))
+        return EscudeManager._escr_batch(_escr_extract_one, jobs, skipped, logger, status, progress,
+                                         cancelled, workers)
+
+    @staticmethod
+    def escr_pack_all(txt_dir: str, template_dir: str, output_dir: str, logger=print, status=None,
+                      progress=None, cancelled=None, workers=None, skip_newer=True):
+        """批量把 TXT 写回 ESCR1_00 脚本 (以原始脚本为模板)，返回值同 escr_extract_all"""
+        os.makedirs(output_dir, exist_ok=True)
+        jobs, skipped = [], []
+        missing = []
+        for f in sorted(os.listdir(txt_dir)):
+            if not f.endswith('.txt'):
+                continue
+            txt_path = os.path.join(txt_dir, f)
+            template_name = f.replace('.txt', '.bin')
+            template_path = os.path.join(template_dir, template_name)
+            out_path = os.path.join(output_dir, template_name)
+            if not os.path.exists(template_path):
+                missing.append(f)
+            elif skip_newer and _is_up_to_date(out_path, txt_path, template_path):
+                skipped.append((f, "输出已是最新"))
+            else:
+                jobs.append((f, (txt_path, template_path, out_path)))
+        for f in missing:
+            logger(f"  FAIL: {f} - 找不到模板 {f.replace('.txt', '.bin')}")
+            if status:
+                status(f, 'fail')
+        summary = EscudeManager._escr_batch(_escr_pack_one, jobs, skipped, logger, status, progress,
+                                            cancelled, workers)
+        summary['failed'] += len(missing)
+        return summary
+
+    # 块内名称：以 0x00-0x20/0xFF 以外的字节开头，遇到 0x00/0x20/0xFF 结束
+    ENUM_NAME_RE = re.compile(rb'[^\x00-\x20\xff][^\x00\x20\xff]*')
+
+    @staticmethod
+    def load_enum_scr(filepath):
+        """读取enum_scr.bin文件 - 分行显示逻辑
+        所有块保存在一个 bytearray 中，子条目为 (块号, 子序号, 偏移, 长度)，名称单独成表"""
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        
+        if data[:4] != ENUM_MAGIC:
+            raise ValueError(f"Invalid magic: expected 'LIST', got {data[:4]}")
+        
+        data_size = struct.unpack_from('<I', data, 4)[0]
+        unknown1 = struct.unpack_from('<I', data, 8)[0]
+        unknown2 = struct.unpack_from('<I', data, 12)[0]
+        
+        num_blocks = (len(data) - ENUM_HEADER_SIZE) // ENUM_ENTRY_SIZE
+        blocks = bytearray(data[ENUM_HEADER_SIZE:ENUM_HEADER_SIZE + num_blocks * ENUM_ENTRY_SIZE])
+        
+        spans = []
+        names = []
+        finditer = EscudeManager.ENUM_NAME_RE.finditer
+        for i in range(num_blocks):
+            base = i * ENUM_ENTRY_SIZE
+            sub = 0
+            for m in finditer(blocks, base, base + ENUM_ENTRY_SIZE):
+                try:
+                    # 不使用 strip()，保留原始空格，只在显示时处理
+                    text = m.group().decode('cp932')
+                except UnicodeDecodeError:
+                    continue
+                if text == '＿':
+                    continue
+                spans.append((i, sub, m.start() - base, m.end() - m.start()))
+                names.append(text)
+                sub += 1
+            # 如果没有找到任何字符串，也要保留一个空的
+            if not sub:
+                spans.append((i, 0, 0, 0))
+                names.append('')
+        
+        return {
+            'data_size': data_size,
+            'unknown1': unknown1,
+            'unknown2': unknown2,
+            'raw_header': data[:ENUM_HEADER_SIZE],
+            'blocks': blocks,
+            'spans': spans,
+            'names': names
+        }
+
+    @staticmethod
+    def enum_label(enum_data, idx):
+        block, sub = enum_data['spans'][idx][:2]
+        return f"[{block:3d}.{sub}] {enum_data['names'][idx]}"
+
+    @staticmethod
+    def save_enum_scr(filepath, enum_data):
+        """写入enum_scr.bin文件 - 精准回封逻辑
+        子条目按 (块号, 偏移) 排序后线性扫描，可写长度截止到同块下一个子条目"""
+        blocks = bytearray(enum_data['blocks'])
+        spans = enum_data['spans']
+        names = enum_data['names']
+        order = sorted(range(len(spans)), key=lambda k: (spans[k][0], spans[k][2]))
+        # 可写上限：同块中下一个更大的起始偏移，块内最后一个子条目截止到块末尾
+        # 倒序扫描一遍，偏移相同的子条目共用同一个上限
+        limits = [ENUM_ENTRY_SIZE] * len(spans)
+        cur_block = None
+        bound = next_off = ENUM_ENTRY_SIZE
+        for k in reversed(order):
+            block, _, off, _ = spans[k]
+            if block != cur_block:
+                cur_block, bound = block, ENUM_ENTRY_SIZE
+            elif next_off > off:
+                bound = next_off
+            limits[k] = bound
+            next_off = off
+        for k in order:
+            block, _, off, length = spans[k]
+            name = names[k]
+            if not name or length == 0:
+                continue
+            try:
+                new_bytes = name.encode('cp932')
+            except UnicodeEncodeError:
+                continue
+            write_len = min(len(new_bytes), limits[k] - off - 1)
+            start = block * ENUM_ENTRY_SIZE + off
+            blocks[start:start + write_len] = new_bytes[:write_len]
+            # 补零
+            if off + write_len < ENUM_ENTRY_SIZE:
+                blocks[start + write_len] = 0x00
+        
+        with open(filepath, 'wb') as f:
+            # Header
+            if enum_data.get('raw_header'):
+                f.write(enum_data['raw_header'])
+            else:
+                f.write(ENUM_MAGIC)
+                f.write(struct.pack('<I', len(blocks) + 8))
+                f.write(struct.pack('<I', enum_data.get('unknown1', 0)))
+                f.write(struct.pack('<I', enum_data.get('unknown2', 0x4284)))
+            f.write(blocks)
+
+    @staticmethod
+    def export_enum_to_txt(enum_data, output_path):
+        """导出enum_scr为TXT文件"""
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write("# enum_scr.bin 导出\n")
+            f.write("# 格式: [主索引.子索引] 名称\n")
+            f.write("#\n")
+            
+            for idx in range(len(enum_data['spans'])):
+                f.write(EscudeManager.enum_label(enum_data, idx) + "\n")
+
+    @staticmethod
+    def import_enum_from_txt(txt_path, current_enum_data):
+        """从TXT文件导入名称"""
+        if not current_enum_data: return None
+        
+        new_names = {}
+        with open(txt_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('[') and ']' in line:
+                    try:
+                        idx_part = line[1:line.find(']')]
+                        name = line[line.find(']')+1:].strip()
+                        new_names[idx_part.strip()] = name
+                    except:
+                        continue
+        
+        names = current_enum_data['names']
+        for idx, (block, sub, _, _) in enumerate(current_enum_data['spans']):
+            key = f"{block:3d}.{sub}"
+            if key in new_names:
+                names[idx] = new_names[key]
+        
+        return current_enum_data
+
+    @staticmethod
+    def export_enum_to_json(enum_data, output_path):
+        """导出enum_scr为JSON文件 (格式与旧版相同，每个子条目附带所在块的原始数据)"""
+        import base64
+        export_data = {
+            'header': {
+                'data_size': enum_data['data_size'],
+                'unknown1': enum_data['unknown1'],
+                'unknown2': enum_data['unknown2'],
+                'raw_header': base64.b64encode(enum_data.get('raw_header', b'')).decode('ascii')
+            },
+            'entries': []
+        }
+        
+        blocks = enum_data['blocks']
+        encoded_blocks = {}
+        for (block, sub, off, length), name in zip(enum_data['spans'], enum_data['names']):
+            raw = encoded_blocks.get(block)
+            if raw is None:
+                start = block * ENUM_ENTRY_SIZE
+                raw = base64.b64encode(blocks[start:start + ENUM_ENTRY_SIZE]).decode('ascii')
+                encoded_blocks[block] = raw
+            export_data['entries'].append({
+                'main_index': block,
+                'sub_index': sub,
+                'name': name,
+                'off': off,
+                'len': length,
+                'raw_block': raw
+            })
+        
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(export_data, f, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def import_enum_from_json(json_path):
+        """从JSON文件导入enum_scr"""
+        import base64
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        header = data['header']
+        entries = data['entries']
+        num_blocks = max((e['main_index'] for e in entries), default=-1) + 1
+        blocks = bytearray(num_blocks * ENUM_ENTRY_SIZE)
+        seen = set()
+        for e in entries:
+            block = e['main_index']
+            if block in seen:
+                continue
+            seen.add(block)
+            raw = base64.b64decode(e.get('raw_block', ''))[:ENUM_ENTRY_SIZE]
+            start = block * ENUM_ENTRY_SIZE
+            blocks[start:start + len(raw)] = raw
+        return {
+            'data_size': header['data_size'],
+            'unknown1': header['unknown1'],
+            'unknown2': header['unknown2'],
+            'raw_header': base64.b64decode(header.get('raw_header', '')),
+            'blocks': blocks,
+            'spans': [(e['main_index'], e['sub_index'], e['off'], e['len']) for e in entries],
+            'names': [e['name'] for e in entries]
+        }
+
+_XOR_TABLES = {}
+
+def xor_table(key: int) -> bytes:
+    """单字节异或的 256 字节转换表，供 bytes.translate 使用"""
+    table = _XOR_TABLES.get(key)
+    if table is None:
+        table = _XOR_TABLES[key] = bytes(b ^ key for b in range(256))
+    return table
+
+def xor_bytes(data, key=0x55):
+    return bytes(data).translate(xor_table(key))
+
+class MdbNameTable:
+    """MDB 格式 db_scripts.bin 中的人名表
+    一次正则扫描定位所有以 \\0 结尾的名字并缓存位置，提取和原位替换共用同一份索引"""
+
+    NAME_MARKER = b'\x88\xea\x8e\xf7'   # "一樹" (cp932)，人名区从这里开始
+    DEFAULT_START = 1400
+    STOP_WORDS = frozenset(['登場人物', '名前', '文字色', 'itsu', 'kago', 'wman', 'other'])
+    SPAN_RE = re.compile(rb'[^\x00]+')
+
+    def __init__(self, data, encoding='cp932'):
+        self.data = data
+        self.encoding = encoding
+        self.spans = []   # [(start, end), ...]，end 处为 \0
+        self.names = []
+        start = data.find(self.NAME_MARKER)
+        if start == -1:
+            start = self.DEFAULT_START
+        view = memoryview(data)
+        for m in self.SPAN_RE.finditer(view, start):
+            if m.end() == len(data):
+                break   # 末尾没有 \0 结尾的残段不算名字
+            try:
+                text = str(view[m.start():m.end()], encoding)
+            except UnicodeDecodeError:
+                continue
+            if text in self.STOP_WORDS:
+                break
+            self.spans.append((m.start(), m.end()))
+            self.names.append(text)
+        view.release()
+
+    @staticmethod
+    def is_mdb(data) -> bool:
+        return data[:4] == b'mdb\x00'
+
+    def __len__(self):
+        return len(self.names)
+
+    def replace(self, idx: int, name: str, encoding=None) -> bool:
+        """原位替换第 idx 个名字，不足部分补 \\0；编码后比原字段长时不修改并返回 False
+        data 必须是 bytearray"""
+        start, end = self.spans[idx]
+        raw = name.encode(encoding or self.encoding, errors='ignore')
+        if len(raw) > end - start:
+            return False
+        self.data[start:end] = raw.ljust(end - start, b'\x00')
+        return True
+
+def extract_names(db_scripts_path, src_encoding='cp932', logger=print):
+    """db_scripts_path 可以是 db_scripts.bin，也可以是包含它的 ESC-ARC2 资源包"""
+    if EscudeArchive.is_archive(db_scripts_path):
+        with EscudeArchive(db_scripts_path) as arc:
+            data = arc.read('db_scripts.bin')
+    else:
+        with open(db_scripts_path, 'rb') as f:
+            data = f.read()
+    names = [{"name": ""}]
+    if MdbNameTable.is_mdb(data):
+        logger("检测到 MDB 格式数据库")
+        names += [{"name": name} for name in MdbNameTable(data, src_encoding).names]
+    else:
+        reader = BytesReader(data)
+        reader.read(8)
+        count = reader.readU32()
+        size = reader.readU32()
+        offsets = [reader.readU32() for _ in range(count)]
+        header_end = reader.tell()
+        for i in range(count):
+            reader.seek(header_end + offsets[i])
+            s_bytes = reader.read_until_zero(b'\x00')
+            try:
+                name = s_bytes.decode(src_encoding)
+                names.append({"name": name})
+            except:
+                names.append({"name": ""})
+    logger(f"提取了 {len(names)} 个人名")
+    return names
+
+def pack_names(names, db_scripts_path, output_path, dst_encoding='cp932', logger=print):
+    with open(db_scripts_path, 'rb') as f:
+        data = bytearray(f.read())
+    if MdbNameTable.is_mdb(data):
+        logger("检测到 MDB 格式，进行人名替换...")
+        table = MdbNameTable(data, 'cp932')
+        original_names = table.names
+        new_names = [n.get("name", "") for n in names[1:]]
+        if len(new_names) != len(original_names):
+            logger(f"警告: 人名数量不匹配 (原始:{len(original_names)}, 新:{len(new_names)})")
+        replaced = 0
+        for idx, (old_name, new_name) in enumerate(zip(original_names, new_names)):
+            if old_name != new_name:
+                if table.replace(idx, new_name, dst_encoding):
+                    replaced += 1
+                    logger(f"  替换: {old_name} -> {new_name}")
+                else:
+                    logger(f"  跳过: {new_name} (新名字太长)")
+        with open(output_path, 'wb') as f:
+            f.write(data)
+        logger(f"已替换 {replaced} 个人名到 {os.path.basename(output_path)}")
+        return True
+    magic = data[:8]
+    encoded_names = []
+    for i, entry in enumerate(names):
+        if i == 0:
+            encoded_names.append(b'')
+        else:
+            name = entry.get("name", "")
+            encoded_names.append(name.encode(dst_encoding, errors='ignore'))
+    name_data = b'\x00'.join(encoded_names) + b'\x00'
+    offsets = []
+    cur = 0
+    for enc in encoded_names:
+        offsets.append(cur)
+        cur += len(enc) + 1
+    new_data = bytes(magic)
+    new_data += struct.pack('<I', len(encoded_names))
+    new_data += struct.pack('<I', len(name_data))
+    for off in offsets:
+        new_data += struct.pack('<I', off)
+    new_data += name_data
+    with open(output_path, 'wb') as f:
+        f.write(new_data)
+    logger(f"已打包 {len(names)} 个人名到 {os.path.basename(output_path)}")
+    return True
+
+class ACPX_001:
+    def __init__(self, data=None):
+        self.magic = b'@mess:__'
+        self.strings = []
+        self.is_valid = False
+        if data:
+            if len(data) < 16:
+                return
+            magic = data[:8]
+            if magic == b'@mess:__':
+                self.is_valid = True
+                count, size = struct.unpack_from('<II', data, 8)
+                # 偏移表被截断时，缺失的偏移按 0 处理
+                avail = min(count, (len(data) - 16) // 4)
+                offsets = struct.unpack_from(f'<{avail}I', data, 16)
+                if avail < count:
+                    offsets += (0,) * (count - avail)
+                # 整段一次异或解密，字符串以解密后的 0 结尾，按偏移直接切片
+                plain = data[16 + avail * 4:].translate(xor_table(0x55))
+                find = plain.find
+                strings = self.strings
+                for off in offsets:
+                    end = find(b'\x00', off)
+                    strings.append(plain[off:end] if end != -1 else plain[off:])
+    
+    def save(self):
+        count = len(self.strings)
+        data = b'\x00'.join(self.strings) + b'\x00'
+        header_size = 16 + count * 4
+        out = bytearray(header_size + len(data))
+        out[:8] = self.magic
+        struct.pack_into('<II', out, 8, count, len(data))
+        offsets = []
+        cur = 0
+        for s in self.strings:
+            offsets.append(cur)
+            cur += len(s) + 1
+        struct.pack_into(f'<{count}I', out, 16, *offsets)
+        out[header_size:] = data.translate(xor_table(0x55))
+        return bytes(out)
+
+class ACPX_Bin:
+    def __init__(self, bin_data, mess_data=None):
+        reader = BytesReader(bin_data)
+        self.magic = reader.read(8)
+        self.code_len = reader.readU32()
+        self.num_bin_str = reader.readU32()
+        self.bin_str_len = reader.readU32()
+        self.num_001_str = reader.readU32()
+        code_bytes = reader.read(self.code_len)
+        self.bin_str_offsets = [reader.readU32() for _ in range(self.num_bin_str)]
+        self.bin_str_data = reader.read(self.bin_str_len)
+        self.mess = None
+        if mess_data:
+            self.mess = ACPX_001(mess_data)
+        self.code = code_bytes
+        # 指令按需解码为并列的列：操作码 / 指令偏移 / 参数起始下标，参数统一放在 args 中
+        self.ops = None
+        self.op_offsets = None
+        self.arg_starts = None
+        self.args = None
+
+    def decode(self):
+        if self.ops is not None:
+            return
+        code = self.code
+        n = len(code)
+        arg_counts = OP_ARG_COUNTS
+        arg_formats = ('', '<I', '<2I')
+        unpack_from = struct.unpack_from
+        ops = array('B')
+        op_offsets = array('I')
+        arg_starts = array('I')
+        args = array('I')
+        pos = 0
+        while pos < n:
+            op = code[pos]
+            ops.append(op)
+            op_offsets.append(pos)
+            arg_starts.append(len(args))
+            pos += 1
+            count = arg_counts[op]
+            if not count:
+                continue
+            if pos + 4 * count <= n:
+                args.extend(unpack_from(arg_formats[count], code, pos))
+                pos += 4 * count
+                continue
+            for _ in range(count):
+                # 参数被截断时按 0 处理且不前进，与逐字节读取时一致
+                if pos + 4 <= n:
+                    args.append(unpack_from('<I', code, pos)[0])
+                    pos += 4
+                else:
+                    args.append(0)
+        self.ops, self.op_offsets, self.arg_starts, self.args = ops, op_offsets, arg_starts, args
+
+    @property
+    def commands(self):
+        """兼容旧接口：[{'op': 'xx', 'args': [...]}, ...]"""
+        self.decode()
+        ends = self.arg_starts[1:].tolist() + [len(self.args)]
+        return [{'op': f'{op:02x}', 'args': self.args[start:end].tolist()}
+                for op, start, end in zip(self.ops, self.arg_starts, ends)]
+
+    def get_text_with_names(self, names, src_encoding='cp932'):
+        self.decode()
+        res = []
+        current_name = ""
+        args = self.args
+        for op, start in zip(self.ops, self.arg_starts):
+            if op == 0x28:
+                idx = args[start]
+                current_name = names[idx]["name"] if idx < len(names) else ""
+            elif op == 0x29 or op == 0x2b:
+                idx = args[start]
+                if self.mess and idx < len(self.mess.strings):
+                    text = self.mess.strings[idx].decode(src_encoding, errors='ignore')
+                    if current_name:
+                        res.append({"name": current_name, "message": text})
+                    else:
+                        res.append({"message": text})
+                current_name = ""
+        return res
+
+
+
+# 文本批处理：每个进程任务携带的文件数，以及汇总进度的最短间隔 (秒)
+TEXT_CHUNK_FILES = 32
+TEXT_PROGRESS_INTERVAL = 0.5
+
+_script_archives = {}
+
+def _read_script_source(source, ref):
+    """source 为 None 时 ref 是文件路径，否则 source 是资源包路径、ref 是包内条目名
+    (每个进程只打开一次资源包)；文件不存在时返回 None"""
+    if source is None:
+        if not os.path.exists(ref):
+            return None
+        with open(ref, 'rb') as f:
+            return f.read()
+    arc = _script_archives.get(source)
+    if arc is None:
+        arc = _script_archives[source] = EscudeArchive(source)
+    return arc.read(ref) if ref in arc else None
+
+def _close_script_archives():
+    while _script_archives:
+        _script_archives.popitem()[1].close()
+
+def discover_script_jobs(bin_dir, output_dir):
+    """列出脚本目录 (或 script.bin 资源包) 中所有 .bin 与对应 .001 的位置
+    返回 (资源包路径或 None, [(显示名, bin 引用, 001 引用, 输出 txt 路径), ...])"""
+    jobs = []
+    if EscudeArchive.is_archive(bin_dir):
+        with EscudeArchive(bin_dir) as arc:
+            names = arc.list()
+        for name in names:
+            if not name.lower().endswith('.bin'):
+                continue
+            rel_path, f = os.path.split(name.replace('\\', '/'))
+            out_path = os.path.join(output_dir, rel_path, os.path.splitext(f)[0] + ".txt")
+            jobs.append((f, name, os.path.splitext(name)[0] + ".001", out_path))
+        return bin_dir, jobs
+    for root, dirs, files in os.walk(bin_dir):
+        rel_path = os.path.relpath(root, bin_dir)
+        out_folder = output_dir if rel_path == '.' else os.path.join(output_dir, rel_path)
+        for f in files:
+            if f.endswith('.bin'):
+                bin_path = os.path.join(root, f)
+                out_path = os.path.join(out_folder, os.path.splitext(f)[0] + ".txt")
+                jobs.append((f, bin_path, os.path.splitext(bin_path)[0] + ".001", out_path))
+    return None, jobs
+
+def _unpack_text_chunk(jobs, source, src_encoding):
+    """进程任务：提取一批脚本的文本并直接写出，返回 [(显示名, 状态, 说明), ...]"""
+    results = []
+    for f, bin_ref, mess_ref, out_path in jobs:
+        try:
+            bin_data = _read_script_source(source, bin_ref)
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            out_name = os.path.basename(out_path)
+            if bin_data[:8] == b'ESCR1_00':
+                strings, context = EscudeManager.parse_script(bin_data)
+                with open(out_path, 'w', encoding='utf-8') as f_out:
+                    for i, s in enumerate(strings):
+                        if s.strip():
+                            f_out.write(f"○{i:06d}○{s}\n")
+                            f_out.write(f"●{i:06d}●{s}\n\n")
+                results.append((f, 'ok', f"[ESCR] 提取 {len(strings)} 条文本 -> {out_name}"))
+                continue
+            
+            mess_data = _read_script_source(source, mess_ref)
+            if mess_data is None:
+                results.append((f, 'skip', "找不到对应的 .001 文件"))
+                continue
+            acpx = ACPX_Bin(bin_data, mess_data)
+            if not acpx.mess or not acpx.mess.is_valid:
+                results.append((f, 'skip', ".001 文件格式不匹配"))
+                continue
+            
+            # 彻底改为 1:1 映射，不提取姓名以保证索引绝对同步
+            with open(out_path, 'w', encoding='utf-8') as f_out:
+                for i, s_bytes in enumerate(acpx.mess.strings):
+                    text = s_bytes.decode(src_encoding, errors='ignore')
+                    f_out.write(f"○{i:06d}○{text}\n")
+                    f_out.write(f"●{i:06d}●{text}\n\n")
+            results.append((f, 'ok', f"[ACPX] 提取 {len(acpx.mess.strings)} 条文本 -> {out_name}"))
+        except Exception as e:
+            results.append((f, 'fail', str(e)))
+    return results
+
+def _run_text_pipeline(chunk_fn, fixed_args, jobs, logger, progress, workers, cancelled=None):
+    """把文件分块交给进程池 (chunk_fn(分块, *fixed_args))，逐文件结果在此汇总；
+    成功的文件只按固定间隔汇报进度，跳过和失败的文件逐条记录。
+    结果元组可附带 (键, 记录)，汇总在返回值的 'records' 中。返回 {'ok', 'same', 'skip', 'fail', 'cancelled', 'records'}"""
+    chunks = [(i, (jobs[i:i + TEXT_CHUNK_FILES],) + fixed_args)
+              for i in range(0, len(jobs), TEXT_CHUNK_FILES)]
+    counts = {'ok': 0, 'same': 0, 'skip': 0, 'fail': 0}
+    records = {}
+    total = len(jobs)
+    done = 0
+    last_report = time.monotonic()
+
+    def on_result(_, results, error):
+        nonlocal done, last_report
+        if error is not None:
+            raise error
+        for f, state, message, *record in results:
+            counts[state] += 1
+            if record and record[0] is not None:
+                records[record[0]] = record[1]
+            if state == 'skip':
+                logger(f"  跳过 {f}: {message}")
+            elif state == 'fail':
+                logger(f"  错误 {f}: {message}")
+        done += len(results)
+        now = time.monotonic()
+        if now - last_report >= TEXT_PROGRESS_INTERVAL or done == total:
+            last_report = now
+            logger(f"  进度 {done}/{total}")
+            if progress and total:
+                progress(done * 100 // total)
+
+    try:
+        finished = _run_file_jobs(chunk_fn, chunks, on_result, workers=workers, cancelled=cancelled)
+    finally:
+        _close_script_archives()
+    counts['cancelled'] = not finished
+    counts['records'] = records
+    return counts
+
+def unpack_text(bin_dir, output_dir, names, src_encoding='cp932', logger=print, workers=None,
+                progress=None, cancelled=None):
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    source, jobs = discover_script_jobs(bin_dir, output_dir)
+    logger(f"发现 {len(jobs)} 个脚本")
+    counts = _run_text_pipeline(_unpack_text_chunk, (source, src_encoding), jobs,
+                                logger, progress, workers, cancelled)
+    logger(f"完成! 共处理 {counts['ok']} 个文件, 跳过 {counts['skip'] + counts['fail']} 个")
+    return counts
+
+def parse_txt_line(line):
+    line = line.strip()
+    if not line:
+        return None
+    if not line.startswith("●"):
+        return None
+    import re
+    match = re.match(r'^●(\d{6})●(.*)$', line)
+    if match:
+        idx = int(match.group(1))
+        text = match.group(2)
+        return {"idx": idx, "text": text}
+    return None
+
+def parse_txt_file(txt_lines):
+    parsed = []
+    for line in txt_lines:
+        p = parse_txt_line(line)
+        if p:
+            parsed.append(p)
+    # 返回原始带索引的列表
+    return parsed
+
+PACK_MANIFEST = '.pack_manifest.json'
+PACK_MANIFEST_VERSION = 2
+
+def _file_digest(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(1 << 20)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+def _input_state(path: str, prev):
+    """[大小, 修改时间, 内容哈希]；大小和修改时间与上次相同时沿用上次的哈希"""
+    st = os.stat(path)
+    if prev and prev[0] == st.st_size and prev[1] == st.st_mtime_ns:
+        return prev
+    return [st.st_size, st.st_mtime_ns, _file_digest(path)]
+
+def _output_state(path: str):
+    """[大小, 修改时间]；文件不存在时为 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def _place_copy(src: str, dst: str, link: bool):
+    """把未修改的文件放到输出位置：link 时优先硬链接，否则 (或失败时) 复制
+    先写到同目录临时文件再替换目标，输出目录就是模板目录时 (src 与 dst 相同) 不做任何事"""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    out_dir = os.path.dirname(os.path.abspath(dst))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(dst) + '.', suffix='.tmp', dir=out_dir)
+    os.close(fd)
+    try:
+        linked = False
+        if link:
+            try:
+                os.remove(tmp_path)
+                os.link(src, tmp_path)
+                linked = True
+            except OSError:
+                pass
+        if not linked:
+            shutil.copyfile(src, tmp_path)
+            os.chmod(tmp_path, _output_mode(dst))
+        os.replace(tmp_path, dst)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def load_pack_manifest(output_dir: str) -> dict:
+    try:
+        with open(os.path.join(output_dir, PACK_MANIFEST), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get('version') != PACK_MANIFEST_VERSION:
+        return {}
+    return data.get('entries', {})
+
+def save_pack_manifest(output_dir: str, entries: dict):
+    with open_output(os.path.join(output_dir, PACK_MANIFEST), atomic=True) as f:
+        f.write(json.dumps({'version': PACK_MANIFEST_VERSION, 'entries': entries},
+                           ensure_ascii=False, sort_keys=True).encode('utf-8'))
+
+def discover_pack_jobs(txt_dir, bin_dir, output_dir, manifest=None):
+    """列出 TXT 目录中的文本及对应的原始 .bin/.001
+    返回 [(显示名, txt, bin, 001, 输出目录, 清单键, 上次记录), ...]"""
+    manifest = manifest or {}
+    jobs = []
+    for root, dirs, files in os.walk(txt_dir):
+        rel_path = os.path.relpath(root, txt_dir)
+        out_folder = output_dir if rel_path == '.' else os.path.join(output_dir, rel_path)
+        src_bin_dir = bin_dir if rel_path == '.' else os.path.join(bin_dir, rel_path)
+        for f in files:
+            if f.endswith('.txt') and not f.endswith('.txt.json'):
+                name = f.replace('.txt', '')
+                key = name if rel_path == '.' else f"{rel_path}/{name}".replace('\\', '/')
+                jobs.append((f, os.path.join(root, f), os.path.join(src_bin_dir, f"{name}.bin"),
+                             os.path.join(src_bin_dir, f"{name}.001"), out_folder, key, manifest.get(key)))
+    return jobs
+
+def _pack_text_chunk(jobs, dst_encoding, link_unchanged=False):
+    """进程任务：把一批 TXT 回填到 .001 并写出，返回 [(显示名, 状态, 说明, 清单键, 新记录), ...]
+    文本、模板和编码都与上次相同，且输出文件的大小和修改时间与上次写出时一致时跳过；
+    .bin 原样复制 (或硬链接)"""
+    results = []
+    for f, txt_path, bin_path, mess_path, out_folder, key, prev in jobs:
+        name = f.replace('.txt', '')
+        if not os.path.exists(mess_path) or not os.path.exists(bin_path):
+            results.append((f, 'skip', "找不到原始 .bin 或 .001"))
+            continue
+        try:
+            prev = prev or {}
+            record = {'encoding': dst_encoding}
+            for role, path in (('txt', txt_path), ('bin', bin_path), ('mess', mess_path)):
+                record[role] = _input_state(path, prev.get(role))
+            out_mess_path = os.path.join(out_folder, f"{name}.001")
+            out_bin_path = os.path.join(out_folder, f"{name}.bin")
+            if (prev.get('encoding') == dst_encoding
+                    and all(prev.get(role, [None] * 3)[2] == record[role][2] for role in ('txt', 'bin', 'mess'))
+                    and prev.get('out_mess') is not None and prev.get('out_bin') is not None
+                    and _output_state(out_mess_path) == prev['out_mess']
+                    and _output_state(out_bin_path) == prev['out_bin']):
+                record['out_mess'], record['out_bin'] = prev['out_mess'], prev['out_bin']
+                results.append((f, 'same', "未变化", key, record))
+                continue
+
+            with open(txt_path, 'r', encoding='utf-8') as f_txt:
+                txt_lines = f_txt.readlines()
+            lines = parse_txt_file(txt_lines)
+            with open(mess_path, 'rb') as f_mess:
+                mess_data = f_mess.read()
+            with open(bin_path, 'rb') as f_bin:
+                bin_data = f_bin.read()
+            acpx = ACPX_Bin(bin_data, mess_data)
+            # 彻底改为 1:1 回填，完全无视指令 Opcode，解决错位问题
+            for item in lines:
+                idx = item['idx']
+                if idx < len(acpx.mess.strings):
+                    acpx.mess.strings[idx] = item['text'].encode(dst_encoding, errors='ignore')
+            
+            os.makedirs(out_folder, exist_ok=True)
+            with open(out_mess_path, 'wb') as f_out:
+                f_out.write(acpx.mess.save())
+            _place_copy(bin_path, out_bin_path, link_unchanged)
+            record['out_mess'] = _output_state(out_mess_path)
+            record['out_bin'] = _output_state(out_bin_path)
+            results.append((f, 'ok', f"打包 {name}", key, record))
+        except Exception as e:
+            results.append((f, 'fail', str(e)))
+    return results
+
+def pack_text(txt_dir, bin_dir, output_dir, names, dst_encoding='cp932', logger=print, workers=None,
+              progress=None, cancelled=None, incremental=True, link_unchanged=False):
+    """incremental 时根据输出目录中的清单 (.pack_manifest.json) 只重新生成输入有变化的脚本"""
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    manifest = load_pack_manifest(output_dir) if incremental else {}
+    jobs = discover_pack_jobs(txt_dir, bin_dir, output_dir, manifest)
+    logger(f"发现 {len(jobs)} 个文本")
+    counts = _run_text_pipeline(_pack_text_chunk, (dst_encoding, link_unchanged), jobs,
+                                logger, progress, workers, cancelled)
+    # 未处理 (取消) 的条目沿用旧记录，失败和跳过的条目不记录，下次重新生成
+    entries = {}
+    if counts['cancelled']:
+        entries = {job[5]: job[6] for job in jobs if job[6] is not None}
+    entries.update(counts['records'])
+    save_pack_manifest(output_dir, entries)
+    logger(f"完成! 共打包 {counts['ok']} 个文件" + (f", {counts['same']} 个未变化" if counts['same'] else ""))
+    return counts
+
+def extract_text_all(input_dir, output_dir, data_input_dir='', src_encoding='cp932', logger=print,
+                     workers=None, progress=None, cancelled=None):
+    """提取流程：先从 db_scripts.bin 提取角色名 (names.txt)，再提取全部对话文本
+    data_input_dir 为包含 db_scripts.bin 的目录或 data.bin 资源包，留空则跳过角色名"""
+    db_scripts_path = os.path.join(data_input_dir, "db_scripts.bin") if data_input_dir else ""
+    if data_input_dir and EscudeArchive.is_archive(data_input_dir):
+        db_scripts_path = data_input_dir
+
+    names = [{"name": ""}]
+    if data_input_dir and os.path.exists(db_scripts_path):
+        logger("\n[步骤1] 从 db_scripts.bin 提取角色名...")
+        names = extract_names(db_scripts_path, src_encoding, logger=logger)
+        os.makedirs(output_dir, exist_ok=True)
+        names_file = os.path.join(output_dir, 'names.txt')
+        with open(names_file, 'w', encoding='utf-8') as f:
+            for item in names:
+                f.write(item.get("name", "") + "\n")
+        logger(f"角色名已保存: {names_file}")
+    else:
+        logger("\n[步骤1] 跳过角色名提取 (未设置data目录)")
+    logger("\n[步骤2] 提取对话文本...")
+    counts = unpack_text(input_dir, output_dir, names, src_encoding, logger=logger,
+                         workers=workers, progress=progress, cancelled=cancelled)
+    logger(f"\n{'='*50}")
+    logger("提取完成!")
+    logger(f"TXT文件已保存到: {output_dir}")
+    return counts
+
+def pack_text_all(txt_dir, bin_dir, output_dir, dst_encoding='cp936', data_input_dir='', data_output_dir='',
+                  logger=print, workers=None, progress=None, cancelled=None, incremental=True,
+                  link_unchanged=False):
+    """导入流程：读取 txt_dir/names.txt，把对话文本回填到 bin_dir 中的原始脚本，
+    设置了 data 输入/输出目录时再把角色名写回 db_scripts.bin"""
+    names = []
+    names_file = os.path.join(txt_dir, 'names.txt')
+    if os.path.exists(names_file):
+        logger("\n[步骤1] 读取角色名...")
+        with open(names_file, 'r', encoding='utf-8') as f:
+            names = [{"name": line.strip()} for line in f.readlines()]
+        logger(f"已加载 {len(names)} 个角色名")
+    else:
+        logger("\n[步骤1] 跳过角色名加载 (names.txt 不存在)")
+
+    logger("\n[步骤2] 导入对话文本...")
+    os.makedirs(output_dir, exist_ok=True)
+    counts = pack_text(txt_dir, bin_dir, output_dir, names, dst_encoding, logger=logger, workers=workers,
+                       progress=progress, cancelled=cancelled, incremental=incremental,
+                       link_unchanged=link_unchanged)
+
+    # 如果提供了 data 输出路径且 db_scripts 存在，则尝试封包人名
+    if data_input_dir and data_output_dir:
+        db_scripts_path = os.path.join(data_input_dir, "db_scripts.bin")
+        if os.path.exists(db_scripts_path):
+            logger("\n[步骤3] 导入角色名到 db_scripts.bin...")
+            os.makedirs(data_output_dir, exist_ok=True)
+            db_out_path = os.path.join(data_output_dir, "db_scripts.bin")
+            pack_names(names, db_scripts_path, db_out_path, dst_encoding, logger=logger)
+        else:
+            logger("\n[步骤3] 跳过角色名封包 (找不到原始 db_scripts.bin)")
+    else:
+        logger("\n[步骤3] 跳过角色名封包 (未设置 data 输出目录)")
+
+    logger(f"\n{'='*50}")
+    logger("导入完成!")
+    return counts
+
+class TextSearchIndex:
+    """字符串列表的二元组 (bigram) 倒排索引，用于不区分大小写的子串搜索
+    汉字/假名文本没有分词边界，按相邻两字建索引；单字也建倒排表，单字查询直接返回"""
+
+    def __init__(self, texts=()):
+        self.texts = [t.lower() for t in texts]
+        self.postings = {}
+        postings = self.postings
+        for row, text in enumerate(self.texts):
+            for gram in self._grams(text):
+                rows = postings.get(gram)
+                if rows is None:
+                    postings[gram] = {row}
+                else:
+                    rows.add(row)
+
+    @staticmethod
+    def _bigrams(text: str) -> set:
+        return {text[i:i + 2] for i in range(len(text) - 1)}
+
+    @staticmethod
+    def _grams(text: str) -> set:
+        """单字和二元组，长度不同所以可以共用一张倒排表"""
+        grams = set(text)
+        grams.update(text[i:i + 2] for i in range(len(text) - 1))
+        return grams
+
+    def __len__(self):
+        return len(self.texts)
+
+    def update(self, row: int, text: str):
+        """第 row 条文本被修改后增量更新索引"""
+        text = text.lower()
+        old = self.texts[row]
+        if text == old:
+            return
+        old_grams, new_grams = self._grams(old), self._grams(text)
+        for gram in old_grams - new_grams:
+            rows = self.postings[gram]
+            rows.discard(row)
+            if not rows:
+                del self.postings[gram]
+        for gram in new_grams - old_grams:
+            self.postings.setdefault(gram, set()).add(row)
+        self.texts[row] = text
+
+    def search(self, query: str) -> List[int]:
+        """返回包含 query 的行号 (升序)"""
+        q = query.lower()
+        if not q:
+            return []
+        if len(q) == 1:
+            return sorted(self.postings.get(q, ()))
+        sets = []
+        for gram in self._bigrams(q):
+            rows = self.postings.get(gram)
+            if not rows:
+                return []
+            sets.append(rows)
+        sets.sort(key=len)
+        hits = sets[0].intersection(*sets[1:])
+        if len(q) > 2:
+            # 二元组都出现不代表连续出现，逐条确认
+            texts = self.texts
+            hits = [i for i in hits if q in texts[i]]
+        return sorted(hits)
+
+
+def _parse_exts(text):
+    return text.replace(',', ' ').split() if text else None
+
+def cli_main(argv=None):
+    parser = argparse.ArgumentParser(prog='escude_core',
+                                     description="Escude 资源包/脚本命令行工具 (不需要 Qt)")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+
+    p = sub.add_parser('unpack', help="解包 ESC-ARC 资源包")
+    p.add_argument('archive')
+    p.add_argument('output', nargs='?', help="输出目录 (默认: 资源包路径加 ~)")
+    p.add_argument('-j', '--jobs', type=int, help="并行进程数 (默认自动)")
+
+    p = sub.add_parser('pack', help="把文件夹封包为 ESC-ARC2 资源包")
+    p.add_argument('folder')
+    p.add_argument('output')
+    p.add_argument('--base', help="原资源包：只重写有变化的条目 (增量更新)")
+    p.add_argument('--compress', help="要 acp 压缩的扩展名，如 .bin,.001")
+    p.add_argument('--compress-min', type=float, help="只压缩不小于该大小 (KB) 的文件")
+    p.add_argument('--dedup', action='store_true', help="内容相同的文件只存一份 (不能与 --base 同用)")
+    p.add_argument('-j', '--jobs', type=int, help="并行进程数 (默认自动)")
+
+    p = sub.add_parser('diff', help="比较两个资源包，只把有变化的条目写入补丁")
+    p.add_argument('base', help="原资源包")
+    p.add_argument('target', help="新资源包")
+    p.add_argument('patch', help="输出的补丁文件")
+
+    p = sub.add_parser('patch', help="把补丁应用到原资源包，重建新资源包")
+    p.add_argument('base', help="原资源包")
+    p.add_argument('patch')
+    p.add_argument('output')
+    p.add_argument('--no-verify', action='store_true', help="写出前不校验目标哈希")
+
+    p = sub.add_parser('extract-text', help="提取 ACPX 脚本文本为 TXT")
+    p.add_argument('scripts', help="包含 .bin/.001 的目录或 script.bin 资源包")
+    p.add_argument('output')
+    p.add_argument('--data', default='', help="包含 db_scripts.bin 的目录或 data.bin (提取角色名)")
+    p.add_argument('--encoding', default='cp932', help="原文编码 (默认 cp932)")
+    p.add_argument('-j', '--jobs', type=int, help="并行进程数 (默认自动)")
+
+    p = sub.add_parser('pack-text', help="把 TXT 回填到原始脚本")
+    p.add_argument('txt_dir')
+    p.add_argument('scripts', help="原始 .bin/.001 所在目录")
+    p.add_argument('output')
+    p.add_argument('--data', default='', help="原始 db_scripts.bin 所在目录 (写回角色名)")
+    p.add_argument('--data-output', default='', help="新 db_scripts.bin 的输出目录")
+    p.add_argument('--encoding', default='cp936', help="目标编码 (默认 cp936)")
+    p.add_argument('--force', action='store_true', help="忽略清单，全部重新生成")
+    p.add_argument('--link', action='store_true', help="未修改的 .bin 用硬链接代替复制")
+    p.add_argument('-j', '--jobs', type=int, help="并行进程数 (默认自动)")
+
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    ok = True
+    if args.cmd == 'unpack':
+        output = args.output or args.archive + "~"
+        EscudeManager.unpack_archive(args.archive, output, workers=args.jobs)
+    elif args.cmd == 'pack':
+        options = {
+            'compress_exts': _parse_exts(args.compress),
+            'compress_min_size': int(args.compress_min * 1024) if args.compress_min is not None else None,
+            'workers': args.jobs,
+            'atomic': True,
+        }
+        if args.base:
+            if args.dedup:
+                parser.error("--dedup 不能与 --base 同时使用")
+            EscudeManager.update_archive(args.base, args.folder, args.output, **options)
+        else:
+            EscudeManager.pack_archive(args.folder, args.output, dedup=args.dedup, **options)
+    elif args.cmd == 'diff':
+        EscudeManager.diff_archive(args.base, args.target, args.patch)
+    elif args.cmd == 'patch':
+        EscudeManager.apply_patch(args.base, args.patch, args.output, verify=not args.no_verify)
+    elif args.cmd == 'extract-text':
+        counts = extract_text_all(args.scripts, args.output, args.data, args.encoding, workers=args.jobs)
+        ok = not counts['fail']
+    elif args.cmd == 'pack-text':
+        counts = pack_text_all(args.txt_dir, args.scripts, args.output, args.encoding, args.data,
+                               args.data_output, workers=args.jobs, incremental=not args.force,
+                               link_unchanged=args.link)
+        ok = not counts['fail']
+    print(f"耗时 {time.perf_counter() - start:.2f} s")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(cli_main())
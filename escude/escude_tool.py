@@ -1,13 +1,8 @@
 # -*- coding:utf-8 -*-
 import os
 import sys
-import struct
-import json
-import shutil
-import random
-from io import BytesIO
-from dataclasses import dataclass
-from typing import List, Tuple, Optional
+
+from escude_core import EscudeManager, TextSearchIndex, extract_text_all, pack_text_all
 
 os.environ["QT_QPA_FONTDIR"] = ""
 
@@ -15,10 +10,11 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLabel, QFileDialog,
                              QTextEdit, QProgressBar, QFrame, QLineEdit,
                              QGraphicsDropShadowEffect, QStackedWidget, QMessageBox, 
-                             QComboBox, QRadioButton, QButtonGroup, QListWidget,
-                             QListWidgetItem, QSplitter, QScrollArea, QSizePolicy)
+                             QComboBox, QRadioButton, QButtonGroup, QListView, QCheckBox,
+                             QSplitter, QScrollArea, QSizePolicy)
 from PyQt6.QtCore import (Qt, QThread, pyqtSignal, QPropertyAnimation, QEasingCurve, 
-                          QPoint, QRectF, QUrl, QSettings, pyqtProperty, QMimeData)
+                          QPoint, QRectF, QUrl, QSettings, pyqtProperty, QMimeData,
+                          QAbstractListModel, QModelIndex, QTimer)
 from PyQt6.QtGui import (QFont, QColor, QPainter, QPainterPath, QDragEnterEvent, 
                          QDropEvent, QDesktopServices, QPen, QCloseEvent, QLinearGradient,
                          QFontDatabase)
@@ -57,15 +53,6 @@ def get_jp_font(size=10):
     font.setStyleStrategy(QFont.StyleStrategy.PreferAntialias)
     return font
 
-OPDICT = {
-    '01': '', '02': 'I', '03': '', '04': 'I', '05': 'I', '06': '', '07': 'I', '09': 'I',
-    '0a': 'I', '0b': 'I', '0c': 'I', '0d': 'I', '0e': '', '0f': 'I', '10': 'I', '11': 'I',
-    '12': '', '14': '', '13': '', '16': '', '18': '', '19': '', '1a': '', '1b': '',
-    '1c': '', '1d': '', '1e': '', '1f': '', '20': '', '21': '', '22': '', '23': '',
-    '24': '', '25': '', '26': '', '27': '', '28': 'I', '29': 's', '2a': '', '2b': 'sI',
-    '2c': 'I', '2d': 'I'
-}
-
 ENCODINGS = {
     "日文 (CP932/Shift-JIS)": "cp932",
     "简体中文 (CP936/GBK)": "cp936", 
@@ -74,11 +61,6 @@ ENCODINGS = {
 }
 
 CONFIG_FILE = "acpx_config.json"
-SHIFT_JIS = 'cp932'
-
-ENUM_ENTRY_SIZE = 132
-ENUM_HEADER_SIZE = 16
-ENUM_MAGIC = b'LIST'
 
 THEMES = {
     "🌸 樱花 (Sakura)": {
@@ -138,954 +120,48 @@ THEMES = {
     }
 }
 
-class BytesReader:
-    def __init__(self, data):
-        self.data = data
-        self.pos = 0
-    def read(self, n):
-        res = self.data[self.pos:self.pos+n]
-        self.pos += n
-        return res
-    def readU32(self):
-        if self.pos + 4 > len(self.data): return 0
-        return struct.unpack('<I', self.read(4))[0]
-    def seek(self, pos):
-        self.pos = pos
-    def tell(self):
-        return self.pos
-    def is_end(self):
-        return self.pos >= len(self.data)
-    def read_until_zero(self, terminator=b'\x00'):
-        start = self.pos
-        end = self.data.find(terminator, start)
-        if end == -1: end = len(self.data)
-        res = self.data[start:end]
-        self.pos = end + len(terminator)
-        return res
-
-class EscudeCrypto:
-    def __init__(self, key: int):
-        self._key = key & 0xFFFFFFFF
-
-    @property
-    def key(self) -> int:
-        self._key ^= 0x65AC9365
-        self._key &= 0xFFFFFFFF
-        term1 = ((self._key >> 1) ^ self._key) >> 3
-        term2 = ((self._key << 1) ^ self._key) & 0xFFFFFFFF
-        term2 = (term2 << 3) & 0xFFFFFFFF
-        self._key ^= (term1 ^ term2)
-        self._key &= 0xFFFFFFFF
-        return self._key
-
-    def decrypt(self, data: bytes) -> bytes:
-        output = bytearray(data)
-        length = len(output)
-        for i in range(0, length & ~3, 4):
-            current_key = self.key
-            chunk = struct.unpack_from('<I', output, i)[0]
-            decrypted = chunk ^ current_key
-            struct.pack_into('<I', output, i, decrypted)
-        return bytes(output)
-
-    def encrypt(self, data: bytes) -> bytes:
-        return self.decrypt(data)
-
-class MsbBitStream:
-    def __init__(self, data: bytes):
-        self.input = BytesIO(data)
-        self.bits = 0
-        self.cached_bits = 0
-
-    def get_bits(self, count: int) -> int:
-        while self.cached_bits < count:
-            b = self.input.read(1)
-            if not b:
-                return -1
-            byte_val = ord(b)
-            self.bits = (self.bits << 8) | byte_val
-            self.cached_bits += 8
-        mask = (1 << count) - 1
-        self.cached_bits -= count
-        return (self.bits >> self.cached_bits) & mask
-
-class LzwDecoder:
-    def __init__(self, data: bytes, unpacked_size: int):
-        self.bit_stream = MsbBitStream(data)
-        self.output = bytearray(unpacked_size)
-        self.unpacked_size = unpacked_size
-
-    def unpack(self) -> bytes:
-        dst = 0
-        lzw_dict_size = 0x8900
-        lzw_dict = [0] * lzw_dict_size 
-        token_width = 9
-        dict_pos = 0
-        
-        while dst < len(self.output):
-            token = self.bit_stream.get_bits(token_width)
-            if token == -1:
-                break
-            if token == 0x100:
-                break
-            elif token == 0x101:
-                token_width += 1
-                if token_width > 24:
-                    raise ValueError("Invalid compressed stream (Token Width > 24)")
-            elif token == 0x102:
-                token_width = 9
-                dict_pos = 0
-            else:
-                if dict_pos >= len(lzw_dict):
-                    raise ValueError("Invalid compressed stream (Dict Full)")
-                lzw_dict[dict_pos] = dst
-                dict_pos += 1
-                if token < 0x100:
-                    self.output[dst] = token
-                    dst += 1
-                else:
-                    token -= 0x103
-                    if token >= dict_pos:
-                        raise ValueError("Invalid compressed stream (Token out of bounds)")
-                    src = lzw_dict[token]
-                    ref_next = 0
-                    if token + 1 < len(lzw_dict):
-                        ref_next = lzw_dict[token + 1]
-                    if src >= len(self.output): 
-                        raise ValueError("Dict reference out of bounds")
-                    count = min(len(self.output) - dst, ref_next - src + 1)
-                    if count < 0:
-                        raise ValueError(f"Invalid count: {count}")
-                    for i in range(count):
-                        self.output[dst + i] = self.output[src + i]
-                    dst += count
-        return bytes(self.output)
-
-@dataclass
-class BinEntry:
-    n_offset: int
-    d_offset: int
-    length: int
-
-    @staticmethod
-    def struct_fmt() -> str:
-        return "<3I"
-
-    @staticmethod
-    def size() -> int:
-        return struct.calcsize(BinEntry.struct_fmt())
-
-@dataclass
-class BinHeader:
-    file_count: int
-    name_tbl_len: int
-    entries: List[BinEntry]
-
-    @staticmethod
-    def parse(data: bytes) -> 'BinHeader':
-        fmt_head = "<2I"
-        head_size = struct.calcsize(fmt_head)
-        file_count, name_tbl_len = struct.unpack_from(fmt_head, data, 0)
-        entries = []
-        offset = head_size
-        entry_size = BinEntry.size()
-        entry_fmt = BinEntry.struct_fmt()
-        for _ in range(file_count):
-            n_off, d_off, ln = struct.unpack_from(entry_fmt, data, offset)
-            entries.append(BinEntry(n_off, d_off, ln))
-            offset += entry_size
-        return BinHeader(file_count, name_tbl_len, entries)
-
-    def pack(self) -> bytes:
-        out = bytearray()
-        out.extend(struct.pack("<2I", self.file_count, self.name_tbl_len))
-        for entry in self.entries:
-            out.extend(struct.pack(BinEntry.struct_fmt(), entry.n_offset, entry.d_offset, entry.length))
-        return bytes(out)
-
-class EscudeManager:
-    @staticmethod
-    def unpack_archive(file_path: str, output_dir: str, logger=print):
-        with open(file_path, 'rb') as f:
-            f.seek(0x8)
-            raw_key = struct.unpack('<I', f.read(4))[0]
-            temp_crypto = EscudeCrypto(raw_key)
-            decryption_key = temp_crypto.key
-            f.seek(0xC)
-            enc_count = struct.unpack('<I', f.read(4))[0]
-            file_count = enc_count ^ decryption_key
-            header_size = (file_count * 12) + 8
-            crypto = EscudeCrypto(raw_key)
-            f.seek(0xC)
-            encrypted_header = f.read(header_size)
-            header_data = crypto.decrypt(encrypted_header)
-            bin_header = BinHeader.parse(header_data)
-            if bin_header.file_count != file_count:
-                logger(f"警告: 文件数不匹配 {bin_header.file_count} != {file_count}")
-            name_table_start = 0xC + 8 + (bin_header.file_count * 12)
-            os.makedirs(output_dir, exist_ok=True)
-            extracted = 0
-            for entry in bin_header.entries:
-                name_offset_abs = name_table_start + entry.n_offset
-                f.seek(name_offset_abs)
-                file_name = EscudeManager.read_cstring(f)
-                f.seek(entry.d_offset)
-                content = f.read(entry.length)
-                if content.startswith(b'acp\x00'):
-                    content = EscudeManager.decompress(content)
-                out_path = os.path.join(output_dir, file_name)
-                os.makedirs(os.path.dirname(out_path) if os.path.dirname(out_path) else output_dir, exist_ok=True)
-                with open(out_path, 'wb') as out_f:
-                    out_f.write(content)
-                extracted += 1
-                logger(f"  解包: {file_name}")
-        logger(f"完成! 共解包 {extracted} 个文件到 {output_dir}")
-        return bin_header
-
-    @staticmethod
-    def read_cstring(f) -> str:
-        chars = []
-        while True:
-            b = f.read(1)
-            if b == b'\x00' or not b:
-                break
-            chars.append(b)
-        return b"".join(chars).decode(SHIFT_JIS, errors='replace')
-
-    @staticmethod
-    def decompress(data: bytes) -> bytes:
-        if len(data) < 8:
-            return data
-        magic = data[0:4]
-        if magic != b'acp\x00':
-            return data
-        unpacked_len = struct.unpack('>I', data[4:8])[0]
-        decoder = LzwDecoder(data[8:], unpacked_len)
-        decoder.unpack()
-        return decoder.output
-
-    @staticmethod
-    def pack_archive(folder_path: str, output_file: str, logger=print):
-        files = []
-        for root, dirs, filenames in os.walk(folder_path):
-            for filename in filenames:
-                if filename == "FileList.lst":
-                    continue
-                rel_path = os.path.relpath(os.path.join(root, filename), folder_path)
-                files.append((rel_path, os.path.join(root, filename)))
-        bin_entries = []
-        file_blobs = []
-        name_blob = bytearray()
-        for rel_path, full_path in files:
-            with open(full_path, 'rb') as f:
-                content = f.read()
-            file_blobs.append(content)
-            try:
-                enc_name = rel_path.encode(SHIFT_JIS)
-            except UnicodeEncodeError:
-                enc_name = rel_path.encode(SHIFT_JIS, errors='replace')
-            name_offset_rel = len(name_blob)
-            name_blob.extend(enc_name)
-            name_blob.append(0)
-            entry = BinEntry(n_offset=name_offset_rel, d_offset=0, length=len(content))
-            bin_entries.append(entry)
-        header_struct_size = 8 + (len(files) * 12)
-        name_tbl_len = len(name_blob)
-        data_start_offset = 0xC + header_struct_size + name_tbl_len
-        current_off = data_start_offset
-        for i in range(len(bin_entries)):
-            bin_entries[i].d_offset = current_off
-            current_off += bin_entries[i].length
-        header_obj = BinHeader(len(files), name_tbl_len, bin_entries)
-        header_bytes = header_obj.pack()
-        key_int = random.getrandbits(32)
-        key_bytes = struct.pack('<I', key_int)
-        crypto = EscudeCrypto(key_int)
-        encrypted_header = crypto.encrypt(header_bytes)
-        with open(output_file, 'wb') as out_f:
-            out_f.write(b'ESC-ARC2')
-            out_f.write(key_bytes)
-            out_f.write(encrypted_header)
-            out_f.write(name_blob)
-            for blob in file_blobs:
-                out_f.write(blob)
-        logger(f"完成! 共打包 {len(files)} 个文件到 {output_file}")
-
-    @staticmethod
-    def load_script(path: str) -> Tuple[List[str], dict]:
-        with open(path, 'rb') as f:
-            data = f.read()
-        if data[:8].decode('ascii', errors='ignore') != "ESCR1_00":
-            raise ValueError("无效的脚本签名 (需要 ESCR1_00)")
-        offset = 8
-        str_count = struct.unpack_from('<I', data, offset)[0]
-        offset += 4
-        str_offsets = []
-        for _ in range(str_count):
-            off = struct.unpack_from('<I', data, offset)[0]
-            str_offsets.append(off)
-            offset += 4
-        vm_len = struct.unpack_from('<I', data, offset)[0]
-        offset += 4
-        vm_data = data[offset : offset+vm_len]
-        offset += vm_len
-        unk1 = struct.unpack_from('<I', data, offset)[0]
-        offset += 4
-        string_table_start = offset
-        strings = []
-        for rel_off in str_offsets:
-            abs_off = string_table_start + rel_off
-            st = EscudeManager.read_cstring_bytes(data, abs_off)
-            strings.append(st)
-        decoded_strings = [EscudeManager.decode_script_string(s) for s in strings]
-        context = {
-            'vm_data': vm_data,
-            'unk1': unk1,
-            'header_sig': b"ESCR1_00"
-        }
-        return decoded_strings, context
-
-    @staticmethod
-    def read_cstring_bytes(data: bytes, offset: int) -> str:
-        end = data.find(b'\x00', offset)
-        if end == -1:
-            end = len(data)
-        raw = data[offset:end]
-        return raw.decode(SHIFT_JIS, errors='replace')
-
-    @staticmethod
-    def decode_script_string(text: str) -> str:
-        half = "!?｡｢｣､･ｦｧｨｩｪｫｬｭｮｯｰｱｲｳｴｵｶｷｸｹｺｻｼｽｾｿﾀﾁﾂﾃﾄﾅﾆﾇﾈﾉﾊﾋﾌﾍﾎﾏﾐﾑﾒﾓﾔﾕﾖﾗﾘﾙﾚﾛﾜﾝﾞﾟ"
-        full = "！？。「」、…をぁぃぅぇぉゃゅょっーあいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわん゛゜"
-        res = []
-        for char in text:
-            if char in half:
-                idx = half.index(char)
-                res.append(full[idx])
-            else:
-                res.append(char)
-        return "".join(res)
-
-    @staticmethod
-    def encode_script_string(text: str) -> str:
-        half = "!?｡｢｣､･ｦｧｨｩｪｫｬｭｮｯｰｱｲｳｴｵｶｷｸｹｺｻｼｽｾｿﾀﾁﾂﾃﾄﾅﾆﾇﾈﾉﾊﾋﾌﾍﾎﾏﾐﾑﾒﾓﾔﾕﾖﾗﾘﾙﾚﾛﾜﾝﾞﾟ"
-        full = "！？。「」、…をぁぃぅぇぉゃゅょっーあいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわん゛゜"
-        res = []
-        for char in text:
-            if char in full:
-                idx = full.index(char)
-                res.append(half[idx])
-            else:
-                res.append(char)
-        return "".join(res)
-
-    @staticmethod
-    def save_script(path: str, strings: List[str], context: dict):
-        enc_strings = [EscudeManager.encode_script_string(s) for s in strings]
-        str_blob = bytearray()
-        offsets = []
-        current_len = 0
-        for s in enc_strings:
-            offsets.append(current_len)
-            b = s.encode(SHIFT_JIS, errors='replace') + b'\x00'
-            str_blob.extend(b)
-            current_len += len(b)
-        with open(path, 'wb') as f:
-            f.write(context['header_sig'])
-            f.write(struct.pack('<I', len(strings)))
-            for off in offsets:
-                f.write(struct.pack('<I', off))
-            vm_data = context['vm_data']
-            f.write(struct.pack('<I', len(vm_data)))
-            f.write(vm_data)
-            f.write(struct.pack('<I', context['unk1']))
-            f.write(str_blob)
-
-    @staticmethod
-    def load_enum_scr(filepath):
-        """读取enum_scr.bin文件 - 分行显示逻辑"""
-        with open(filepath, 'rb') as f:
-            data = f.read()
-        
-        if data[:4] != ENUM_MAGIC:
-            raise ValueError(f"Invalid magic: expected 'LIST', got {data[:4]}")
-        
-        data_size = struct.unpack_from('<I', data, 4)[0]
-        unknown1 = struct.unpack_from('<I', data, 8)[0]
-        unknown2 = struct.unpack_from('<I', data, 12)[0]
-        
-        num_blocks = (len(data) - ENUM_HEADER_SIZE) // ENUM_ENTRY_SIZE
-        
-        sub_entries = []
-        for i in range(num_blocks):
-            offset = ENUM_HEADER_SIZE + i * ENUM_ENTRY_SIZE
-            block_data = bytearray(data[offset:offset+ENUM_ENTRY_SIZE])
-            
-            # 提取字符串
-            pos = 0
-            block_strings = []
-            while pos < ENUM_ENTRY_SIZE:
-                # 跳过控制字符和 0xFF，但不跳过空格 (0x20)
-                # 很多时候名字前面可能有空格或者就是空格
-                # 按照用户要求，将空格 (0x20) 也作为分隔符处理 (separate=(\x00|\x20))
-                while pos < ENUM_ENTRY_SIZE and (block_data[pos] <= 0x20 or block_data[pos] == 0xFF):
-                    pos += 1
-                if pos >= ENUM_ENTRY_SIZE:
-                    break
-                
-                start = pos
-                while pos < ENUM_ENTRY_SIZE and block_data[pos] != 0x00 and block_data[pos] != 0x20 and block_data[pos] != 0xFF:
-                    pos += 1
-                
-                if pos > start:
-                    raw = block_data[start:pos]
-                    try:
-                        # 不使用 strip()，保留原始空格，只在显示时处理
-                        s = raw.decode('cp932')
-                        
-                        # 垃圾过滤 - 更加宽松
-                        is_garbage = False
-                        if not s: is_garbage = True
-                        # 只有当全是控制字符时才算垃圾
-                        if all(ord(c) < 0x20 for c in s): is_garbage = True
-                        if s in ['', '＿']: is_garbage = True
-                        # 允许长度为1或2的任何字符，只要能解码
-                            
-                        if not is_garbage:
-                            block_strings.append({
-                                'off': start,
-                                'len': len(raw),
-                                'text': s
-                            })
-                    except:
-                        pass
-                pos += 1
-            
-            # 如果没有找到任何字符串，也要保留一个空的
-            if not block_strings:
-                sub_entries.append({
-                    'main_index': i,
-                    'sub_index': 0,
-                    'name': '',
-                    'off': 0,
-                    'len': 0,
-                    'raw_block': block_data
-                })
-            else:
-                # 不再进行文本去重，保留块内所有独立的字符串条目
-                s_idx = 0
-                for info in block_strings:
-                    sub_entries.append({
-                        'main_index': i,
-                        'sub_index': s_idx,
-                        'name': info['text'],
-                        'off': info['off'],
-                        'len': info['len'],
-                        'raw_block': block_data
-                    })
-                    s_idx += 1
-        
-        return {
-            'data_size': data_size,
-            'unknown1': unknown1,
-            'unknown2': unknown2,
-            'raw_header': data[:ENUM_HEADER_SIZE],
-            'entries': sub_entries # 现在 entries 是平坦的子条目列表
-        }
-
-    @staticmethod
-    def save_enum_scr(filepath, enum_data):
-        """写入enum_scr.bin文件 - 精准回封逻辑"""
-        # 按 main_index 重新组织块
-        blocks_map = {}
-        for entry in enum_data['entries']:
-            m_idx = entry['main_index']
-            if m_idx not in blocks_map:
-                blocks_map[m_idx] = {
-                    'raw': bytearray(entry.get('raw_block', b'\x00' * ENUM_ENTRY_SIZE)),
-                    'subs': []
-                }
-            blocks_map[m_idx]['subs'].append(entry)
-            
-        max_idx = max(blocks_map.keys()) if blocks_map else -1
-        
-        with open(filepath, 'wb') as f:
-            # Header
-            if 'raw_header' in enum_data:
-                f.write(enum_data['raw_header'])
-            else:
-                f.write(ENUM_MAGIC)
-                f.write(struct.pack('<I', (max_idx + 1) * ENUM_ENTRY_SIZE + 8))
-                f.write(struct.pack('<I', enum_data.get('unknown1', 0)))
-                f.write(struct.pack('<I', enum_data.get('unknown2', 0x4284)))
-            
-            for i in range(max_idx + 1):
-                block_info = blocks_map.get(i)
-                if not block_info:
-                    f.write(b'\x00' * ENUM_ENTRY_SIZE)
-                    continue
-                
-                raw = block_info['raw']
-                # 按偏移排序，避免写入冲突
-                subs = sorted(block_info['subs'], key=lambda x: x['off'])
-                
-                for entry in subs:
-                    if not entry['name'] or entry['len'] == 0:
-                        continue
-                    
-                    try:
-                        new_bytes = entry['name'].encode('cp932')
-                        # 计算限制空间：不撞到下一个子条目的起始位置，且不超过块末尾
-                        limit = ENUM_ENTRY_SIZE - entry['off']
-                        
-                        # 查找下一个被占用的位置
-                        next_occupied = ENUM_ENTRY_SIZE
-                        for other in subs:
-                            if other['off'] > entry['off']:
-                                next_occupied = other['off']
-                                break
-                        
-                        limit = next_occupied - entry['off']
-                        
-                        # 写入
-                        write_len = min(len(new_bytes), limit - 1)
-                        for k in range(write_len):
-                            raw[entry['off'] + k] = new_bytes[k]
-                        
-                        # 补零
-                        if entry['off'] + write_len < ENUM_ENTRY_SIZE:
-                            raw[entry['off'] + write_len] = 0x00
-                    except:
-                        pass
-                
-                f.write(raw)
-
+class RowListModel(QAbstractListModel):
+    """直接引用数据数组的只读列表模型，行文本在视图绘制时才由 formatter(row) 生成
+    单行修改通过 row_changed 记录，在事件循环空闲时合并成一次 dataChanged"""
 
+    def __init__(self, formatter, parent=None):
+        super().__init__(parent)
+        self.formatter = formatter
+        self.rows = []
+        self._dirty = None
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self._dirty = None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and 0 <= index.row() < len(self.rows):
+            return self.formatter(index.row())
+        return None
 
-    @staticmethod
-    def export_enum_to_txt(enum_data, output_path):
-        """导出enum_scr为TXT文件"""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write("# enum_scr.bin 导出\n")
-            f.write("# 格式: [主索引.子索引] 名称\n")
-            f.write("#\n")
-            
-            for entry in enum_data['entries']:
-                f.write(f"[{entry['main_index']:3d}.{entry['sub_index']}] {entry['name']}\n")
-
-    @staticmethod
-    def import_enum_from_txt(txt_path, current_enum_data):
-        """从TXT文件导入名称"""
-        if not current_enum_data: return None
-        
-        new_names = {}
-        with open(txt_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.startswith('[') and ']' in line:
-                    try:
-                        idx_part = line[1:line.find(']')]
-                        name = line[line.find(']')+1:].strip()
-                        new_names[idx_part.strip()] = name
-                    except:
-                        continue
-        
-        for entry in current_enum_data['entries']:
-            key = f"{entry['main_index']:3d}.{entry['sub_index']}"
-            if key in new_names:
-                entry['name'] = new_names[key]
-        
-        return current_enum_data
-
-    @staticmethod
-    def export_enum_to_json(enum_data, output_path):
-        """导出enum_scr为JSON文件"""
-        import base64
-        export_data = {
-            'header': {
-                'data_size': enum_data['data_size'],
-                'unknown1': enum_data['unknown1'],
-                'unknown2': enum_data['unknown2'],
-                'raw_header': base64.b64encode(enum_data.get('raw_header', b'')).decode('ascii')
-            },
-            'entries': []
-        }
-        
-        for entry in enum_data['entries']:
-            export_data['entries'].append({
-                'main_index': entry['main_index'],
-                'sub_index': entry['sub_index'],
-                'name': entry['name'],
-                'off': entry['off'],
-                'len': entry['len'],
-                'raw_block': base64.b64encode(entry.get('raw_block', b'')).decode('ascii')
-            })
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2)
-
-    @staticmethod
-    def import_enum_from_json(json_path):
-        """从JSON文件导入enum_scr"""
-        import base64
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        header = data['header']
-        return {
-            'data_size': header['data_size'],
-            'unknown1': header['unknown1'],
-            'unknown2': header['unknown2'],
-            'raw_header': base64.b64decode(header.get('raw_header', '')),
-            'entries': [
-                {
-                    'main_index': e['main_index'],
-                    'sub_index': e['sub_index'],
-                    'name': e['name'],
-                    'off': e['off'],
-                    'len': e['len'],
-                    'raw_block': bytearray(base64.b64decode(e.get('raw_block', '')))
-                }
-                for e in data['entries']
-            ]
-        }
-
-def xor_bytes(data, key=0x55):
-    return bytes([b ^ key for b in data])
-
-def extract_names(db_scripts_path, src_encoding='cp932', logger=print):
-    with open(db_scripts_path, 'rb') as f:
-        data = f.read()
-    names = [{"name": ""}]
-    if data[:4] == b'mdb\x00':
-        logger("检测到 MDB 格式数据库")
-        name_start = data.find(b'\x88\xea\x8e\xf7')
-        if name_start == -1:
-            name_start = 1400
-        i = name_start
-        while i < len(data):
-            end = data.find(b'\x00', i)
-            if end == -1 or end == i:
-                i += 1
-                continue
-            chunk = data[i:end]
-            if len(chunk) >= 1:
-                try:
-                    text = chunk.decode(src_encoding)
-                    if text in ['登場人物', '名前', '文字色', 'itsu', 'kago', 'wman', 'other']:
-                        break
-                    if len(text) >= 1:
-                        names.append({"name": text})
-                except:
-                    pass
-            i = end + 1
-    else:
-        reader = BytesReader(data)
-        reader.read(8)
-        count = reader.readU32()
-        size = reader.readU32()
-        offsets = [reader.readU32() for _ in range(count)]
-        header_end = reader.tell()
-        for i in range(count):
-            reader.seek(header_end + offsets[i])
-            s_bytes = reader.read_until_zero(b'\x00')
-            try:
-                name = s_bytes.decode(src_encoding)
-                names.append({"name": name})
-            except:
-                names.append({"name": ""})
-    logger(f"提取了 {len(names)} 个人名")
-    return names
-
-def pack_names(names, db_scripts_path, output_path, dst_encoding='cp932', logger=print):
-    with open(db_scripts_path, 'rb') as f:
-        data = bytearray(f.read())
-    if data[:4] == b'mdb\x00':
-        logger("检测到 MDB 格式，进行人名替换...")
-        original_names = []
-        name_start = data.find(b'\x88\xea\x8e\xf7')
-        if name_start == -1:
-            name_start = 1400
-        name_positions = []
-        i = name_start
-        while i < len(data):
-            end = data.find(b'\x00', i)
-            if end == -1 or end == i:
-                i += 1
-                continue
-            chunk = data[i:end]
-            if len(chunk) >= 1:
-                try:
-                    text = chunk.decode('cp932')
-                    if text in ['登場人物', '名前', '文字色', 'itsu', 'kago', 'wman', 'other']:
-                        break
-                    if len(text) >= 1:
-                        original_names.append(text)
-                        name_positions.append((i, end))
-                except:
-                    pass
-            i = end + 1
-        new_names = [n.get("name", "") for n in names[1:]]
-        if len(new_names) != len(original_names):
-            logger(f"警告: 人名数量不匹配 (原始:{len(original_names)}, 新:{len(new_names)})")
-        replaced = 0
-        for idx, (start, end) in enumerate(name_positions):
-            if idx >= len(new_names):
-                break
-            old_name = original_names[idx]
-            new_name = new_names[idx]
-            if old_name != new_name:
-                old_bytes = old_name.encode('cp932')
-                new_bytes = new_name.encode(dst_encoding, errors='ignore')
-                if len(new_bytes) <= len(old_bytes):
-                    padding = len(old_bytes) - len(new_bytes)
-                    new_bytes = new_bytes + b'\x00' * padding
-                    data[start:end] = new_bytes
-                    replaced += 1
-                    logger(f"  替换: {old_name} -> {new_name}")
-                else:
-                    logger(f"  跳过: {new_name} (新名字太长)")
-        with open(output_path, 'wb') as f:
-            f.write(data)
-        logger(f"已替换 {replaced} 个人名到 {os.path.basename(output_path)}")
-        return True
-    magic = data[:8]
-    encoded_names = []
-    for i, entry in enumerate(names):
-        if i == 0:
-            encoded_names.append(b'')
+    def row_changed(self, row: int):
+        if self._dirty is None:
+            self._dirty = [row, row]
+            QTimer.singleShot(0, self._flush)
         else:
-            name = entry.get("name", "")
-            encoded_names.append(name.encode(dst_encoding, errors='ignore'))
-    name_data = b'\x00'.join(encoded_names) + b'\x00'
-    offsets = []
-    cur = 0
-    for enc in encoded_names:
-        offsets.append(cur)
-        cur += len(enc) + 1
-    new_data = bytes(magic)
-    new_data += struct.pack('<I', len(encoded_names))
-    new_data += struct.pack('<I', len(name_data))
-    for off in offsets:
-        new_data += struct.pack('<I', off)
-    new_data += name_data
-    with open(output_path, 'wb') as f:
-        f.write(new_data)
-    logger(f"已打包 {len(names)} 个人名到 {os.path.basename(output_path)}")
-    return True
-
-class ACPX_001:
-    def __init__(self, data=None):
-        self.magic = b'@mess:__'
-        self.strings = []
-        self.is_valid = False
-        if data:
-            if len(data) < 16:
-                return
-            magic = data[:8]
-            if magic == b'@mess:__':
-                self.is_valid = True
-                reader = BytesReader(data)
-                reader.read(8)
-                count = reader.readU32()
-                size = reader.readU32()
-                offsets = [reader.readU32() for _ in range(count)]
-                header_end = reader.tell()
-                for i in range(count):
-                    reader.seek(header_end + offsets[i])
-                    s_bytes = reader.read_until_zero(b'\x55')
-                    self.strings.append(xor_bytes(s_bytes, 0x55))
-    
-    def save(self):
-        encoded = [xor_bytes(s, 0x55) for s in self.strings]
-        data = b'\x55'.join(encoded) + b'\x55'
-        offsets = []
-        cur = 0
-        for s in encoded:
-            offsets.append(cur)
-            cur += len(s) + 1
-        res = self.magic + struct.pack('<II', len(offsets), len(data))
-        res += b''.join([struct.pack('<I', o) for o in offsets])
-        res += data
-        return res
-
-class ACPX_Bin:
-    def __init__(self, bin_data, mess_data=None):
-        reader = BytesReader(bin_data)
-        self.magic = reader.read(8)
-        self.code_len = reader.readU32()
-        self.num_bin_str = reader.readU32()
-        self.bin_str_len = reader.readU32()
-        self.num_001_str = reader.readU32()
-        code_bytes = reader.read(self.code_len)
-        self.bin_str_offsets = [reader.readU32() for _ in range(self.num_bin_str)]
-        self.bin_str_data = reader.read(self.bin_str_len)
-        self.mess = None
-        if mess_data:
-            self.mess = ACPX_001(mess_data)
-        self.commands = []
-        c_reader = BytesReader(code_bytes)
-        while not c_reader.is_end():
-            op_byte = c_reader.read(1)
-            if not op_byte: break
-            op = op_byte.hex()
-            args = []
-            if op in OPDICT:
-                for t in OPDICT[op]:
-                    if t in 'Is': args.append(c_reader.readU32())
-            self.commands.append({'op': op, 'args': args})
-
-    def get_text_with_names(self, names, src_encoding='cp932'):
-        res = []
-        current_name = ""
-        for cmd in self.commands:
-            if cmd['op'] == '28':
-                idx = cmd['args'][0]
-                current_name = names[idx]["name"] if idx < len(names) else ""
-            elif cmd['op'] in ('29', '2b'):
-                idx = cmd['args'][0]
-                if self.mess and idx < len(self.mess.strings):
-                    text = self.mess.strings[idx].decode(src_encoding, errors='ignore')
-                    if current_name:
-                        res.append({"name": current_name, "message": text})
-                    else:
-                        res.append({"message": text})
-                current_name = ""
-        return res
+            self._dirty[0] = min(self._dirty[0], row)
+            self._dirty[1] = max(self._dirty[1], row)
 
+    def _flush(self):
+        if self._dirty is None:
+            return
+        first, last = self._dirty
+        self._dirty = None
+        last = min(last, len(self.rows) - 1)
+        if first <= last:
+            self.dataChanged.emit(self.index(first), self.index(last), [Qt.ItemDataRole.DisplayRole])
 
 
-def unpack_text(bin_dir, output_dir, names, src_encoding='cp932', logger=print):
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    count = 0
-    skipped = 0
-    
-    for root, dirs, files in os.walk(bin_dir):
-        for f in files:
-            if f.endswith('.bin'):
-                rel_path = os.path.relpath(root, bin_dir)
-                out_folder = output_dir if rel_path == '.' else os.path.join(output_dir, rel_path)
-                if not os.path.exists(out_folder):
-                    os.makedirs(out_folder)
-                logger(f"处理 {f}...")
-                bin_path = os.path.join(root, f)
-                with open(bin_path, 'rb') as f_bin: bin_data = f_bin.read()
-                
-                try:
-                    if bin_data[:8] == b'ESCR1_00':
-                        strings, context = EscudeManager.load_script(bin_path)
-                        
-                        out_name = os.path.splitext(f)[0] + ".txt"
-                        out_path = os.path.join(out_folder, out_name)
-                        with open(out_path, 'w', encoding='utf-8') as f_out:
-                            for i, s in enumerate(strings):
-                                if s.strip():
-                                    f_out.write(f"○{i:06d}○{s}\n")
-                                    f_out.write(f"●{i:06d}●{s}\n\n")
-                        count += 1
-                        logger(f"  [ESCR] 提取 {len(strings)} 条文本 -> {out_name}")
-                        continue
-                    
-                    base_name_path, _ = os.path.splitext(bin_path)
-                    mess_path = base_name_path + ".001"
-                    if not os.path.exists(mess_path):
-                        logger(f"  跳过: 找不到对应的 .001 文件")
-                        skipped += 1
-                        continue
-                    with open(mess_path, 'rb') as f_mess: mess_data = f_mess.read()
-                    acpx = ACPX_Bin(bin_data, mess_data)
-                    if not acpx.mess or not acpx.mess.is_valid:
-                        logger(f"  跳过: .001 文件格式不匹配")
-                        skipped += 1
-                        continue
-                    
-                    # 彻底改为 1:1 映射，不提取姓名以保证索引绝对同步
-                    out_name = os.path.splitext(f)[0] + ".txt"
-                    out_path = os.path.join(out_folder, out_name)
-                    with open(out_path, 'w', encoding='utf-8') as f_out:
-                        for i, s_bytes in enumerate(acpx.mess.strings):
-                            text = s_bytes.decode(src_encoding, errors='ignore')
-                            f_out.write(f"○{i:06d}○{text}\n")
-                            f_out.write(f"●{i:06d}●{text}\n\n")
-                    
-                    count += 1
-                    logger(f"  [ACPX] 提取 {len(acpx.mess.strings)} 条文本 -> {out_name}")
-                except Exception as e:
-                    logger(f"  错误: {e}")
-                    skipped += 1
-    logger(f"完成! 共处理 {count} 个文件, 跳过 {skipped} 个")
-
-def parse_txt_line(line):
-    line = line.strip()
-    if not line:
-        return None
-    if not line.startswith("●"):
-        return None
-    import re
-    match = re.match(r'^●(\d{6})●(.*)$', line)
-    if match:
-        idx = int(match.group(1))
-        text = match.group(2)
-        return {"idx": idx, "text": text}
-    return None
-
-def parse_txt_file(txt_lines):
-    parsed = []
-    for line in txt_lines:
-        p = parse_txt_line(line)
-        if p:
-            parsed.append(p)
-    # 返回原始带索引的列表
-    return parsed
-
-def pack_text(txt_dir, bin_dir, output_dir, names, dst_encoding='cp932', logger=print):
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    count = 0
-    for root, dirs, files in os.walk(txt_dir):
-        for f in files:
-            if f.endswith('.txt') and not f.endswith('.txt.json'):
-                rel_path = os.path.relpath(root, txt_dir)
-                out_folder = output_dir if rel_path == '.' else os.path.join(output_dir, rel_path)
-                if not os.path.exists(out_folder):
-                    os.makedirs(out_folder)
-                name = f.replace('.txt', '')
-                src_bin_dir = bin_dir if rel_path == '.' else os.path.join(bin_dir, rel_path)
-                mess_path = os.path.join(src_bin_dir, f"{name}.001")
-                bin_path = os.path.join(src_bin_dir, f"{name}.bin")
-                if not os.path.exists(mess_path) or not os.path.exists(bin_path):
-                    logger(f"跳过 {f}: 找不到原始 .bin 或 .001")
-                    continue
-                with open(os.path.join(root, f), 'r', encoding='utf-8') as f_txt:
-                    txt_lines = f_txt.readlines()
-                lines = parse_txt_file(txt_lines)
-                with open(mess_path, 'rb') as f_mess:
-                    mess_data = f_mess.read()
-                with open(bin_path, 'rb') as f_bin:
-                    bin_data = f_bin.read()
-                try:
-                    acpx = ACPX_Bin(bin_data, mess_data)
-                    # 彻底改为 1:1 回填，完全无视指令 Opcode，解决错位问题
-                    fill_count = 0
-                    for item in lines:
-                        idx = item['idx']
-                        text = item['text']
-                        if idx < len(acpx.mess.strings):
-                            acpx.mess.strings[idx] = text.encode(dst_encoding, errors='ignore')
-                            fill_count += 1
-                    
-                    out_mess_path = os.path.join(out_folder, f"{name}.001")
-                    with open(out_mess_path, 'wb') as f_out:
-                        f_out.write(acpx.mess.save())
-                    out_bin_path = os.path.join(out_folder, f"{name}.bin")
-                    with open(out_bin_path, 'wb') as f_out:
-                        f_out.write(bin_data)
-                    count += 1
-                    logger(f"打包 {name}")
-                except Exception as e:
-                    logger(f"错误打包 {name}: {e}")
-    logger(f"完成! 共打包 {count} 个文件")
-
 class AnimButton(QPushButton):
     def __init__(self, btn_type, func, parent=None):
         super().__init__(parent)
@@ -1348,6 +424,7 @@ class Worker(QThread):
     prog = pyqtSignal(int)
     done = pyqtSignal(str)
     err = pyqtSignal(str)
+    status = pyqtSignal(str, str)  # 文件名, ok/fail/skip
     
     def __init__(self, mode, params):
         super().__init__()
@@ -1357,80 +434,43 @@ class Worker(QThread):
     def run(self):
         try:
             if self.mode == 'unpack_text':
-                input_d = self.params['input_dir']
-                output_d = self.params['output_dir']
-                data_input_d = self.params['data_input_dir']
-                src_enc = self.params['src_encoding']
-                db_scripts_path = os.path.join(data_input_d, "db_scripts.bin") if data_input_d else ""
-                
-                names = [{"name": ""}]
-                if data_input_d and os.path.exists(db_scripts_path):
-                    self.log.emit("\n[步骤1] 从 db_scripts.bin 提取角色名...")
-                    names = extract_names(db_scripts_path, src_enc, logger=self.log.emit)
-                    os.makedirs(output_d, exist_ok=True)
-                    names_file = os.path.join(output_d, 'names.txt')
-                    with open(names_file, 'w', encoding='utf-8') as f:
-                        for item in names:
-                            f.write(item.get("name", "") + "\n")
-                    self.log.emit(f"角色名已保存: {names_file}")
-                else:
-                    self.log.emit("\n[步骤1] 跳过角色名提取 (未设置data目录)")
-                self.log.emit("\n[步骤2] 提取对话文本...")
-                unpack_text(input_d, output_d, names, src_enc, logger=self.log.emit)
-                self.log.emit(f"\n{'='*50}")
-                self.log.emit("提取完成!")
-                self.log.emit(f"TXT文件已保存到: {output_d}")
+                extract_text_all(self.params['input_dir'], self.params['output_dir'],
+                                 self.params['data_input_dir'], self.params['src_encoding'],
+                                 logger=self.log.emit, workers=self.params.get('workers'),
+                                 progress=self.prog.emit)
                 self.done.emit("提取成功")
                 
             elif self.mode == 'pack_text':
-                input_d = self.params['input_dir']
-                output_d = self.params['output_dir']
+                # 未设置 data 目录时，在 TXT 目录中按相对路径找原始脚本
                 data_input_d = self.params.get('data_input_dir', '')
-                data_output_d = self.params.get('data_output_dir', '')
-                dst_enc = self.params['dst_encoding']
-                
-                # 处理人名数据
-                names = []
-                names_file = os.path.join(input_d, 'names.txt')
-                if os.path.exists(names_file):
-                    self.log.emit("\n[步骤1] 读取角色名...")
-                    with open(names_file, 'r', encoding='utf-8') as f:
-                        names = [{"name": line.strip()} for line in f.readlines()]
-                    self.log.emit(f"已加载 {len(names)} 个角色名")
-                else:
-                    self.log.emit("\n[步骤1] 跳过角色名加载 (names.txt 不存在)")
-
-                self.log.emit("\n[步骤2] 导入对话文本...")
-                os.makedirs(output_d, exist_ok=True)
-                # 如果没有 data_input_d，pack_text 内部会根据 rel_path 找文件，
-                # 我们这里主要确保 bin_dir 路径有效
-                pack_text(input_d, data_input_d if data_input_d else input_d, output_d, names, dst_enc, logger=self.log.emit)
-                
-                # 如果提供了 data 输出路径且 db_scripts 存在，则尝试封包人名
-                if data_input_d and data_output_d:
-                    db_scripts_path = os.path.join(data_input_d, "db_scripts.bin")
-                    if os.path.exists(db_scripts_path):
-                        self.log.emit("\n[步骤3] 导入角色名到 db_scripts.bin...")
-                        os.makedirs(data_output_d, exist_ok=True)
-                        db_out_path = os.path.join(data_output_d, "db_scripts.bin")
-                        pack_names(names, db_scripts_path, db_out_path, dst_enc, logger=self.log.emit)
-                    else:
-                        self.log.emit("\n[步骤3] 跳过角色名封包 (找不到原始 db_scripts.bin)")
-                else:
-                    self.log.emit("\n[步骤3] 跳过角色名封包 (未设置 data 输出目录)")
-                
-                self.log.emit(f"\n{'='*50}")
-                self.log.emit("导入完成!")
+                pack_text_all(self.params['input_dir'], data_input_d or self.params['input_dir'],
+                              self.params['output_dir'], self.params['dst_encoding'],
+                              data_input_d, self.params.get('data_output_dir', ''),
+                              logger=self.log.emit, workers=self.params.get('workers'),
+                              progress=self.prog.emit)
                 self.done.emit("导入成功")
                 
             elif self.mode == 'unpack_archive':
-                EscudeManager.unpack_archive(self.params['input'], self.params['output'], logger=self.log.emit)
+                EscudeManager.unpack_archive(self.params['input'], self.params['output'], logger=self.log.emit,
+                                             progress=self.prog.emit)
                 self.done.emit(self.params['output'])
                 
             elif self.mode == 'pack_archive':
-                EscudeManager.pack_archive(self.params['folder'], self.params['output'], logger=self.log.emit)
+                EscudeManager.pack_archive(self.params['folder'], self.params['output'], logger=self.log.emit,
+                                           compress_exts=self.params.get('compress_exts'),
+                                           compress_min_size=self.params.get('compress_min_size'),
+                                           progress=self.prog.emit, atomic=True,
+                                           dedup=self.params.get('dedup', False))
                 self.done.emit("打包成功")
                 
+            elif self.mode == 'update_archive':
+                EscudeManager.update_archive(self.params['input'], self.params['folder'], self.params['output'],
+                                             logger=self.log.emit,
+                                             compress_exts=self.params.get('compress_exts'),
+                                             compress_min_size=self.params.get('compress_min_size'),
+                                             progress=self.prog.emit, atomic=True)
+                self.done.emit("更新成功")
+                
             elif self.mode == 'decompress':
                 with open(self.params['file'], 'rb') as f:
                     data = f.read()
@@ -1442,6 +482,26 @@ class Worker(QThread):
                 self.log.emit(f"原始大小: {len(data):,} 字节")
                 self.log.emit(f"解压后: {len(decompressed):,} 字节")
                 self.done.emit(out_path)
+                
+            elif self.mode in ('escr_extract', 'escr_pack'):
+                p = self.params
+                kwargs = dict(logger=self.log.emit, status=self.status.emit, progress=self.prog.emit,
+                              cancelled=self.isInterruptionRequested, skip_newer=p.get('skip_newer', True))
+                if self.mode == 'escr_extract':
+                    summary = EscudeManager.escr_extract_all(p['input'], p['output'], **kwargs)
+                    title = "解包"
+                else:
+                    summary = EscudeManager.escr_pack_all(p['input'], p['template'], p['output'], **kwargs)
+                    title = "封包"
+                result = (f"{summary['ok']} 成功, {summary['failed']} 失败, {summary['skipped']} 跳过"
+                          f"\n输出: {p['output']}")
+                self.log.emit("")
+                if summary['cancelled']:
+                    self.log.emit(f"已取消! {result}")
+                    self.done.emit(f"{title}已取消\n{result}")
+                else:
+                    self.log.emit(f"完成! {result}")
+                    self.done.emit(f"{title}完成!\n{result}")
         except Exception as e:
             import traceback
             self.err.emit(f"{str(e)}\n{traceback.format_exc()}")
@@ -1473,12 +533,14 @@ class EscudeApp(QMainWindow):
         self.script_path = None
         self.search_results = []
         self.search_index = -1
+        self.script_text_index = None  # 首次搜索时建立
         self.worker = None
         
         self.enum_data = None
         self.enum_path = None
         self.enum_search_results = []
         self.enum_search_index = -1
+        self.enum_text_index = None
         
         self.setup_ui()
         self.setAcceptDrops(True)
@@ -1581,6 +643,20 @@ class EscudeApp(QMainWindow):
         enc_layout2.addWidget(self.combo_dst_enc, 1)
         left_layout.addLayout(enc_layout2)
         
+        workers_layout = QHBoxLayout()
+        self.lbl_workers = QLabel("并行进程:")
+        self.lbl_workers.setFont(get_app_font(10))
+        self.combo_workers = QComboBox()
+        self.combo_workers.setFont(get_app_font(10))
+        self.combo_workers.addItem("自动", None)
+        for n in sorted({1, 2, 4, 8, os.cpu_count() or 1}):
+            if n <= (os.cpu_count() or 1):
+                self.combo_workers.addItem(str(n), n)
+        self.combo_workers.setFixedHeight(30)
+        workers_layout.addWidget(self.lbl_workers)
+        workers_layout.addWidget(self.combo_workers, 1)
+        left_layout.addLayout(workers_layout)
+        
         self.lbl_enc_hint = QLabel("日文用CP932，简中用CP936")
         self.lbl_enc_hint.setFont(get_app_font(9))
         self.lbl_enc_hint.setWordWrap(True)
@@ -1697,7 +773,7 @@ class EscudeApp(QMainWindow):
         grid.addWidget(self.lbl_input)
         input_row = QHBoxLayout()
         input_row.setSpacing(6)
-        self.in_input_dir = DropZoneInput("包含 .bin 和 .001 文件的文件夹 (支持拖放)", accept_dir=True, accept_file=False)
+        self.in_input_dir = DropZoneInput("包含 .bin 和 .001 文件的文件夹或 script.bin 资源包 (支持拖放)", accept_dir=True, accept_file=True, file_filter=['.bin'])
         self.btn_browse_input = QPushButton("📂")
         self.btn_browse_input.setFixedSize(38, 38)
         self.btn_browse_input.setCursor(Qt.CursorShape.PointingHandCursor)
@@ -1725,7 +801,7 @@ class EscudeApp(QMainWindow):
         grid.addWidget(self.lbl_data_input)
         data_input_row = QHBoxLayout()
         data_input_row.setSpacing(6)
-        self.in_data_input_dir = DropZoneInput("包含 db_scripts.bin 的文件夹 (支持拖放)", accept_dir=True, accept_file=False)
+        self.in_data_input_dir = DropZoneInput("包含 db_scripts.bin 的文件夹或 data.bin 资源包 (支持拖放)", accept_dir=True, accept_file=True, file_filter=['.bin'])
         self.btn_browse_data_input = QPushButton("📂")
         self.btn_browse_data_input.setFixedSize(38, 38)
         self.btn_browse_data_input.setCursor(Qt.CursorShape.PointingHandCursor)
@@ -1848,9 +924,29 @@ class EscudeApp(QMainWindow):
         pack_row2.addWidget(self.btn_browse_pack_out)
         layout.addLayout(pack_row2)
         
+        pack_row3 = QHBoxLayout()
+        pack_row3.setSpacing(6)
+        self.in_pack_compress_exts = IOSInput("压缩扩展名, 如 .txt .bin (留空不按扩展名)")
+        self.in_pack_compress_min = IOSInput("压缩阈值 KB (留空不按大小)")
+        self.in_pack_compress_min.setFixedWidth(200)
+        self.chk_pack_dedup = QCheckBox("去重")
+        self.chk_pack_dedup.setFont(get_app_font(10))
+        self.chk_pack_dedup.setToolTip("内容相同的文件只写入一份，多个条目共用同一数据 (仅打包资源)")
+        pack_row3.addWidget(self.in_pack_compress_exts, 1)
+        pack_row3.addWidget(self.in_pack_compress_min)
+        pack_row3.addWidget(self.chk_pack_dedup)
+        layout.addLayout(pack_row3)
+        
+        pack_btn_row = QHBoxLayout()
+        pack_btn_row.setSpacing(6)
         self.btn_pack_archive = IOSButton("打包资源")
         self.btn_pack_archive.clicked.connect(self.do_pack_archive)
-        layout.addWidget(self.btn_pack_archive)
+        self.btn_update_archive = IOSButton("增量更新")
+        self.btn_update_archive.setToolTip("以上方选择的原资源包为基础，只重写文件夹中出现的文件")
+        self.btn_update_archive.clicked.connect(self.do_update_archive)
+        pack_btn_row.addWidget(self.btn_pack_archive, 1)
+        pack_btn_row.addWidget(self.btn_update_archive, 1)
+        layout.addLayout(pack_btn_row)
         
         line2 = QFrame()
         line2.setFrameShape(QFrame.Shape.HLine)
@@ -1936,10 +1032,18 @@ class EscudeApp(QMainWindow):
         self.btn_escr_extract.clicked.connect(self.do_escr_extract_all)
         self.btn_escr_pack = IOSButton("批量封包 →BIN")
         self.btn_escr_pack.clicked.connect(self.do_escr_pack_all)
+        self.btn_escr_cancel = IOSButton("取消")
+        self.btn_escr_cancel.setEnabled(False)
+        self.btn_escr_cancel.clicked.connect(self.cancel_escr_batch)
         escr_btn_row.addWidget(self.btn_escr_extract)
         escr_btn_row.addWidget(self.btn_escr_pack)
+        escr_btn_row.addWidget(self.btn_escr_cancel)
         batch_layout.addLayout(escr_btn_row)
         
+        self.lbl_escr_status = QLabel("")
+        self.lbl_escr_status.setFont(get_app_font(9))
+        batch_layout.addWidget(self.lbl_escr_status)
+        
         layout.addWidget(batch_frame)
         
         line = QFrame()
@@ -1969,10 +1073,13 @@ class EscudeApp(QMainWindow):
         self.lbl_script_path.setFont(get_app_font(9))
         layout.addWidget(self.lbl_script_path)
         
-        self.script_list = QListWidget()
+        self.script_model = RowListModel(lambda row: f"[{row}] {self.script_strings[row]}", self)
+        self.script_list = QListView()
+        self.script_list.setUniformItemSizes(True)
+        self.script_list.setModel(self.script_model)
         self.script_list.setFont(get_mono_font(10))
-        self.script_list.itemClicked.connect(self.on_script_select)
-        self.script_list.itemDoubleClicked.connect(lambda: self.in_script_edit.setFocus())
+        self.script_list.clicked.connect(self.on_script_select)
+        self.script_list.doubleClicked.connect(lambda: self.in_script_edit.setFocus())
         self.script_list.setMinimumHeight(100)
         layout.addWidget(self.script_list, 1)
         
@@ -2049,10 +1156,13 @@ class EscudeApp(QMainWindow):
         self.lbl_enum_path.setFont(get_app_font(9))
         layout.addWidget(self.lbl_enum_path)
         
-        self.enum_list = QListWidget()
+        self.enum_model = RowListModel(lambda row: EscudeManager.enum_label(self.enum_data, row), self)
+        self.enum_list = QListView()
+        self.enum_list.setUniformItemSizes(True)
+        self.enum_list.setModel(self.enum_model)
         self.enum_list.setFont(get_jp_font(10))
-        self.enum_list.itemClicked.connect(self.on_enum_select)
-        self.enum_list.itemDoubleClicked.connect(lambda: self.in_enum_edit.setFocus())
+        self.enum_list.clicked.connect(self.on_enum_select)
+        self.enum_list.doubleClicked.connect(lambda: self.in_enum_edit.setFocus())
         self.enum_list.setMinimumHeight(100)
         layout.addWidget(self.enum_list, 1)
         
@@ -2103,8 +1213,9 @@ class EscudeApp(QMainWindow):
 
   ▶ 提取文本 (游戏脚本 → TXT)
     1. 设置"脚本目录"为包含 .bin/.001 文件的文件夹
+       (也可直接选择 script.bin 资源包，无需先解包)
     2. 设置"输出目录"为TXT文件保存位置
-    3. 设置"data目录"为游戏data文件夹 (可选)
+    3. 设置"data目录"为游戏data文件夹或 data.bin (可选)
     4. 点击"开始提取文本"
     
   ▶ TXT格式说明:
@@ -2122,6 +1233,10 @@ class EscudeApp(QMainWindow):
 
   ▶ 解包: 选择 .bin 文件，点击解包
   ▶ 打包: 选择文件夹，指定输出路径，点击打包
+  ▶ 压缩: 填写扩展名或大小阈值后，匹配的条目以 acp 格式压缩写入
+  ▶ 去重: 勾选后内容相同的文件只写入一份，多个条目指向同一数据
+  ▶ 增量更新: 上方选择原 .bin，文件夹中只放修改过的文件，
+    未修改的条目直接从原包复制，原本压缩的条目替换后仍压缩
 
 ═══════════════════════════════════════════════
 
@@ -2163,11 +1278,11 @@ class EscudeApp(QMainWindow):
         
         main_labels = [self.title_label, self.lbl_text_title, self.lbl_archive_title, 
                        self.lbl_script_title, self.lbl_help_title, self.lbl_enum_title]
-        dim_labels = [self.lbl_theme, self.lbl_enc, self.lbl_src_enc, self.lbl_dst_enc,
+        dim_labels = [self.lbl_theme, self.lbl_enc, self.lbl_src_enc, self.lbl_dst_enc, self.lbl_workers,
                       self.lbl_enc_hint, self.lbl_input, self.lbl_output, self.lbl_data_input,
                       self.lbl_data_output, self.lbl_unpack_title, self.lbl_pack_title,
                       self.lbl_decompress_title, self.lbl_script_desc, self.lbl_script_path,
-                      self.lbl_edit, self.lbl_escr_input, self.lbl_escr_output, self.lbl_single_edit,
+                      self.lbl_edit, self.lbl_escr_input, self.lbl_escr_output, self.lbl_escr_status, self.lbl_single_edit,
                       self.lbl_drop_hint, self.lbl_enum_desc, self.lbl_enum_path, self.lbl_enum_edit]
         
         for l in main_labels: 
@@ -2183,6 +1298,7 @@ class EscudeApp(QMainWindow):
         
         inputs = [self.in_input_dir, self.in_output_dir, self.in_data_input_dir, self.in_data_output_dir,
                   self.in_archive_input, self.in_archive_output, self.in_pack_folder, self.in_pack_output,
+                  self.in_pack_compress_exts, self.in_pack_compress_min,
                   self.in_decompress_file, self.in_script_edit, self.in_search, self.in_escr_input, self.in_escr_output,
                   self.in_enum_edit, self.in_enum_search]
         for i in inputs: 
@@ -2209,9 +1325,9 @@ class EscudeApp(QMainWindow):
             btn.setStyleSheet(small_btn_style)
         
         action_btns = [self.btn_reset, self.btn_auto_fill, self.btn_swap, self.btn_run_text,
-                       self.btn_unpack_archive, self.btn_pack_archive, self.btn_decompress,
+                       self.btn_unpack_archive, self.btn_pack_archive, self.btn_update_archive, self.btn_decompress,
                        self.btn_open_script, self.btn_save_script, self.btn_save_script_as,
-                       self.btn_search, self.btn_search_next, self.btn_escr_extract, self.btn_escr_pack,
+                       self.btn_search, self.btn_search_next, self.btn_escr_extract, self.btn_escr_pack, self.btn_escr_cancel,
                        self.btn_open_enum, self.btn_save_enum, self.btn_save_enum_as,
                        self.btn_export_enum_txt, self.btn_export_enum_json,
                        self.btn_import_enum_txt, self.btn_import_enum_json,
@@ -2242,6 +1358,7 @@ class EscudeApp(QMainWindow):
         self.combo_theme.setStyleSheet(combo_style)
         self.combo_src_enc.setStyleSheet(combo_style)
         self.combo_dst_enc.setStyleSheet(combo_style)
+        self.combo_workers.setStyleSheet(combo_style)
         
         self.tab_container.setStyleSheet(f"background: {t['input_bg']}; border-radius: 12px;")
         self.switch_tab(self.stack.currentIndex())
@@ -2249,12 +1366,13 @@ class EscudeApp(QMainWindow):
         rb_style = f"QRadioButton {{ color: {t['text_main']}; spacing: 6px; font-family: {font_family}; }}"
         self.rb_unpack.setStyleSheet(rb_style)
         self.rb_pack.setStyleSheet(rb_style)
+        self.chk_pack_dedup.setStyleSheet(rb_style.replace("QRadioButton", "QCheckBox"))
         
         bg_log = "rgba(255,255,255,0.1)" if "Night" in theme_name else "rgba(0,0,0,0.02)"
         self.log_area.update_theme(t['text_main'], bg_log)
         self.help_text.setStyleSheet(f"QTextEdit {{background-color: {bg_log}; border: none; border-radius: 12px; padding: 12px; color: {t['text_main']}; font-family: {font_family};}}")
-        self.script_list.setStyleSheet(f"QListWidget {{background-color: {bg_log}; border: none; border-radius: 8px; padding: 4px; color: {t['text_main']}; font-family: 'Consolas', monospace;}}")
-        self.enum_list.setStyleSheet(f"QListWidget {{background-color: {bg_log}; border: none; border-radius: 8px; padding: 4px; color: {t['text_main']}; font-family: 'Yu Gothic', 'Meiryo', 'MS Gothic', 'Microsoft YaHei';}}")
+        self.script_list.setStyleSheet(f"QListView {{background-color: {bg_log}; border: none; border-radius: 8px; padding: 4px; color: {t['text_main']}; font-family: 'Consolas', monospace;}}")
+        self.enum_list.setStyleSheet(f"QListView {{background-color: {bg_log}; border: none; border-radius: 8px; padding: 4px; color: {t['text_main']}; font-family: 'Yu Gothic', 'Meiryo', 'MS Gothic', 'Microsoft YaHei';}}")
         self.progress.setStyleSheet(f"QProgressBar {{border:none; background:rgba(0,0,0,0.08); border-radius:2px;}} QProgressBar::chunk {{background: {t['accent']}; border-radius:2px;}}")
 
     def switch_tab(self, idx):
@@ -2372,7 +1490,8 @@ class EscudeApp(QMainWindow):
                 'input_dir': input_d,
                 'output_dir': output_d,
                 'data_input_dir': data_input_d,
-                'src_encoding': src_enc
+                'src_encoding': src_enc,
+                'workers': self.combo_workers.currentData()
             }
             self.worker = Worker('unpack_text', params)
         else:
@@ -2397,11 +1516,13 @@ class EscudeApp(QMainWindow):
                 'output_dir': output_d,
                 'data_input_dir': data_input_d,
                 'data_output_dir': data_output_d,
-                'dst_encoding': dst_enc
+                'dst_encoding': dst_enc,
+                'workers': self.combo_workers.currentData()
             }
             self.worker = Worker('pack_text', params)
         
         self.worker.log.connect(self.log)
+        self.worker.prog.connect(self.progress.setValue)
         self.worker.done.connect(self.on_task_done)
         self.worker.err.connect(self.on_task_error)
         self.worker.start()
@@ -2423,12 +1544,25 @@ class EscudeApp(QMainWindow):
         self.setEnabled(False)
         self.log(f"正在解包: {os.path.basename(input_path)}")
         
+        self.progress.setValue(0)
         self.worker = Worker('unpack_archive', {'input': input_path, 'output': output_path})
         self.worker.log.connect(self.log)
+        self.worker.prog.connect(self.progress.setValue)
         self.worker.done.connect(self.on_archive_unpack_done)
         self.worker.err.connect(self.on_task_error)
         self.worker.start()
 
+    def read_pack_compress_options(self):
+        compress_exts = self.in_pack_compress_exts.text().replace(',', ' ').split()
+        compress_min = self.in_pack_compress_min.text().strip()
+        try:
+            compress_min_size = int(float(compress_min) * 1024) if compress_min else None
+        except ValueError:
+            QMessageBox.warning(self, "错误", f"无效的压缩阈值: {compress_min}")
+            return None
+        return {'compress_exts': compress_exts, 'compress_min_size': compress_min_size,
+                'dedup': self.chk_pack_dedup.isChecked()}
+
     def do_pack_archive(self):
         folder = self.in_pack_folder.text()
         output = self.in_pack_output.text()
@@ -2438,13 +1572,49 @@ class EscudeApp(QMainWindow):
         if not os.path.exists(folder):
             QMessageBox.warning(self, "错误", f"文件夹不存在: {folder}")
             return
+        options = self.read_pack_compress_options()
+        if options is None:
+            return
         
         self.log_area.clear()
         self.setEnabled(False)
         self.log(f"正在打包: {folder}")
         
-        self.worker = Worker('pack_archive', {'folder': folder, 'output': output})
+        self.worker = Worker('pack_archive', {'folder': folder, 'output': output, **options})
         self.worker.log.connect(self.log)
+        self.worker.prog.connect(self.progress.setValue)
+        self.worker.done.connect(self.on_task_done)
+        self.worker.err.connect(self.on_task_error)
+        self.worker.start()
+
+    def do_update_archive(self):
+        archive = self.in_archive_input.text()
+        folder = self.in_pack_folder.text()
+        output = self.in_pack_output.text()
+        if not archive or not folder or not output:
+            QMessageBox.warning(self, "错误", "请选择原资源包、替换文件夹和输出路径")
+            return
+        if not os.path.exists(archive):
+            QMessageBox.warning(self, "错误", f"文件不存在: {archive}")
+            return
+        if not os.path.exists(folder):
+            QMessageBox.warning(self, "错误", f"文件夹不存在: {folder}")
+            return
+        if self.chk_pack_dedup.isChecked():
+            QMessageBox.warning(self, "错误", "增量更新不支持去重，请取消勾选「去重」或改用打包")
+            return
+        options = self.read_pack_compress_options()
+        if options is None:
+            return
+        
+        self.log_area.clear()
+        self.setEnabled(False)
+        self.log(f"正在增量更新: {os.path.basename(archive)}")
+        
+        self.progress.setValue(0)
+        self.worker = Worker('update_archive', {'input': archive, 'folder': folder, 'output': output, **options})
+        self.worker.log.connect(self.log)
+        self.worker.prog.connect(self.progress.setValue)
         self.worker.done.connect(self.on_task_done)
         self.worker.err.connect(self.on_task_error)
         self.worker.start()
@@ -2485,18 +1655,21 @@ class EscudeApp(QMainWindow):
         error_msg = error.split('\n')[0] if '\n' in error else error
         QMessageBox.critical(self, "错误", error_msg)
 
+    def show_script(self, path, strings, context):
+        self.script_strings = strings
+        self.script_context = context
+        self.script_path = path
+        self.script_text_index = None
+        self.search_results = []
+        self.script_model.set_rows(strings)
+        self.lbl_script_path.setText(f"当前文件: {os.path.basename(path)} (共 {len(strings)} 条)")
+
     def open_script(self):
         path, _ = QFileDialog.getOpenFileName(self, "打开脚本", "", "脚本文件 (*.bin);;所有文件 (*.*)")
         if not path: return
         try:
             strings, context = EscudeManager.load_script(path)
-            self.script_strings = strings
-            self.script_context = context
-            self.script_path = path
-            self.script_list.clear()
-            for i, s in enumerate(strings):
-                self.script_list.addItem(f"[{i}] {s}")
-            self.lbl_script_path.setText(f"当前文件: {os.path.basename(path)} (共 {len(strings)} 条)")
+            self.show_script(path, strings, context)
             QMessageBox.information(self, "打开成功", f"已加载 {len(strings)} 条文本")
         except Exception as e:
             QMessageBox.critical(self, "打开失败", f"无法加载脚本:\n{e}\n\n只支持 ESCR1_00 格式")
@@ -2525,32 +1698,37 @@ class EscudeApp(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "保存失败", str(e))
 
-    def on_script_select(self, item):
-        idx = self.script_list.row(item)
+    def on_script_select(self, index):
+        idx = index.row()
         if 0 <= idx < len(self.script_strings):
             self.in_script_edit.setText(self.script_strings[idx])
             self.in_script_edit.setFocus()
 
     def on_script_edit_commit(self):
-        idx = self.script_list.currentRow()
+        idx = self.script_list.currentIndex().row()
         if 0 <= idx < len(self.script_strings):
             new_text = self.in_script_edit.text()
             self.script_strings[idx] = new_text
-            self.script_list.item(idx).setText(f"[{idx}] {new_text}")
+            if self.script_text_index is not None:
+                self.script_text_index.update(idx, new_text)
+            self.script_model.row_changed(idx)
             if idx < len(self.script_strings) - 1:
-                self.script_list.setCurrentRow(idx + 1)
+                self.script_list.setCurrentIndex(self.script_model.index(idx + 1))
                 self.in_script_edit.setText(self.script_strings[idx + 1])
                 self.in_script_edit.selectAll()
 
+    def _ensure_script_index(self):
+        """搜索索引在第一次搜索时才建立，打开大文件时不占用界面线程"""
+        if self.script_text_index is None:
+            self.script_text_index = TextSearchIndex(self.script_strings)
+        return self.script_text_index
+
     def search_script(self):
         query = self.in_search.text()
         if not query: 
             QMessageBox.information(self, "搜索", "请输入搜索内容")
             return
-        self.search_results = []
-        for i, s in enumerate(self.script_strings):
-            if query.lower() in s.lower():
-                self.search_results.append(i)
+        self.search_results = self._ensure_script_index().search(query)
         if self.search_results:
             self.search_index = 0
             self.goto_search_result()
@@ -2569,8 +1747,8 @@ class EscudeApp(QMainWindow):
     def goto_search_result(self):
         if self.search_results and 0 <= self.search_index < len(self.search_results):
             idx = self.search_results[self.search_index]
-            self.script_list.setCurrentRow(idx)
-            self.script_list.scrollToItem(self.script_list.item(idx))
+            self.script_list.setCurrentIndex(self.script_model.index(idx))
+            self.script_list.scrollTo(self.script_model.index(idx))
             if 0 <= idx < len(self.script_strings):
                 self.in_script_edit.setText(self.script_strings[idx])
 
@@ -2589,42 +1767,13 @@ class EscudeApp(QMainWindow):
             output_dir = input_dir + "_txt"
             self.in_escr_output.setText(output_dir)
         
-        os.makedirs(output_dir, exist_ok=True)
-        
         self.log_area.clear()
         self.log("=" * 50)
         self.log(f"批量解包 ESCR1_00 脚本")
         self.log(f"输入: {input_dir}")
         self.log(f"输出: {output_dir}")
         self.log("=" * 50)
-        
-        count = 0
-        errors = 0
-        
-        for f in os.listdir(input_dir):
-            if not f.endswith('.bin'):
-                continue
-            bin_path = os.path.join(input_dir, f)
-            try:
-                strings, context = EscudeManager.load_script(bin_path)
-                txt_name = f.replace('.bin', '.txt')
-                txt_path = os.path.join(output_dir, txt_name)
-                
-                with open(txt_path, 'w', encoding='utf-8') as out_f:
-                    for i, s in enumerate(strings):
-                        out_f.write(f"◇{i:06d}◇{s}\n")
-                        out_f.write(f"◆{i:06d}◆{s}\n\n")
-                
-                count += 1
-                self.log(f"  OK: {f} ({len(strings)} 条)")
-            except Exception as e:
-                errors += 1
-                self.log(f"  FAIL: {f} - {e}")
-        
-        self.log("")
-        self.log(f"完成! {count} 成功, {errors} 失败")
-        self.log(f"输出目录: {output_dir}")
-        QMessageBox.information(self, "完成", f"解包完成!\n{count} 成功, {errors} 失败\n输出: {output_dir}")
+        self.start_escr_batch('escr_extract', {'input': input_dir, 'output': output_dir})
 
     def do_escr_pack_all(self):
         txt_dir = self.in_escr_output.text()
@@ -2643,7 +1792,6 @@ class EscudeApp(QMainWindow):
         output_dir = txt_dir.replace('_txt', '_new')
         if output_dir == txt_dir:
             output_dir = txt_dir + "_packed"
-        os.makedirs(output_dir, exist_ok=True)
         
         self.log_area.clear()
         self.log("=" * 50)
@@ -2652,71 +1800,75 @@ class EscudeApp(QMainWindow):
         self.log(f"模板目录: {template_dir}")
         self.log(f"输出目录: {output_dir}")
         self.log("=" * 50)
-        
-        count = 0
-        errors = 0
-        
-        for f in os.listdir(txt_dir):
-            if not f.endswith('.txt'):
-                continue
-            txt_path = os.path.join(txt_dir, f)
-            template_name = f.replace('.txt', '.bin')
-            template_path = os.path.join(template_dir, template_name)
-            
-            if not os.path.exists(template_path):
-                self.log(f"  SKIP: {f} - 找不到模板 {template_name}")
-                errors += 1
-                continue
-            
-            try:
-                strings, context = EscudeManager.load_script(template_path)
-                
-                new_strings = {}
-                with open(txt_path, 'r', encoding='utf-8') as in_f:
-                    for line in in_f:
-                        line = line.rstrip('\n\r')
-                        if line.startswith('◆') and '◆' in line[1:]:
-                            parts = line.split('◆')
-                            if len(parts) >= 3:
-                                try:
-                                    idx = int(parts[1])
-                                    text = '◆'.join(parts[2:])
-                                    new_strings[idx] = text
-                                except ValueError:
-                                    continue
-                
-                for idx, text in new_strings.items():
-                    if 0 <= idx < len(strings):
-                        strings[idx] = text
-                
-                out_path = os.path.join(output_dir, template_name)
-                EscudeManager.save_script(out_path, strings, context)
-                
-                count += 1
-                self.log(f"  OK: {f} ({len(new_strings)} 条)")
-            except Exception as e:
-                errors += 1
-                self.log(f"  FAIL: {f} - {e}")
-        
-        self.log("")
-        self.log(f"完成! {count} 成功, {errors} 失败")
-        self.log(f"输出目录: {output_dir}")
-        QMessageBox.information(self, "完成", f"封包完成!\n{count} 成功, {errors} 失败\n输出: {output_dir}")
+        self.start_escr_batch('escr_pack', {'input': txt_dir, 'template': template_dir, 'output': output_dir})
+
+    def start_escr_batch(self, mode, params):
+        """在后台线程中运行批量任务，期间只保留取消按钮可用"""
+        self.btn_escr_extract.setEnabled(False)
+        self.btn_escr_pack.setEnabled(False)
+        self.btn_escr_cancel.setEnabled(True)
+        self.progress.setValue(0)
+        self.escr_counts = {'ok': 0, 'fail': 0, 'skip': 0}
+        self.escr_failed_files = []
+        self.lbl_escr_status.setText("")
+        self.escr_worker = Worker(mode, params)
+        self.escr_worker.log.connect(self.log)
+        self.escr_worker.status.connect(self.on_escr_file_status)
+        self.escr_worker.prog.connect(self.progress.setValue)
+        self.escr_worker.done.connect(self.on_escr_batch_done)
+        self.escr_worker.err.connect(self.on_escr_batch_error)
+        self.escr_worker.start()
+
+    def cancel_escr_batch(self):
+        worker = getattr(self, 'escr_worker', None)
+        if worker is not None and worker.isRunning():
+            worker.requestInterruption()
+            self.btn_escr_cancel.setEnabled(False)
+            self.log("正在取消，等待进行中的文件完成...")
+
+    def on_escr_file_status(self, name, state):
+        """逐文件结果：更新批量区的计数，记下失败的文件"""
+        self.escr_counts[state] = self.escr_counts.get(state, 0) + 1
+        if state == 'fail':
+            self.escr_failed_files.append(name)
+        c = self.escr_counts
+        text = f"成功 {c['ok']} · 失败 {c['fail']} · 跳过 {c['skip']}"
+        if self.escr_failed_files:
+            text += f"  (最近失败: {self.escr_failed_files[-1]})"
+        self.lbl_escr_status.setText(text)
+
+    def finish_escr_batch(self):
+        self.btn_escr_extract.setEnabled(True)
+        self.btn_escr_pack.setEnabled(True)
+        self.btn_escr_cancel.setEnabled(False)
+
+    def on_escr_batch_done(self, result):
+        self.finish_escr_batch()
+        self.progress.setValue(100)
+        if self.escr_failed_files:
+            self.log(f"失败的文件 ({len(self.escr_failed_files)}): " + ", ".join(self.escr_failed_files))
+        QMessageBox.information(self, "完成", result)
+
+    def on_escr_batch_error(self, error):
+        self.finish_escr_batch()
+        self.on_task_error(error)
 
     # ========== Enum 操作方法 ==========
 
+    def refresh_enum_list(self):
+        self.enum_text_index = None
+        self.enum_search_results = []
+        self.enum_model.set_rows(self.enum_data['names'])
+
     def open_enum(self):
         path, _ = QFileDialog.getOpenFileName(self, "打开 enum_scr.bin", "", "Enum文件 (*.bin);;所有文件 (*.*)")
         if not path: return
         try:
             self.enum_data = EscudeManager.load_enum_scr(path)
             self.enum_path = path
-            self.enum_list.clear()
-            for entry in self.enum_data['entries']:
-                disp = f"[{entry['main_index']:3d}.{entry['sub_index']}] {entry['name']}"
-                self.enum_list.addItem(disp)
-            self.lbl_enum_path.setText(f"当前文件: {os.path.basename(path)} (共 {len(self.enum_data['entries'])} 条)")
-            QMessageBox.information(self, "打开成功", f"已加载 {len(self.enum_data['entries'])} 条记录")
+            self.refresh_enum_list()
+            self.lbl_enum_path.setText(f"当前文件: {os.path.basename(path)} (共 {len(self.enum_data['names'])} 条)")
+            QMessageBox.information(self, "打开成功", f"已加载 {len(self.enum_data['names'])} 条记录")
         except Exception as e:
             QMessageBox.critical(self, "打开失败", f"无法加载文件:\n{e}\n\n只支持 LIST 格式的 enum_scr.bin")
 
@@ -2739,7 +1891,7 @@ class EscudeApp(QMainWindow):
         try:
             EscudeManager.save_enum_scr(path, self.enum_data)
             self.enum_path = path
-            self.lbl_enum_path.setText(f"当前文件: {os.path.basename(path)} (共 {len(self.enum_data['entries'])} 条)")
+            self.lbl_enum_path.setText(f"当前文件: {os.path.basename(path)} (共 {len(self.enum_data['names'])} 条)")
             QMessageBox.information(self, "保存成功", f"已保存到:\n{path}")
         except Exception as e:
             QMessageBox.critical(self, "保存失败", str(e))
@@ -2776,10 +1928,7 @@ class EscudeApp(QMainWindow):
         if not path: return
         try:
             self.enum_data = EscudeManager.import_enum_from_txt(path, self.enum_data)
-            self.enum_list.clear()
-            for entry in self.enum_data['entries']:
-                disp = f"[{entry['main_index']:3d}.{entry['sub_index']}] {entry['name']}"
-                self.enum_list.addItem(disp)
+            self.refresh_enum_list()
             QMessageBox.information(self, "导入成功", f"已从TXT导入数据")
         except Exception as e:
             QMessageBox.critical(self, "导入失败", str(e))
@@ -2790,33 +1939,35 @@ class EscudeApp(QMainWindow):
         try:
             self.enum_data = EscudeManager.import_enum_from_json(path)
             self.enum_path = None
-            self.enum_list.clear()
-            for entry in self.enum_data['entries']:
-                disp = f"[{entry['main_index']:3d}.{entry['sub_index']}] {entry['name']}"
-                self.enum_list.addItem(disp)
-            self.lbl_enum_path.setText(f"已从JSON导入 (共 {len(self.enum_data['entries'])} 条)")
-            QMessageBox.information(self, "导入成功", f"已从JSON导入 {len(self.enum_data['entries'])} 条记录")
+            self.refresh_enum_list()
+            self.lbl_enum_path.setText(f"已从JSON导入 (共 {len(self.enum_data['names'])} 条)")
+            QMessageBox.information(self, "导入成功", f"已从JSON导入 {len(self.enum_data['names'])} 条记录")
         except Exception as e:
             QMessageBox.critical(self, "导入失败", str(e))
 
-    def on_enum_select(self, item):
-        idx = self.enum_list.row(item)
-        if self.enum_data and 0 <= idx < len(self.enum_data['entries']):
-            self.in_enum_edit.setText(self.enum_data['entries'][idx]['name'])
+    def on_enum_select(self, index):
+        idx = index.row()
+        if self.enum_data and 0 <= idx < len(self.enum_data['names']):
+            self.in_enum_edit.setText(self.enum_data['names'][idx])
             self.in_enum_edit.setFocus()
 
     def on_enum_edit_commit(self):
-        idx = self.enum_list.currentRow()
-        if self.enum_data and 0 <= idx < len(self.enum_data['entries']):
-            new_name = self.in_enum_edit.text()
-            entry = self.enum_data['entries'][idx]
-            entry['name'] = new_name
-            self.enum_list.item(idx).setText(f"[{entry['main_index']:3d}.{entry['sub_index']}] {new_name}")
-            if idx < len(self.enum_data['entries']) - 1:
-                self.enum_list.setCurrentRow(idx + 1)
-                self.in_enum_edit.setText(self.enum_data['entries'][idx + 1]['name'])
+        idx = self.enum_list.currentIndex().row()
+        if self.enum_data and 0 <= idx < len(self.enum_data['names']):
+            self.enum_data['names'][idx] = self.in_enum_edit.text()
+            if self.enum_text_index is not None:
+                self.enum_text_index.update(idx, self.enum_data['names'][idx])
+            self.enum_model.row_changed(idx)
+            if idx < len(self.enum_data['names']) - 1:
+                self.enum_list.setCurrentIndex(self.enum_model.index(idx + 1))
+                self.in_enum_edit.setText(self.enum_data['names'][idx + 1])
                 self.in_enum_edit.selectAll()
 
+    def _ensure_enum_index(self):
+        if self.enum_text_index is None:
+            self.enum_text_index = TextSearchIndex(self.enum_data['names'])
+        return self.enum_text_index
+
     def search_enum(self):
         query = self.in_enum_search.text()
         if not query:
@@ -2825,10 +1976,7 @@ class EscudeApp(QMainWindow):
         if not self.enum_data:
             QMessageBox.warning(self, "错误", "请先打开文件")
             return
-        self.enum_search_results = []
-        for i, entry in enumerate(self.enum_data['entries']):
-            if query.lower() in entry['name'].lower():
-                self.enum_search_results.append(i)
+        self.enum_search_results = self._ensure_enum_index().search(query)
         if self.enum_search_results:
             self.enum_search_index = 0
             self.goto_enum_search_result()
@@ -2847,10 +1995,10 @@ class EscudeApp(QMainWindow):
     def goto_enum_search_result(self):
         if self.enum_search_results and 0 <= self.enum_search_index < len(self.enum_search_results):
             idx = self.enum_search_results[self.enum_search_index]
-            self.enum_list.setCurrentRow(idx)
-            self.enum_list.scrollToItem(self.enum_list.item(idx))
-            if self.enum_data and 0 <= idx < len(self.enum_data['entries']):
-                self.in_enum_edit.setText(self.enum_data['entries'][idx]['name'])
+            self.enum_list.setCurrentIndex(self.enum_model.index(idx))
+            self.enum_list.scrollTo(self.enum_model.index(idx))
+            if self.enum_data and 0 <= idx < len(self.enum_data['names']):
+                self.in_enum_edit.setText(self.enum_data['names'][idx])
 
     def reset_all(self):
         self.in_input_dir.clear()
@@ -2861,27 +2009,33 @@ class EscudeApp(QMainWindow):
         self.in_archive_output.clear()
         self.in_pack_folder.clear()
         self.in_pack_output.clear()
+        self.in_pack_compress_exts.clear()
+        self.in_pack_compress_min.clear()
+        self.chk_pack_dedup.setChecked(False)
         self.in_decompress_file.clear()
         self.in_escr_input.clear()
         self.in_escr_output.clear()
         self.combo_src_enc.setCurrentIndex(0)
         self.combo_dst_enc.setCurrentIndex(1)
+        self.combo_workers.setCurrentIndex(0)
         self.rb_unpack.setChecked(True)
         self.on_mode_change()
         self.log_area.clear()
         self.progress.setValue(0)
-        self.script_list.clear()
         self.script_strings = []
+        self.script_model.set_rows(self.script_strings)
         self.script_context = None
+        self.script_text_index = None
         self.script_path = None
         self.in_script_edit.clear()
         self.in_search.clear()
         self.search_results = []
         self.search_index = -1
         self.lbl_script_path.setText("未打开任何文件")
-        self.enum_list.clear()
+        self.enum_model.set_rows([])
         self.enum_data = None
         self.enum_path = None
+        self.enum_text_index = None
         self.in_enum_edit.clear()
         self.in_enum_search.clear()
         self.enum_search_results = []
@@ -2896,6 +2050,7 @@ class EscudeApp(QMainWindow):
         self.in_data_output_dir.setText(self.settings.value("data_output_dir", ""))
         self.combo_src_enc.setCurrentIndex(self.settings.value("src_enc_idx", 0, type=int))
         self.combo_dst_enc.setCurrentIndex(self.settings.value("dst_enc_idx", 1, type=int))
+        self.combo_workers.setCurrentIndex(self.settings.value("workers_idx", 0, type=int))
         mode = self.settings.value("mode", "unpack")
         if mode == "pack":
             self.rb_pack.setChecked(True)
@@ -2911,6 +2066,7 @@ class EscudeApp(QMainWindow):
         self.settings.setValue("data_output_dir", self.in_data_output_dir.text())
         self.settings.setValue("src_enc_idx", self.combo_src_enc.currentIndex())
         self.settings.setValue("dst_enc_idx", self.combo_dst_enc.currentIndex())
+        self.settings.setValue("workers_idx", self.combo_workers.currentIndex())
         self.settings.setValue("mode", "pack" if self.rb_pack.isChecked() else "unpack")
         self.settings.setValue("theme", self.current_theme_name)
 
@@ -3070,13 +2226,7 @@ class EscudeApp(QMainWindow):
             elif is_file and first_path.lower().endswith('.bin'):
                 try:
                     strings, context = EscudeManager.load_script(first_path)
-                    self.script_strings = strings
-                    self.script_context = context
-                    self.script_path = first_path
-                    self.script_list.clear()
-                    for i, s in enumerate(strings):
-                        self.script_list.addItem(f"[{i}] {s}")
-                    self.lbl_script_path.setText(f"当前文件: {os.path.basename(first_path)} (共 {len(strings)} 条)")
+                    self.show_script(first_path, strings, context)
                     self.log(f"已加载脚本: {os.path.basename(first_path)} ({len(strings)} 条)")
                 except Exception as ex:
                     self.log(f"加载脚本失败: {ex}")
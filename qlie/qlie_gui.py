@@ -3,7 +3,9 @@ QLIE Engine Tool — 整合版（单文件）
 包含 .b 格式解包/封回核心逻辑 + PyQt6 GUI
 """
 
-import sys, os, struct, json, hashlib, threading, datetime, subprocess, traceback
+import sys, os, struct, json, hashlib, threading, datetime, subprocess, traceback, mmap, argparse
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QLineEdit, QPushButton, QTextEdit,
                              QFileDialog, QProgressBar, QMessageBox, QFrame,
@@ -27,7 +29,7 @@ def pad_marker(name, size=16):
     return b + b"\x00" * (size - len(b))
 
 def read_marker(data, pos):
-    raw = data[pos:pos + 16]
+    raw = bytes(data[pos:pos + 16])
     return raw.rstrip(b"\x00").decode("ascii", errors="replace"), pos + 16
 
 def r_u8(data, pos):  return data[pos], pos + 1
@@ -64,7 +66,9 @@ def safe_filename(name):
 
 def parse_entry(data, pos, is_image=True):
     """Parse one entry. Handles abimgdat10/13/14/15 and absnddat10/11/12 tag formats
-    based on the C# reference implementation (ArcABMP.cs)."""
+    based on the C# reference implementation (ArcABMP.cs).
+    data may be bytes or a memoryview; the returned payload is a slice of data,
+    so with a memoryview it references the mapping without copying."""
     marker, pos = read_marker(data, pos)
     entry = {"marker": marker}
 
@@ -75,13 +79,13 @@ def parse_entry(data, pos, is_image=True):
         name_len, pos = r_u16(data, pos)
         raw_name = b""
         if name_len > 0:
-            raw_name = data[pos:pos + name_len * 2]
+            raw_name = bytes(data[pos:pos + name_len * 2])
             pos += name_len * 2
         entry["name_hex"] = raw_name.hex()
         entry["name_encoding"] = "utf-16-le"
         entry["name"] = raw_name.decode("utf-16-le", errors="replace") if raw_name else ""
         hash_len, pos = r_u16(data, pos)
-        raw_hash = data[pos:pos + hash_len] if hash_len > 0 else b""
+        raw_hash = bytes(data[pos:pos + hash_len]) if hash_len > 0 else b""
         entry["hash_hex"] = raw_hash.hex()
         entry["hash"] = raw_hash.decode("ascii", errors="replace") if raw_hash else ""
         pos += hash_len
@@ -97,7 +101,7 @@ def parse_entry(data, pos, is_image=True):
         name_len, pos = r_u16(data, pos)
         raw_name = b""
         if name_len > 0:
-            raw_name = data[pos:pos + name_len * 2]
+            raw_name = bytes(data[pos:pos + name_len * 2])
             pos += name_len * 2
         entry["name_hex"] = raw_name.hex()
         entry["name_encoding"] = "utf-16-le"
@@ -119,7 +123,7 @@ def parse_entry(data, pos, is_image=True):
         name_len, pos = r_u16(data, pos)
         raw_name = b""
         if name_len > 0:
-            raw_name = data[pos:pos + name_len]
+            raw_name = bytes(data[pos:pos + name_len])
             pos += name_len
         entry["name_hex"] = raw_name.hex()
         entry["name_encoding"] = "bytes"
@@ -134,13 +138,13 @@ def parse_entry(data, pos, is_image=True):
         name_len, pos = r_u16(data, pos)
         raw_name = b""
         if name_len > 0:
-            raw_name = data[pos:pos + name_len]
+            raw_name = bytes(data[pos:pos + name_len])
             pos += name_len
         entry["name_hex"] = raw_name.hex()
         entry["name_encoding"] = "bytes"
         entry["name"] = smart_decode(raw_name)
         hash_len, pos = r_u16(data, pos)
-        raw_hash = data[pos:pos + hash_len] if hash_len > 0 else b""
+        raw_hash = bytes(data[pos:pos + hash_len]) if hash_len > 0 else b""
         entry["hash_hex"] = raw_hash.hex()
         entry["hash"] = raw_hash.decode("ascii", errors="replace") if raw_hash else ""
         pos += hash_len
@@ -156,13 +160,13 @@ def parse_entry(data, pos, is_image=True):
         name_len, pos = r_u16(data, pos)
         raw_name = b""
         if name_len > 0:
-            raw_name = data[pos:pos + name_len]
+            raw_name = bytes(data[pos:pos + name_len])
             pos += name_len
         entry["name_hex"] = raw_name.hex()
         entry["name_encoding"] = "bytes"
         entry["name"] = smart_decode(raw_name)
         hash_len, pos = r_u16(data, pos)
-        raw_hash = data[pos:pos + hash_len] if hash_len > 0 else b""
+        raw_hash = bytes(data[pos:pos + hash_len]) if hash_len > 0 else b""
         entry["hash_hex"] = raw_hash.hex()
         entry["hash"] = raw_hash.decode("ascii", errors="replace") if raw_hash else ""
         pos += hash_len
@@ -176,14 +180,43 @@ def parse_entry(data, pos, is_image=True):
         pos += data_size
     return entry, payload, pos
 
-def unpack(filepath, output_dir, log_fn=None):
+@contextmanager
+def map_file(filepath):
+    """只读映射整个文件，产出 memoryview，切片直接引用映射而不复制"""
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield memoryview(b"")
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    try:
+        yield view
+    finally:
+        view.release()
+        try:
+            mm.close()
+        except BufferError:
+            pass  # 异常回溯里仍有切片引用映射，交给垃圾回收释放
+
+def unpack(filepath, output_dir, log_fn=None, hash_algo=None):
+    """hash_algo 时顺带计算原文件的摘要并缓存 (需调用方显式指定，界面解包不使用)"""
     def log(t):
         if log_fn: log_fn(t)
-    with open(filepath, "rb") as f:
-        data = f.read()
-    log(f"输入: {os.path.basename(filepath)} ({len(data):,} 字节)")
-    os.makedirs(output_dir, exist_ok=True)
-    meta = {"source_file": os.path.basename(filepath), "file_size": len(data)}
+    stamp = _file_stamp(filepath) if hash_algo else None
+    with map_file(filepath) as data:
+        log(f"输入: {os.path.basename(filepath)} ({len(data):,} 字节)")
+        os.makedirs(output_dir, exist_ok=True)
+        meta, file_index = _unpack_view(data, os.path.basename(filepath), output_dir, log)
+        if hash_algo and hash_algo not in _load_digests(filepath, stamp):
+            save_cached_digest(filepath, hash_algo, hashlib.new(hash_algo, data).hexdigest(), stamp)
+    meta_path = os.path.join(output_dir, "metadata.json")
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    log(f"共提取 {file_index} 个文件 -> {os.path.basename(output_dir)}")
+
+def _unpack_view(data, source_name, output_dir, log):
+    """解析映射中的 .b 数据并写出各条目，载荷从映射直接写入文件；返回 (metadata, 文件数)"""
+    meta = {"source_file": source_name, "file_size": len(data)}
     pos = 0
     marker, pos = read_marker(data, pos)
     meta["header_marker"] = marker
@@ -232,112 +265,377 @@ def unpack(filepath, output_dir, log_fn=None):
             meta["sections"].append(section)
         else:
             pos += 1
-    meta_path = os.path.join(output_dir, "metadata.json")
-    with open(meta_path, "w", encoding="utf-8") as f:
-        json.dump(meta, f, ensure_ascii=False, indent=2)
-    log(f"共提取 {file_index} 个文件 -> {os.path.basename(output_dir)}")
-
-def repack(input_dir, output_file, log_fn=None):
+    return meta, file_index
+
+COPY_CHUNK = 1 << 20
+
+def copy_payload(src_path, out_f, size):
+    """把载荷文件分块复制到 out_f，恰好 size 字节 (即写入长度字段时 stat 得到的大小)"""
+    with open(src_path, "rb") as f:
+        remaining = size
+        while remaining:
+            chunk = f.read(min(COPY_CHUNK, remaining))
+            if not chunk:
+                raise ValueError(f"文件在封包过程中被截断: {src_path}")
+            out_f.write(chunk)
+            remaining -= len(chunk)
+
+# 校验算法：界面显示名 -> hashlib 名称
+HASH_ALGOS = {"MD5": "md5", "SHA-1": "sha1", "BLAKE2": "blake2b"}
+DIGEST_SUFFIX = ".digest"
+
+class HashingWriter:
+    """包装输出文件，写入的同时计算摘要"""
+    def __init__(self, f, algo):
+        self.f = f
+        self.hash = hashlib.new(algo)
+
+    def write(self, data):
+        self.hash.update(data)
+        return self.f.write(data)
+
+    def tell(self):
+        return self.f.tell()
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def _load_digests(path, stamp):
+    try:
+        with open(path + DIGEST_SUFFIX, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data.get("digests", {}) if data.get("stamp") == stamp else {}
+
+def save_cached_digest(path, algo, digest, stamp=None):
+    """把摘要记入旁路文件 <文件>.digest，同一版本文件的其他算法结果保留"""
+    stamp = stamp or _file_stamp(path)
+    digests = _load_digests(path, stamp)
+    digests[algo] = digest
+    try:
+        with open(path + DIGEST_SUFFIX, "w", encoding="utf-8") as f:
+            json.dump({"stamp": stamp, "digests": digests}, f)
+    except OSError:
+        pass
+
+def cached_digest(path, algo):
+    """文件摘要：以路径、大小和修改时间为键缓存在旁路文件中，文件变化后重新计算"""
+    stamp = _file_stamp(path)
+    digest = _load_digests(path, stamp).get(algo)
+    if digest is None:
+        h = hashlib.new(algo)
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(COPY_CHUNK)
+                if not chunk:
+                    break
+                h.update(chunk)
+        digest = h.hexdigest()
+        save_cached_digest(path, algo, digest, stamp)
+    return digest
+
+def find_original(input_dir, repacked_path):
+    """推测封回结果对应的原始 .b：metadata 记录的源文件 (解包目录的上一级)，
+    其次是输出文件所在目录及其上一级中的同名文件"""
+    candidates = []
+    try:
+        with open(os.path.join(input_dir, "metadata.json"), "r", encoding="utf-8") as f:
+            src = json.load(f).get("source_file", "")
+        if src:
+            candidates.append(os.path.join(os.path.dirname(os.path.abspath(input_dir)), src))
+    except (OSError, ValueError):
+        pass
+    rname = os.path.basename(repacked_path)
+    parent = os.path.dirname(os.path.abspath(repacked_path))
+    candidates += [os.path.join(parent, rname), os.path.join(os.path.dirname(parent), rname)]
+    for orig in candidates:
+        if os.path.isfile(orig) and os.path.abspath(orig) != os.path.abspath(repacked_path):
+            return orig
+    return None
+
+def verify_repack(input_dir, repacked_path, digest, algo, log_fn=None):
+    """用封回时算出的摘要与原始文件 (缓存) 的摘要比较；找不到原始文件时返回 None"""
+    def log(t):
+        if log_fn: log_fn(t)
+    orig = find_original(input_dir, repacked_path)
+    if orig is None:
+        return None
+    name = next((k for k, v in HASH_ALGOS.items() if v == algo), algo)
+    h1 = cached_digest(orig, algo)
+    if h1 == digest:
+        log(f"{name} 校验: 与原始文件完全一致 ({h1[:16]}...)")
+        return True
+    log(f"{name} 校验: 与原始文件不同")
+    log(f"  原始: {h1}")
+    log(f"  封回: {digest}")
+    return False
+
+def repack(input_dir, output_file, log_fn=None, hash_algo=None):
+    """hash_algo 时边写边计算输出的摘要并返回 (十六进制)"""
     def log(t):
         if log_fn: log_fn(t)
     meta_path = os.path.join(input_dir, "metadata.json")
     with open(meta_path, "r", encoding="utf-8") as f:
         meta = json.load(f)
     log(f"来源: {os.path.basename(input_dir)}")
-    out = bytearray()
-    out += pad_marker(meta["header_marker"])
-    out += pad_marker(meta["abdata_marker"])
-    op_path = os.path.join(input_dir, meta["abdata_file"])
-    with open(op_path, "rb") as f:
-        op_data = f.read()
-    out += w_u32(len(op_data))
-    out += op_data
-    total_files = 0
-    for section in meta["sections"]:
-        out += pad_marker(section["marker"])
-        out += w_u8(section["count"])
-        for entry in section["entries"]:
-            marker = entry["marker"]
-            out += pad_marker(marker)
-
-            if marker == "abimgdat15":
-                out += w_u32(entry["version"])
-                name_raw = bytes.fromhex(entry["name_hex"]) if entry.get("name_hex") else entry["name"].encode("utf-16-le")
-                out += w_u16(len(name_raw) // 2)
-                out += name_raw
-                hash_raw = bytes.fromhex(entry["hash_hex"]) if entry.get("hash_hex") else entry["hash"].encode("ascii")
-                out += w_u16(len(hash_raw))
-                out += hash_raw
-                out += w_u8(entry.get("type_byte", 0))
-                out += bytes.fromhex(entry.get("padding_hex", "00" * entry.get("skip_size", 0x11)))
-
-            elif marker == "absnddat12":
-                out += w_u32(entry["version"])
-                name_raw = bytes.fromhex(entry["name_hex"]) if entry.get("name_hex") else entry["name"].encode("utf-16-le")
-                out += w_u16(len(name_raw) // 2)
-                out += name_raw
-                out += bytes.fromhex(entry.get("padding_hex", "00" * 7))
-                if entry.get("eof_entry"):
-                    continue  # no data_size field at EOF
-
-            elif marker in ("abimgdat10", "absnddat10"):
-                name_raw = bytes.fromhex(entry["name_hex"]) if entry.get("name_hex") else entry["name"].encode("utf-8")
-                out += w_u16(len(name_raw))
-                out += name_raw
-                out += w_u8(entry.get("type_byte", 0))
-
-            elif marker in ("abimgdat13", "abimgdat14"):
-                name_raw = bytes.fromhex(entry["name_hex"]) if entry.get("name_hex") else entry["name"].encode("utf-8")
-                out += w_u16(len(name_raw))
-                out += name_raw
-                hash_raw = bytes.fromhex(entry["hash_hex"]) if entry.get("hash_hex") else entry["hash"].encode("ascii")
-                out += w_u16(len(hash_raw))
-                out += hash_raw
-                skip = entry.get("skip_size", 0x0C if marker == "abimgdat13" else 0x4C)
-                out += bytes.fromhex(entry.get("padding_hex", "00" * skip))
-                out += w_u8(entry.get("type_byte", 0))
-
-            else:
-                # Fallback generic (e.g. absnddat11)
-                name_raw = bytes.fromhex(entry["name_hex"]) if entry.get("name_hex") else entry["name"].encode("utf-8")
-                out += w_u16(len(name_raw))
-                out += name_raw
-                hash_raw = bytes.fromhex(entry["hash_hex"]) if entry.get("hash_hex") else entry.get("hash", "").encode("ascii")
-                out += w_u16(len(hash_raw))
-                out += hash_raw
-                out += w_u8(entry.get("type_byte", 0))
-
-            if entry.get("file"):
-                fpath = os.path.join(input_dir, entry["file"])
-                with open(fpath, "rb") as f:
-                    payload = f.read()
-                out += w_u32(len(payload))
-                out += payload
-                total_files += 1
+    # 边生成边写出：条目头在小缓冲区中拼好，载荷从文件分块复制，长度取自 os.stat
+    tmp_file = output_file + ".tmp"
+    try:
+        with open(tmp_file, "wb") as raw_f:
+            out_f = HashingWriter(raw_f, hash_algo) if hash_algo else raw_f
+            out = bytearray()
+            out += pad_marker(meta["header_marker"])
+            out += pad_marker(meta["abdata_marker"])
+            op_path = os.path.join(input_dir, meta["abdata_file"])
+            op_size = os.stat(op_path).st_size
+            out += w_u32(op_size)
+            out_f.write(out)
+            out.clear()
+            copy_payload(op_path, out_f, op_size)
+            total_files = 0
+            for section in meta["sections"]:
+                out += pad_marker(section["marker"])
+                out += w_u8(section["count"])
+                for entry in section["entries"]:
+                    marker = entry["marker"]
+                    out += pad_marker(marker)
+
+                    if marker == "abimgdat15":
+                        out += w_u32(entry["version"])
+                        name_raw = bytes.fromhex(entry["name_hex"]) if entry.get("name_hex") else entry["name"].encode("utf-16-le")
+                        out += w_u16(len(name_raw) // 2)
+                        out += name_raw
+                        hash_raw = bytes.fromhex(entry["hash_hex"]) if entry.get("hash_hex") else entry["hash"].encode("ascii")
+                        out += w_u16(len(hash_raw))
+                        out += hash_raw
+                        out += w_u8(entry.get("type_byte", 0))
+                        out += bytes.fromhex(entry.get("padding_hex", "00" * entry.get("skip_size", 0x11)))
+
+                    elif marker == "absnddat12":
+                        out += w_u32(entry["version"])
+                        name_raw = bytes.fromhex(entry["name_hex"]) if entry.get("name_hex") else entry["name"].encode("utf-16-le")
+                        out += w_u16(len(name_raw) // 2)
+                        out += name_raw
+                        out += bytes.fromhex(entry.get("padding_hex", "00" * 7))
+                        if entry.get("eof_entry"):
+                            continue  # no data_size field at EOF
+
+                    elif marker in ("abimgdat10", "absnddat10"):
+                        name_raw = bytes.fromhex(entry["name_hex"]) if entry.get("name_hex") else entry["name"].encode("utf-8")
+                        out += w_u16(len(name_raw))
+                        out += name_raw
+                        out += w_u8(entry.get("type_byte", 0))
+
+                    elif marker in ("abimgdat13", "abimgdat14"):
+                        name_raw = bytes.fromhex(entry["name_hex"]) if entry.get("name_hex") else entry["name"].encode("utf-8")
+                        out += w_u16(len(name_raw))
+                        out += name_raw
+                        hash_raw = bytes.fromhex(entry["hash_hex"]) if entry.get("hash_hex") else entry["hash"].encode("ascii")
+                        out += w_u16(len(hash_raw))
+                        out += hash_raw
+                        skip = entry.get("skip_size", 0x0C if marker == "abimgdat13" else 0x4C)
+                        out += bytes.fromhex(entry.get("padding_hex", "00" * skip))
+                        out += w_u8(entry.get("type_byte", 0))
+
+                    else:
+                        # Fallback generic (e.g. absnddat11)
+                        name_raw = bytes.fromhex(entry["name_hex"]) if entry.get("name_hex") else entry["name"].encode("utf-8")
+                        out += w_u16(len(name_raw))
+                        out += name_raw
+                        hash_raw = bytes.fromhex(entry["hash_hex"]) if entry.get("hash_hex") else entry.get("hash", "").encode("ascii")
+                        out += w_u16(len(hash_raw))
+                        out += hash_raw
+                        out += w_u8(entry.get("type_byte", 0))
+
+                    if entry.get("file"):
+                        fpath = os.path.join(input_dir, entry["file"])
+                        size = os.stat(fpath).st_size
+                        out += w_u32(size)
+                        out_f.write(out)
+                        out.clear()
+                        copy_payload(fpath, out_f, size)
+                        total_files += 1
+                    else:
+                        out += w_u32(0)
+            out_f.write(out)
+            total_size = out_f.tell()
+        os.replace(tmp_file, output_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    log(f"已封回 {total_files} 个文件 -> {os.path.basename(output_file)} ({total_size:,} 字节)")
+    return out_f.hash.hexdigest() if hash_algo else None
+
+def find_unpack_tasks(input_path, output_path=""):
+    """[(源 .b, 输出目录), ...]：输入为目录时递归查找 .b；
+    指定输出目录时各文件解包到其中的同名子目录，否则解包到源文件旁。
+    不同子目录下的同名 .b (a/foo.b 与 b/foo.b) 改用相对路径命名 (a_foo、b_foo)，
+    避免并行解包时写进同一个目录"""
+    files = []
+    if os.path.isfile(input_path):
+        files = [input_path]
+    elif os.path.isdir(input_path):
+        for root, _, filenames in os.walk(input_path):
+            for name in filenames:
+                if name.lower().endswith(".b"):
+                    files.append(os.path.join(root, name))
+    if not output_path:
+        return [(file_path, os.path.splitext(file_path)[0]) for file_path in files]
+    base = input_path if os.path.isdir(input_path) else os.path.dirname(input_path)
+    names = [os.path.splitext(os.path.basename(f))[0] for f in files]
+    counts = {}
+    for name in names:
+        counts[name.lower()] = counts.get(name.lower(), 0) + 1
+    tasks = []
+    used = set()
+    for file_path, name in zip(files, names):
+        if counts[name.lower()] > 1:
+            rel = os.path.splitext(os.path.relpath(file_path, base))[0]
+            name = rel.replace(os.sep, "_").replace("/", "_")
+        unique, n = name, 2
+        while unique.lower() in used:
+            unique = f"{name}_{n}"
+            n += 1
+        used.add(unique.lower())
+        tasks.append((file_path, os.path.join(output_path, unique)))
+    return tasks
+
+def find_repack_tasks(input_path, output_path=""):
+    """[(解包目录, 输出 .b), ...]：输入本身含 metadata.json 时只有一项，否则查找其下一级子目录"""
+    tasks = []
+    if os.path.exists(os.path.join(input_path, "metadata.json")):
+        dir_name = os.path.basename(input_path.rstrip(os.sep))
+        out_name = (dir_name[:-4] if dir_name.endswith("_out") else dir_name) + ".b"
+        if output_path:
+            if os.path.isdir(output_path) or not os.path.splitext(output_path)[1]:
+                final_out = os.path.join(output_path, out_name)
             else:
-                out += w_u32(0)
-    with open(output_file, "wb") as f:
-        f.write(out)
-    log(f"已封回 {total_files} 个文件 -> {os.path.basename(output_file)} ({len(out):,} 字节)")
-
-def cli_main():
-    if len(sys.argv) < 3:
-        print("Usage:")
-        print("  python qlie_gui.py unpack <input.b> [output_dir]")
-        print("  python qlie_gui.py repack <input_dir> [output.b]")
-        sys.exit(1)
-    cmd = sys.argv[1].lower()
-    if cmd == "unpack":
-        inp = sys.argv[2]
-        out = sys.argv[3] if len(sys.argv) > 3 else os.path.splitext(inp)[0] + "_out"
-        unpack(inp, out, log_fn=print)
-    elif cmd == "repack":
-        inp = sys.argv[2]
-        out = sys.argv[3] if len(sys.argv) > 3 else "repacked.b"
-        repack(inp, out, log_fn=print)
+                final_out = output_path
+        else:
+            final_out = input_path + ".b"
+        tasks.append((input_path, final_out))
     else:
-        print(f"Unknown command: {cmd}")
-        sys.exit(1)
+        with os.scandir(input_path) as it:
+            for entry in it:
+                if entry.is_dir() and os.path.exists(os.path.join(entry.path, "metadata.json")):
+                    dir_name = entry.name
+                    out_name = (dir_name[:-4] if dir_name.endswith("_out") else dir_name) + ".b"
+                    if output_path:
+                        final_out = os.path.join(output_path, out_name)
+                    else:
+                        final_out = os.path.join(input_path, out_name)
+                    tasks.append((entry.path, final_out))
+    return tasks
+
+def unpack_task(file_path, out_dir, hash_algo=None):
+    """解包一个 .b，返回 (成功, 日志)；异常只记入该文件的日志"""
+    logs = []
+    try:
+        unpack(file_path, out_dir, log_fn=logs.append, hash_algo=hash_algo)
+        logs.append(f"  -> 输出: {out_dir}")
+        return True, logs
+    except Exception as e:
+        logs.append(f"  -> 失败: {str(e)}")
+        logs.append(traceback.format_exc())
+        return False, logs
+
+def repack_task(in_dir, out_file, hash_algo=None):
+    """封回一个目录 (可选校验)，返回 (成功, 日志)；异常只记入该目录的日志"""
+    logs = []
+    try:
+        out_dir = os.path.dirname(out_file)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        digest = repack(in_dir, out_file, log_fn=logs.append, hash_algo=hash_algo)
+        logs.append(f"  -> 生成: {out_file}")
+        if digest:
+            verify_repack(in_dir, out_file, digest, hash_algo, log_fn=logs.append)
+        return True, logs
+    except Exception as e:
+        logs.append(f"  -> 失败: {str(e)}")
+        logs.append(traceback.format_exc())
+        return False, logs
+
+def run_batch(task_fn, tasks, label, jobs=1, log_fn=None, progress_fn=None, hash_algo=None):
+    """批量处理相互独立的容器，返回失败数。jobs > 1 时在进程池中并行；
+    日志按任务顺序输出，已提交但未输出的任务最多 jobs * 2 个；
+    每完成一个文件调用 progress_fn(已完成数, 总数)"""
+    def log(t):
+        if log_fn: log_fn(t)
+    total = len(tasks)
+    results = {}
+    next_out = 0
+    done = failed = 0
+
+    def finished(idx, result):
+        nonlocal next_out, done, failed
+        results[idx] = result
+        done += 1
+        if progress_fn: progress_fn(done, total)
+        while next_out in results:
+            ok, logs = results.pop(next_out)
+            log(f"[{next_out+1}/{total}] {label}: {os.path.basename(tasks[next_out][0])}")
+            for line in logs:
+                log(line)
+            failed += not ok
+            next_out += 1
+
+    if jobs <= 1 or total <= 1:
+        for idx, (src, dst) in enumerate(tasks):
+            finished(idx, task_fn(src, dst, hash_algo))
+        return failed
+    window = jobs * 2
+    pending = {}
+    submitted = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while True:
+            while submitted < total and submitted < next_out + window:
+                src, dst = tasks[submitted]
+                pending[pool.submit(task_fn, src, dst, hash_algo)] = submitted
+                submitted += 1
+            if not pending:
+                break
+            finished_set, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished_set:
+                idx = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:  # 子进程异常退出等
+                    result = (False, [f"  -> 失败: {str(e)}"])
+                finished(idx, result)
+    return failed
+
+def cli_main(argv=None):
+    parser = argparse.ArgumentParser(prog="qlie_gui.py", description="QLIE .b 解包/封回")
+    parser.add_argument("cmd", type=str.lower, choices=["unpack", "repack"])
+    parser.add_argument("input", help="unpack: .b 文件或目录；repack: 解包目录或其上级目录")
+    parser.add_argument("output", nargs="?", help="输出路径")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="批量处理时并行的文件数 (默认 1)")
+    args = parser.parse_args(argv)
+    jobs = max(1, args.jobs)
+    if args.cmd == "unpack":
+        if os.path.isfile(args.input):
+            out = args.output or os.path.splitext(args.input)[0] + "_out"
+            tasks = [(args.input, out)]
+        else:
+            tasks = find_unpack_tasks(args.input, args.output or "")
+        task_fn, label = unpack_task, "解包"
+    else:
+        if os.path.exists(os.path.join(args.input, "metadata.json")):
+            tasks = [(args.input, args.output or "repacked.b")]
+        else:
+            tasks = find_repack_tasks(args.input, args.output or "")
+        task_fn, label = repack_task, "打包"
+    if not tasks:
+        print(f"未找到可处理的输入: {args.input}")
+        return 1
+    failed = run_batch(task_fn, tasks, label, jobs, log_fn=print)
+    if failed:
+        print(f"{failed}/{len(tasks)} 个失败")
+    return 1 if failed else 0
 
 
 # ══════════════════════════════════════════════════════════════════════════
@@ -347,12 +645,15 @@ def cli_main():
 class WorkerThread(QObject):
     finished = pyqtSignal(bool, str, list, str, str)  # ok, err_msg, logs, out, mode
     log_signal = pyqtSignal(str)
+    progress_signal = pyqtSignal(int, int)  # done, total
 
-    def __init__(self, mode, input_path, output_path):
+    def __init__(self, mode, input_path, output_path, hash_algo=None, jobs=1):
         super().__init__()
         self.mode = mode
         self.input_path = input_path
         self.output_path = output_path
+        self.hash_algo = hash_algo
+        self.jobs = jobs
 
     def run(self):
         logs = []
@@ -368,80 +669,25 @@ class WorkerThread(QObject):
         self.finished.emit(ok, err_msg, logs, self.output_path, self.mode)
 
     def _run_unpack(self, logs):
-        input_path = self.input_path
-        output_path = self.output_path
-        files = []
-        if os.path.isfile(input_path):
-            files = [input_path]
-        elif os.path.isdir(input_path):
-            for root, _, filenames in os.walk(input_path):
-                for name in filenames:
-                    if name.lower().endswith(".b"):
-                        files.append(os.path.join(root, name))
-        if not files:
-            logs.append(f"未找到 .b 文件: {input_path}")
+        tasks = find_unpack_tasks(self.input_path, self.output_path)
+        if not tasks:
+            logs.append(f"未找到 .b 文件: {self.input_path}")
             return
-        total = len(files)
-        logs.append(f"找到 {total} 个 .b 文件，开始解包...")
-        for i, file_path in enumerate(files):
-            logs.append(f"[{i+1}/{total}] 解包: {os.path.basename(file_path)}")
-            fname = os.path.basename(file_path)
-            folder_name = os.path.splitext(fname)[0]
-            if output_path:
-                current_out = os.path.join(output_path, folder_name)
-            else:
-                current_out = os.path.splitext(file_path)[0]
-            try:
-                unpack(file_path, current_out, log_fn=lambda t: logs.append(t))
-                logs.append(f"  -> 输出: {current_out}")
-            except Exception as e:
-                logs.append(f"  -> 失败: {str(e)}")
-                logs.append(traceback.format_exc())
+        logs.append(f"找到 {len(tasks)} 个 .b 文件，开始解包...")
+        run_batch(unpack_task, tasks, "解包", self.jobs, log_fn=logs.append,
+                  progress_fn=self.progress_signal.emit)
 
     def _run_repack(self, logs):
-        input_path = self.input_path
-        output_path = self.output_path
-        tasks = []
-        if os.path.isfile(input_path):
+        if os.path.isfile(self.input_path):
             logs.append("错误: 打包模式需要输入目录")
             return
-        if os.path.exists(os.path.join(input_path, "metadata.json")):
-            dir_name = os.path.basename(input_path.rstrip(os.sep))
-            out_name = (dir_name[:-4] if dir_name.endswith("_out") else dir_name) + ".b"
-            if output_path:
-                if os.path.isdir(output_path) or not os.path.splitext(output_path)[1]:
-                    final_out = os.path.join(output_path, out_name)
-                else:
-                    final_out = output_path
-            else:
-                final_out = input_path + ".b"
-            tasks.append((input_path, final_out))
-        else:
-            with os.scandir(input_path) as it:
-                for entry in it:
-                    if entry.is_dir() and os.path.exists(os.path.join(entry.path, "metadata.json")):
-                        dir_name = entry.name
-                        out_name = (dir_name[:-4] if dir_name.endswith("_out") else dir_name) + ".b"
-                        if output_path:
-                            final_out = os.path.join(output_path, out_name)
-                        else:
-                            final_out = os.path.join(input_path, out_name)
-                        tasks.append((entry.path, final_out))
+        tasks = find_repack_tasks(self.input_path, self.output_path)
         if not tasks:
-            logs.append(f"在 {input_path} 未找到包含 metadata.json 的目录")
+            logs.append(f"在 {self.input_path} 未找到包含 metadata.json 的目录")
             return
-        total = len(tasks)
-        logs.append(f"找到 {total} 个待打包目录，开始打包...")
-        if output_path:
-            os.makedirs(output_path, exist_ok=True)
-        for i, (in_dir, out_file) in enumerate(tasks):
-            logs.append(f"[{i+1}/{total}] 打包: {os.path.basename(in_dir)}")
-            try:
-                repack(in_dir, out_file, log_fn=lambda t: logs.append(t))
-                logs.append(f"  -> 生成: {out_file}")
-            except Exception as e:
-                logs.append(f"  -> 失败: {str(e)}")
-                logs.append(traceback.format_exc())
+        logs.append(f"找到 {len(tasks)} 个待打包目录，开始打包...")
+        run_batch(repack_task, tasks, "打包", self.jobs, log_fn=logs.append,
+                  progress_fn=self.progress_signal.emit, hash_algo=self.hash_algo)
 
 
 class DragDropLineEdit(QLineEdit):
@@ -505,6 +751,15 @@ class QLIEGUI(QWidget):
         header_layout.addWidget(QLabel("主题:"))
         header_layout.addWidget(self.theme_combo)
 
+        # 批量处理多个 .b / 目录时并行的进程数
+        self.jobs_combo = QComboBox()
+        self.jobs_combo.addItem("自动", None)
+        for n in sorted({1, 2, 4, 8, os.cpu_count() or 1}):
+            if n <= (os.cpu_count() or 1):
+                self.jobs_combo.addItem(str(n), n)
+        header_layout.addWidget(QLabel("并行进程:"))
+        header_layout.addWidget(self.jobs_combo)
+
         main_layout.addLayout(header_layout)
 
         # --- Tabs ---
@@ -580,6 +835,15 @@ class QLIEGUI(QWidget):
         # Output
         self.repack_output_edit = self.create_file_selector(layout, "输出目录 (可选):", is_input=False)
 
+        # 校验算法：封回时边写边计算，原始文件的摘要在首次校验时计算并缓存
+        hash_layout = QHBoxLayout()
+        hash_layout.addWidget(QLabel("封回校验:"))
+        self.hash_combo = QComboBox()
+        self.hash_combo.addItems(list(HASH_ALGOS) + ["不校验"])
+        hash_layout.addWidget(self.hash_combo)
+        hash_layout.addStretch()
+        layout.addLayout(hash_layout)
+
         layout.addSpacing(20)
 
         # Action Button
@@ -670,21 +934,29 @@ class QLIEGUI(QWidget):
 
     def start_worker(self, mode, input_path, output_path):
         self.set_ui_enabled(False)
+        self.progress_bar.setRange(0, 0)
         self.progress_bar.show()
         self.log_text.clear()
 
         self.worker_thread = QThread()
-        self.worker = WorkerThread(mode, input_path, output_path)
+        self.worker = WorkerThread(mode, input_path, output_path,
+                                   hash_algo=HASH_ALGOS.get(self.hash_combo.currentText()) if mode == 'repack' else None,
+                                   jobs=self.jobs_combo.currentData() or os.cpu_count() or 1)
         self.worker.moveToThread(self.worker_thread)
 
         self.worker_thread.started.connect(self.worker.run)
         self.worker.finished.connect(self.on_worker_finished)
+        self.worker.progress_signal.connect(self.on_worker_progress)
         self.worker.finished.connect(self.worker_thread.quit)
         self.worker.finished.connect(self.worker.deleteLater)
         self.worker_thread.finished.connect(self.worker_thread.deleteLater)
 
         self.worker_thread.start()
 
+    def on_worker_progress(self, done, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+
     def on_worker_finished(self, ok, err_msg, logs, output_path, mode):
         self.progress_bar.hide()
         self.set_ui_enabled(True)
@@ -692,68 +964,9 @@ class QLIEGUI(QWidget):
             self.log_text.append(line)
         if ok:
             self.log_text.append("任务完成！")
-            if mode == 'repack' and os.path.isfile(output_path):
-                self._verify_hash(output_path)
         else:
             self.log_text.append(f"任务失败: {err_msg}")
 
-    def _verify_hash(self, repacked_path):
-        """封回后自动与原始文件做 MD5 校验"""
-        # 尝试找到原始文件
-        base = repacked_path
-        for suffix in ["_repack", "_repacked"]:
-            if suffix in base:
-                base = base.split(suffix)[0]
-                break
-        candidates = []
-        # 如果 repacked_path 在输出目录中，尝试匹配同名 .b
-        rname = os.path.basename(repacked_path)
-        parent = os.path.dirname(repacked_path)
-        # 往上一层找
-        grandparent = os.path.dirname(parent) if parent else ""
-        for d in [parent, grandparent]:
-            if d:
-                cand = os.path.join(d, rname)
-                if cand not in candidates:
-                    candidates.append(cand)
-        # 通过 metadata 找原始文件
-        input_path = self.repack_input_edit.text().strip() if hasattr(self, 'repack_input_edit') else ""
-        if input_path:
-            meta_path = os.path.join(input_path, "metadata.json")
-            if os.path.exists(meta_path):
-                try:
-                    with open(meta_path, "r", encoding="utf-8") as f:
-                        meta = json.load(f)
-                    src = meta.get("source_file", "")
-                    if src:
-                        src_dir = os.path.dirname(input_path)
-                        candidates.insert(0, os.path.join(src_dir, src))
-                except Exception:
-                    pass
-
-        for orig in candidates:
-            if os.path.isfile(orig) and os.path.abspath(orig) != os.path.abspath(repacked_path):
-                h1 = self._md5(orig)
-                h2 = self._md5(repacked_path)
-                if h1 == h2:
-                    self.log_text.append(f"MD5 校验: 与原始文件完全一致 ({h1[:16]}...)")
-                else:
-                    self.log_text.append(f"MD5 校验: 与原始文件不同")
-                    self.log_text.append(f"  原始: {h1}")
-                    self.log_text.append(f"  封回: {h2}")
-                return
-
-    @staticmethod
-    def _md5(path):
-        h = hashlib.md5()
-        with open(path, "rb") as f:
-            while True:
-                chunk = f.read(1 << 20)
-                if not chunk:
-                    break
-                h.update(chunk)
-        return h.hexdigest()
-
     def set_ui_enabled(self, enabled):
         self.btn_unpack.setEnabled(enabled)
         self.btn_repack.setEnabled(enabled)
@@ -761,6 +974,8 @@ class QLIEGUI(QWidget):
         self.unpack_output_edit.setEnabled(enabled)
         self.repack_input_edit.setEnabled(enabled)
         self.repack_output_edit.setEnabled(enabled)
+        self.hash_combo.setEnabled(enabled)
+        self.jobs_combo.setEnabled(enabled)
 
     def detect_system_theme(self):
         self.theme_combo.setCurrentText("跟随系统")
@@ -842,8 +1057,9 @@ class QLIEGUI(QWidget):
 # ══════════════════════════════════════════════════════════════════════════
 
 if __name__ == "__main__":
-    if len(sys.argv) >= 3 and sys.argv[1].lower() in ("unpack", "repack"):
-        cli_main()
+    # 带任何参数时走命令行，由 argparse 解析 (选项可以放在子命令之前)
+    if len(sys.argv) > 1:
+        sys.exit(cli_main())
     else:
         app = QApplication(sys.argv)
         window = QLIEGUI()